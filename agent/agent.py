@@ -1,53 +1,109 @@
 from agent.tools.customer_tools.customer import customer_tools
 from agent.tools.manager_tools.manager import manager_tools
+from agent.tools.condensed import condensed_tools
 import traceback
-from google.adk.agents import Agent
+from typing import AsyncGenerator
+from google.adk.agents import Agent, BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+MODEL = "gemini-2.0-flash-exp"
 
 # Combine both tool sets
 all_tools = customer_tools + manager_tools  # cả hai đều là list[function]
 
+# Only back-office phrases: customers also ask about "stock" or "sales" (discounts).
+MANAGER_KEYWORDS = [
+    "add product", "update product", "delete product",
+    "remove product", "import products", "export products",
+    "sales report", "revenue", "analytics", "inventory", "manage"
+]
+
 try:
-    root_agent = Agent(
-        name="fashion_store_helper",
-        model="gemini-2.0-flash-exp",
-        description=(
+    # Each role only sees its own tools, so customers never pay for the manager manifest.
+    customer_agent = Agent(
+        name="fashion_store_customer",
+        model=MODEL,
+        description="Fashion assistant for customers: product search, outfit advice, cart and orders.",
+        instruction=(
             "You are a smart fashion assistant for an online fashion store. "
-            "You help customers with product discovery and style suggestions, "
-            "and assist managers with product management and sales analysis."
+            "Help customers find products, suggest outfits and place orders using your tools."
         ),
-        tools=all_tools,
+        tools=condensed_tools(customer_tools),
+    )
+    manager_agent = Agent(
+        name="fashion_store_manager",
+        model=MODEL,
+        description="Store assistant for managers: product management, exports and sales reports.",
+        instruction=(
+            "You are the back-office assistant of an online fashion store. "
+            "Help managers add, update, remove and export products and analyse sales using your tools."
+        ),
+        tools=condensed_tools(manager_tools),
     )
 except Exception as e:
     print("🚨 Agent creation failed:")
     traceback.print_exc()
     raise e
-# --- Custom Agent with prompt routing logic (optional) ---
-class FashionStoreAgent(Agent):
-    def __init__(self):
+
+
+class FashionStoreAgent(BaseAgent):
+    """
+    Routes every turn to the customer or manager agent.
+
+    The role comes from session state (`user_role`, set by whoever authenticates
+    the session). Without it, the keyword heuristic in `determine_user_type`
+    picks the role; once it detects a manager the role is written to session
+    state, so follow-ups without a keyword ("yes, delete it") stay with the
+    manager agent. Customer is only the default and is not stored, so a manager
+    who opens with small talk is still recognized later.
+    """
+    customer_agent: Agent
+    manager_agent: Agent
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, customer_agent: Agent = customer_agent, manager_agent: Agent = manager_agent):
         super().__init__(
             name="fashion_store_helper",
-            model="gemini-2.0-flash-exp",
             description=(
                 "You are a smart fashion assistant for an online fashion store. "
                 "Determine whether the user is a customer or manager and use appropriate tools."
             ),
-            tools=all_tools,
+            customer_agent=customer_agent,
+            manager_agent=manager_agent,
+            sub_agents=[customer_agent, manager_agent],
         )
 
     def determine_user_type(self, prompt: str) -> str:
-        manager_keywords = [
-            "add product", "update product", "delete product",
-            "remove product", "sales", "report", "top selling",
-            "revenue", "analytics", "inventory", "stock", "manage"
-        ]
-        return "manager" if any(kw in prompt.lower() for kw in manager_keywords) else "customer"
+        return "manager" if any(kw in prompt.lower() for kw in MANAGER_KEYWORDS) else "customer"
+
+    def resolve_role(self, ctx: InvocationContext) -> tuple:
+        """Returns (role, whether it should be stored in session state)."""
+        role = ctx.session.state.get("user_role")
+        if role in ("customer", "manager"):
+            return role, False
+        prompt = ""
+        if ctx.user_content and ctx.user_content.parts:
+            prompt = " ".join(part.text for part in ctx.user_content.parts if getattr(part, "text", None))
+        role = self.determine_user_type(prompt)
+        return role, role == "manager"
 
-    async def run(self, prompt: str, **kwargs):
-        user_type = self.determine_user_type(prompt)
-        enhanced_prompt = f"[{user_type.upper()} MODE] {prompt}"
-        return await super().run(enhanced_prompt, **kwargs)
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        role, store = self.resolve_role(ctx)
+        if store:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={"user_role": role}),
+            )
+        agent = self.manager_agent if role == "manager" else self.customer_agent
+        async for event in agent.run_async(ctx):
+            yield event
 
 
-custom_fashion_agent = FashionStoreAgent()
+root_agent = FashionStoreAgent()
+custom_fashion_agent = root_agent
 
-__all__ = ["root_agent", "custom_fashion_agent"]
+__all__ = ["root_agent", "custom_fashion_agent", "customer_agent", "manager_agent"]
@@ -0,0 +1,105 @@
+"""
+Token-count report for each agent configuration's per-turn prompt overhead.
+
+Every model call carries the agent's instruction/description and its tool
+manifest (one function declaration per tool, description = docstring). This
+report serializes those exactly as ADK builds them and counts tokens for:
+
+- combined_full:  the old single agent (all tools, full docstrings)
+- customer_full / manager_full:  role-scoped, full docstrings
+- customer / manager:  role-scoped, condensed docstrings (what is deployed)
+
+    python -m agent.prompt_report            # tiktoken cl100k_base (offline approximation)
+    python -m agent.prompt_report --gemini   # exact counts from the Gemini count_tokens API
+    python -m agent.prompt_report --json exports/prompt_report.json
+"""
+import argparse
+import json
+import os
+
+from agent.agent import MODEL, all_tools, customer_agent, manager_agent
+from agent.tools.customer_tools.customer import customer_tools
+from agent.tools.manager_tools.manager import manager_tools
+from agent.tools.condensed import condensed_tools, CONDENSED_DOCS
+
+LEGACY_DESCRIPTION = (
+    "You are a smart fashion assistant for an online fashion store. "
+    "You help customers with product discovery and style suggestions, "
+    "and assist managers with product management and sales analysis."
+)
+
+
+def tool_declaration(tool) -> dict:
+    try:
+        declaration = tool._get_declaration()
+        return declaration.model_dump(exclude_none=True, mode="json")
+    except Exception:
+        return {"name": tool.name, "description": tool.description}
+
+
+def prompt_payload(preamble: str, tools: list) -> str:
+    return preamble + "\n" + json.dumps([tool_declaration(t) for t in tools], ensure_ascii=False)
+
+
+def configurations() -> dict:
+    return {
+        "combined_full": prompt_payload(LEGACY_DESCRIPTION, all_tools),
+        "customer_full": prompt_payload(customer_agent.instruction + customer_agent.description, customer_tools),
+        "manager_full": prompt_payload(manager_agent.instruction + manager_agent.description, manager_tools),
+        "customer": prompt_payload(customer_agent.instruction + customer_agent.description,
+                                   condensed_tools(customer_tools, CONDENSED_DOCS)),
+        "manager": prompt_payload(manager_agent.instruction + manager_agent.description,
+                                  condensed_tools(manager_tools, CONDENSED_DOCS)),
+    }
+
+
+def _tiktoken_counter():
+    import tiktoken
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+def _gemini_counter():
+    from google import genai
+    client = genai.Client()
+    return lambda text: client.models.count_tokens(model=MODEL, contents=text).total_tokens
+
+
+def token_report(use_gemini: bool = False) -> dict:
+    count = _gemini_counter() if use_gemini else _tiktoken_counter()
+    payloads = configurations()
+    baseline = count(payloads["combined_full"])
+    report = {}
+    for name, payload in payloads.items():
+        tokens = count(payload)
+        report[name] = {
+            "tokens": tokens,
+            "characters": len(payload),
+            "vs_combined_full": f"{(tokens - baseline) / baseline * 100:+.1f}%" if baseline else None,
+        }
+    return {"counter": "gemini" if use_gemini else "tiktoken:cl100k_base", "model": MODEL, "configs": report}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-agent prompt/tool-manifest token counts.")
+    parser.add_argument("--gemini", action="store_true", help="count with the Gemini API instead of tiktoken")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = token_report(use_gemini=args.gemini)
+    print(f"Token counts ({report['counter']}):")
+    print(f"{'configuration':<16} {'tokens':>8} {'chars':>8} {'vs combined':>12}")
+    for name, row in report["configs"].items():
+        print(f"{name:<16} {row['tokens']:>8} {row['characters']:>8} {row['vs_combined_full']:>12}")
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
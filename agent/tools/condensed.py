@@ -0,0 +1,96 @@
+"""
+Condensed tool descriptions for the model-facing tool manifest.
+
+ADK sends each tool's docstring as its description on every model call. The
+full docstrings stay on the functions for developers; agents are built from
+`condensed_tools(...)`, which re-registers each tool with the short text below
+(same name, signature and behaviour). Set TOOL_DOCS=full to send the originals.
+"""
+import asyncio
+import functools
+import os
+
+from google.adk.tools import FunctionTool
+
+TOOL_DOCS = os.getenv("TOOL_DOCS", "condensed").lower()
+
+CONDENSED_DOCS = {
+    # customer
+    "get_product_by_keyword": (
+        "Search products by keyword and show one page of ranked results.\n\n"
+        "Args:\n    keyword: Search text.\n    page: 1-based page number.\n    page_size: Items per page."
+    ),
+    "get_product_details": (
+        "Show full details of item #index (1-based) from the last search results or outfit suggestion."
+    ),
+    "add_to_cart": (
+        "Add item #index (1-based) from the last search results or outfit suggestion to the cart.\n\n"
+        "Args:\n    index: Item number as displayed.\n    quantity: Units to add (default 1)."
+    ),
+    "view_cart": "Show the cart contents and total.",
+    "place_order": (
+        "Place an order for everything in the cart.\n\n"
+        "Args:\n    customer_name: Customer's name.\n    phone: Contact phone.\n    comment: Optional note."
+    ),
+    "advise_outfit": (
+        "Suggest a complete outfit (top, bottom, shoes, up to 3 accessories) for a style or occasion, "
+        "e.g. 'casual summer picnic'. Use for any outfit or style recommendation.\n\n"
+        "Args:\n    prompt: Short description of the occasion or desired style."
+    ),
+    "change_outfit_part": (
+        "Replace one part of the last suggested outfit.\n\n"
+        "Args:\n    part: topwear, bottomwear, footwear or accessories.\n    prompt: What the new item should be like."
+    ),
+    # manager
+    "add_product_with_vector": (
+        "Add a new product and index it for style search.\n\n"
+        "Args:\n    product_data: name, category, price, description, style_tags, color, season, gender, img_url."
+    ),
+    "import_products_from_file": (
+        "Import and index many products from a CSV/XLSX file (header: name, category, price, description, "
+        "style_tags, color, season, gender, img_url). Bad rows are reported, not fatal.\n\n"
+        "Args:\n    file_path: Path of the file on the server.\n    dry_run: Only validate, save nothing."
+    ),
+    "get_all_product_and_export": (
+        "Export all products to a file in the exports folder.\n\n"
+        "Args:\n    file_format: xlsx, csv or parquet.\n    compress: zstd-compress csv/parquet output."
+    ),
+    "update_exisiting_product": (
+        "Update fields of a product.\n\n"
+        "Args:\n    product_id: Product ID.\n    updated_data: Fields to change and their new values."
+    ),
+    "remove_a_product": "Delete a product and its vector by product ID.",
+    "generate_weekly_report": (
+        "Sales report: revenue, units, orders, top products and per-day totals.\n\n"
+        "Args:\n    start_date: YYYY-MM-DD (default: start of current week).\n"
+        "    end_date: YYYY-MM-DD (default: end of current week).\n    top_n: Number of top products."
+    ),
+}
+
+
+def _with_doc(func, doc: str):
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+        async_wrapper.__doc__ = doc
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+    wrapper.__doc__ = doc
+    return wrapper
+
+
+def condensed_tools(tools: list, docs: dict = None) -> list:
+    """Copies of `tools` whose descriptions are the condensed docs (unchanged if TOOL_DOCS=full)."""
+    if docs is None:
+        if TOOL_DOCS == "full":
+            return list(tools)
+        docs = CONDENSED_DOCS
+    condensed = []
+    for tool in tools:
+        doc = docs.get(tool.name)
+        condensed.append(FunctionTool(func=_with_doc(tool.func, doc)) if doc else tool)
+    return condensed
@@ -1,25 +1,147 @@
-from shared.db.queries import search_products_by_keyword, add_order
+from shared.db.async_queries import search_families_page, count_families_by_keyword, place_order_with_lines, catalog_version
 from google.adk.tools import ToolContext, FunctionTool
-from ..utils import paginate
-from shared.db.db_utils import group_variants
-from shared.pinecone.client import get_pinecone_index
-from shared.pinecone.embed_utils import get_product_embedding
-from google.adk.tools import FunctionTool
-import uuid
-from shared.pinecone.embed_utils import get_product_embedding
-
-def get_product_by_keyword(keyword: str, page: int = 1, page_size: int = 5, tool_context: ToolContext = None) -> dict:
+from shared.db.families import group_into_families, get_family_index
+from shared.vector_store.client import get_vector_store
+from shared.pinecone.embed_utils import aget_product_embedding
+from shared.pinecone.semantic_cache import get_outfit_cache
+from shared.executors import run_blocking
+from shared.tracing import traced, traced_tool
+from shared.db.queries import lookup_products
+import asyncio
+
+# Session state keeps product references only ({"ids": [...], "version": ...});
+# full records are resolved on demand through the shared product lookup cache.
+
+def _product_ref(item):
+    # Sessions written before state was compacted hold whole product dicts.
+    ref = item.get("id") if isinstance(item, dict) else item
+    # Vector metadata stores numbers as floats.
+    if isinstance(ref, float) and ref.is_integer():
+        ref = int(ref)
+    return ref
+
+def compact_results(items: list, version: str) -> dict:
+    return {"ids": [_product_ref(item) for item in items], "version": version}
+
+def compact_outfit(outfit: dict, version: str) -> dict:
+    return {
+        "topwear": _product_ref(outfit["topwear"]),
+        "bottomwear": _product_ref(outfit["bottomwear"]),
+        "footwear": _product_ref(outfit["footwear"]),
+        "accessories": [_product_ref(item) for item in outfit["accessories"][:3]],
+        "excluded": len(outfit.get("others", [])),
+        "version": version,
+    }
+
+def outfit_ids(outfit: dict) -> list:
+    """Product ids of an outfit in display order: top, bottom, shoes, accessories."""
+    ids = [_product_ref(outfit.get(slot)) for slot in ("topwear", "bottomwear", "footwear")]
+    ids += [_product_ref(item) for item in outfit.get("accessories", [])]
+    return [pid for pid in ids if pid is not None]
+
+def selected_ids(state) -> tuple:
+    """(ids, version) of the list the user last saw: search results first, else the outfit."""
+    results = state.get("last_search_results")
+    if results:
+        if isinstance(results, list):
+            return [_product_ref(item) for item in results], None
+        return results["ids"], results.get("version")
+    outfit = state.get("last_outfit_suggestion")
+    if outfit:
+        return outfit_ids(outfit), outfit.get("version")
+    return [], None
+
+def _resolve_products(ids: list) -> list:
+    rows = lookup_products(ids)
+    resolved = []
+    for pid in ids:
+        row = rows.get(str(pid))
+        resolved.append(group_into_families([row])[0] if row else None)
+    return resolved
+
+async def resolve_products(ids: list) -> list:
+    """Current product (family) dicts for `ids`, None where a product no longer exists."""
+    return await run_blocking("db", _resolve_products, ids)
+
+# ====================== message formatting ======================
+
+@traced("format.search_page")
+def format_search_page(keyword: str, products: list, total_items: int, page: int, total_pages: int) -> str:
+    message = f"🔍 Found {total_items} product(s) for '{keyword}'. Showing page {page} of {total_pages}:\n\n"
+    for idx, p in enumerate(products, start=1):
+        message += (
+            f"{idx}. {p['name']} ({p['category']}): {p['price']}$\n"
+            f"   Colors: {', '.join(p.get('colors', []))}\n"
+            f"   {p['image_url']}\n\n"
+        )
+    return message
+
+@traced("format.product_details")
+def format_product_details(product: dict) -> str:
+    return (
+        f"🎯 --------- {product['name']} ---------\n\n"
+        f"1. 💰 Price: {product['price']}$\n"
+        f"2. 📦 Quantity: {product.get('quantity', 'N/A')}\n"
+        f"3. 🏷️ Category: {product['category']}\n"
+        f"4. 🔢 ID: {product.get('id', 'N/A')}\n"
+        f"5. 📝 Description:\n{product['description']}\n"
+        f"6. 🧵 Style Tags: {product['style_tags']}\n"
+        f"7. ❄️ Season: {product['season']}    "
+        f"8. 🚻 Gender: {product['gender']}\n"
+        f"9. 🎨 Colors: {', '.join(product.get('colors', [])) if isinstance(product.get('colors'), list) else product.get('color', 'N/A')}\n"
+        f"10. Image link: {product['image_url']}"
+    )
+
+@traced("format.cart")
+def format_cart(cart: list) -> str:
+    message = "Your cart:\n\n"
+    total = 0
+    for i, item in enumerate(cart, 1):
+        line_total = item["unit_price"] * item["quantity"]
+        total += line_total
+        message += f"{i}. {item['product_name']} x {item['quantity']} = {line_total}$\n"
+    message += f"\nTotal: {total}$"
+    return message
+
+@traced("format.outfit")
+def format_outfit(prompt: str, outfit: dict) -> str:
+    def fmt(label, item):
+        if not item:
+            return f"{label}: ❌ Not found\n"
+        return f"{label}: {item['name']} - {item['price']}$\n{item['image_url']}\n"
+
+    message = f"👗 Outfit suggestion for: **{prompt}**\n\n"
+    message += fmt("👕 Topwear", outfit["topwear"])
+    message += fmt("👖 Bottomwear", outfit["bottomwear"])
+    message += fmt("👟 Footwear", outfit["footwear"])
+
+    if outfit["accessories"]:
+        message += "\n👜 Accessories:\n"
+        for acc in outfit["accessories"][:3]:
+            message += f" - {acc['name']} ({acc['price']}$)\n{acc['image_url']}\n"
+    else:
+        message += "\n👜 Accessories: Not found.\n"
+
+    if outfit["others"]:
+        message += f"\n⚠️ {len(outfit['others'])} item(s) were excluded due to style mismatch."
+    return message
+
+
+async def get_product_by_keyword(keyword: str, page: int = 1, page_size: int = 5, tool_context: ToolContext = None) -> dict:
     """
     Search for products using a keyword and return paginated results.
 
     This tool searches product data based on `keyword` matched in name, description, tags or category, gender.
-    If results are found, they will be grouped and stored into `tool_context["last_search_results"]`
-    for use in other tools like detail view or cart.
+    Results are ranked by relevance (best match first).
+    Pagination happens in the data layer, one slot per product family (all color/size variants together),
+    so every page shows `page_size` distinct products. The IDs of the grouped products shown on the requested page are
+    stored into `tool_context["last_search_results"]` for use in other tools like detail view or cart, and
+    the page cursors are kept in `tool_context["search_pagination"]`.
 
     Args:
         keyword (str): Keyword or phrase to search (e.g., "tank top", "summer jacket").
         page (int): Page number of the results to return.
-        page_size (int): Number of items per page.
+        page_size (int): Number of products (families) per page.
     Returns:
         dict: {
             "status": "success" or "failed",
@@ -27,40 +149,64 @@ def get_product_by_keyword(keyword: str, page: int = 1, page_size: int = 5, tool
         }
     """
     try:
-        raw_products = search_products_by_keyword(keyword)
+        # Keyset cursors per page live in session state, so page N never re-reads pages 1..N-1.
+        state = tool_context.state.get("search_pagination") if tool_context is not None else None
+        if not state or state.get("keyword") != keyword or state.get("page_size") != page_size:
+            state = {
+                "keyword": keyword,
+                "page_size": page_size,
+                "total_items": await count_families_by_keyword(keyword),
+                "cursors": {"1": None},
+            }
 
-        if not raw_products:
+        total_items = state["total_items"]
+        if not total_items:
             return {
                 "status": "failed",
                 "message": f"No products found for keyword '{keyword}'."
             }
 
+        total_pages = (total_items + page_size - 1) // page_size  # ceil
+        if page < 1 or page > total_pages:
+            return {
+                "status": "failed",
+                "message": f"Invalid page. Please choose between 1 and {total_pages}."
+            }
+
+        # Start from the closest page whose cursor we already know (normally page - 1).
+        current = max(int(p) for p in state["cursors"] if int(p) <= page)
+        cursor = state["cursors"][str(current)]
+        while True:
+            result = await search_families_page(keyword, page_size=page_size, cursor=cursor)
+            if result["next_cursor"]:
+                state["cursors"][str(current + 1)] = result["next_cursor"]
+            if current == page or not result["next_cursor"]:
+                break
+            cursor = result["next_cursor"]
+            current += 1
+        raw_products = result["rows"]
+
+        if not raw_products:
+            return {
+                "status": "failed",
+                "message": f"No products found for keyword '{keyword}' on page {page}."
+            }
+
         # Defensive check: ensure all required keys exist
         for p in raw_products:
             for key in ["description", "style_tags", "season", "gender"]:
                 if key not in p:
-                    p[key] = "N/A"  # prevent KeyError in group_variants
+                    p[key] = "N/A"  # prevent KeyError when grouping
 
-        grouped_products = group_variants(raw_products)
+        paged_products = await run_blocking("db", group_into_families, raw_products)
 
         if tool_context is not None:
-            tool_context.state["last_search_results"] = grouped_products
-
-
-        pagination = paginate(grouped_products, page=page, page_size=page_size)
-        paged_products = pagination['data']
-
-        message = f"🔍 Found {pagination['total_items']} product(s) for '{keyword}'. Showing page {pagination['page']} of {pagination['total_pages']}:\n\n"
-        for idx, p in enumerate(paged_products, start=1):
-            message += (
-                f"{idx}. {p['name']} ({p['category']}): {p['price']}$\n"
-                f"   Colors: {', '.join(p.get('colors', []))}\n"
-                f"   {p['image_url']}\n\n"
-            )
+            tool_context.state["search_pagination"] = state
+            tool_context.state["last_search_results"] = compact_results(paged_products, await catalog_version())
 
         return {
             "status": "success",
-            "message": message
+            "message": format_search_page(keyword, paged_products, total_items, page, total_pages)
         }
 
     except Exception as e:
@@ -70,7 +216,7 @@ def get_product_by_keyword(keyword: str, page: int = 1, page_size: int = 5, tool
         }
 
     
-def get_product_details(index: int, tool_context: ToolContext) -> dict:
+async def get_product_details(index: int, tool_context: ToolContext) -> dict:
     """
     Retrieve and display detailed information about a specific product selected by its index.
 
@@ -93,43 +239,29 @@ def get_product_details(index: int, tool_context: ToolContext) -> dict:
     """
 
     try:
-        # Try search results first
-        results = tool_context.state.get("last_search_results")
-
-        if results:
-            source = "search"
-        else:
-            # Fallback to outfit suggestion
-            outfit = tool_context.state.get("last_outfit_suggestion")
-            if outfit:
-                results = [v for v in outfit.values() if v is not None]
-                source = "outfit"
-            else:
-                return {
-                    "status": "failed",
-                    "message": "Please search for products or request an outfit first."
-                }
+        # Search results first, then the outfit suggestion
+        ids, version = selected_ids(tool_context.state)
+        if not ids:
+            return {
+                "status": "failed",
+                "message": "Please search for products or request an outfit first."
+            }
 
-        if index < 1 or index > len(results):
+        if index < 1 or index > len(ids):
             return {
                 "status": "failed",
-                "message": f"Invalid index. Please choose between 1 and {len(results)} based on the displayed list."
+                "message": f"Invalid index. Please choose between 1 and {len(ids)} based on the displayed list."
             }
 
-        product = results[index - 1]
-        message = (
-            f"🎯 --------- {product['name']} ---------\n\n"
-            f"1. 💰 Price: {product['price']}$\n"
-            f"2. 📦 Quantity: {product.get('quantity', 'N/A')}\n"
-            f"3. 🏷️ Category: {product['category']}\n"
-            f"4. 🔢 ID: {product.get('id', 'N/A')}\n"
-            f"5. 📝 Description:\n{product['description']}\n"
-            f"6. 🧵 Style Tags: {product['style_tags']}\n"
-            f"7. ❄️ Season: {product['season']}    "
-            f"8. 🚻 Gender: {product['gender']}\n"
-            f"9. 🎨 Colors: {', '.join(product.get('colors', [])) if isinstance(product.get('colors'), list) else product.get('color', 'N/A')}\n"
-            f"10. Image link: {product['image_url']}"
-        )
+        product = (await resolve_products([ids[index - 1]]))[0]
+        if product is None:
+            return {
+                "status": "failed",
+                "message": "This product is no longer available. Please search again."
+            }
+        message = format_product_details(product)
+        if version is not None and version != await catalog_version():
+            message += "\n\nℹ️ The catalog was updated since this list was shown; details above are current."
 
         return {
             "status": "success",
@@ -143,7 +275,7 @@ def get_product_details(index: int, tool_context: ToolContext) -> dict:
         }
 
 
-def add_to_cart(index: int, quantity: int = 1, tool_context: ToolContext = None) -> dict:
+async def add_to_cart(index: int, quantity: int = 1, tool_context: ToolContext = None) -> dict:
     """
     Add a product to the shopping cart based on its index in the last search results or outfit suggestion.
 
@@ -166,20 +298,23 @@ def add_to_cart(index: int, quantity: int = 1, tool_context: ToolContext = None)
             "status": "failed",
             "message": "No session context found."
         }
-    results = tool_context.state.get("last_search_results") or [
-        v for v in tool_context.state.get("last_outfit_suggestion", {}).values() if isinstance(v, dict)
-    ]
-    if not results or index < 1 or index > len(results):
+    ids, _ = selected_ids(tool_context.state)
+    if not ids or index < 1 or index > len(ids):
         return {
             "status": "failed",
             "message": "Invalid product index."
         }
-    product = results[index - 1]
-    if "id" not in product:
+    if ids[index - 1] is None:
         return {
             "status": "failed",
             "message": "Selected product has no ID. Please try again after searching again."
         }
+    product = (await resolve_products([ids[index - 1]]))[0]
+    if product is None:
+        return {
+            "status": "failed",
+            "message": "This product is no longer available. Please search again."
+        }
 
     cart = tool_context.state.get("cart", [])
 
@@ -192,7 +327,7 @@ def add_to_cart(index: int, quantity: int = 1, tool_context: ToolContext = None)
             "product_id": product["id"],
             "product_name": product["name"],
             "quantity": quantity,
-            "unit_price": product["price"]
+            "unit_price": float(product["price"])
         })
     tool_context.state["cart"] = cart
     return {
@@ -220,24 +355,17 @@ def view_cart(tool_context: ToolContext = None) -> dict:
             "status": "success",
             "message": "Your cart is currently empty."
         }
-    message = "Your cart:\n\n"
-    total = 0
-    for i, item in enumerate(cart, 1):
-        line_total = item["unit_price"] * item["quantity"]
-        total += line_total
-        message += f"{i}. {item["product_name"]} x {item["quantity"]} = {line_total}$\n"
-    message += f"\nTotal: {total}$"
     return {
         "status": "success",
-        "message": message
+        "message": format_cart(cart)
     }
 
-def place_order(customer_name: str, phone: str, comment: str = "", tool_context: ToolContext = None) -> dict:
+async def place_order(customer_name: str, phone: str, comment: str = "", tool_context: ToolContext = None) -> dict:
     """
     Finalize and place an order based on the current contents of the cart.
 
-    For each product in the cart, this function stores the order using `add_order`,
-    then clears the cart from the session context.
+    All cart lines are stored in a single transaction under one order code
+    (see `place_order_with_lines`), then the cart is cleared from the session context.
 
     Args:
         customer_name (str): Name of the customer placing the order.
@@ -256,23 +384,26 @@ def place_order(customer_name: str, phone: str, comment: str = "", tool_context:
             "status": "failed",
             "message": "Your cart is empty."
         }
-    for item in cart:
-        total_price = item["unit_price"] * item["quantity"]
-
-        order_data = {
-            "customer_name": customer_name,
-            "phone": phone,
+    items = [
+        {
             "product_name": item["product_name"],
             "product_id": item["product_id"],
             "quantity": item["quantity"],
             "unit_price": item["unit_price"],
-            "total_price": total_price,
+            "total_price": item["unit_price"] * item["quantity"],
+        }
+        for item in cart
+    ]
+    order_code = await place_order_with_lines(customer_name, phone, items, comment)
+    if order_code is None:
+        return {
+            "status": "failed",
+            "message": "Sorry, your order could not be placed. Your cart has been kept, please try again."
         }
-        add_order(order_data)
     tool_context.state["cart"] = []
     return {
         "status": "success",
-        "message": "Order placed successfully. Thank u for shopping."
+        "message": f"Order {order_code} placed successfully. Thank u for shopping."
     }
 THRESHOLD = 0.4
 
@@ -283,18 +414,24 @@ CATEGORY_MAP = {
     "accessories": ["accessories", "belt", "watch", "bracelet", "hat", "bag", "sunglass", "necklace"]
 }
 
+# Gated categories: (category keywords, prompt words that make them suitable).
+SUITABILITY_GATES = {
+    "swim": (["swim"], ["beach", "pool", "swimming", "sea", "vacation"]),
+    "sleep": (["sleep"], ["sleep", "pajamas", "night", "bed"]),
+    "sport": (["sport", "gym"], ["sport", "exercise", "run", "gym", "training", "fitness"]),
+    "outerwear": (["outerwear", "coat", "jacket"], ["cold", "winter", "windy", "rain", "chilly"]),
+}
+
+def unlocked_gates(prompt: str) -> tuple:
+    """Gated categories the prompt allows; suitability depends on the prompt only through this."""
+    prompt = prompt.lower()
+    return tuple(gate for gate, (_, words) in SUITABILITY_GATES.items() if any(w in prompt for w in words))
+
 def is_contextually_suitable(item, prompt: str) -> bool:
     category = item.get("category", "").lower()
-    prompt = prompt.lower()
-    if "swim" in category and not any(w in prompt for w in ["beach", "pool", "swimming", "sea", "vacation"]):
-        return False
-    if "sleep" in category and not any(w in prompt for w in ["sleep", "pajamas", "night", "bed"]):
-        return False
-    if "sport" in category or "gym" in category:
-        if not any(w in prompt for w in ["sport", "exercise", "run", "gym", "training", "fitness"]):
-            return False
-    if "outerwear" in category or "coat" in category or "jacket" in category:
-        if not any(w in prompt for w in ["cold", "winter", "windy", "rain", "chilly"]):
+    unlocked = unlocked_gates(prompt)
+    for gate, (categories, _) in SUITABILITY_GATES.items():
+        if gate not in unlocked and any(c in category for c in categories):
             return False
     return True
 
@@ -302,7 +439,86 @@ def match_category(item, keywords):
     cat = item.get("category", "").lower()
     return any(kw in cat for kw in keywords)
 
-def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
+# Candidates fetched per slot; accessories keeps a few more since up to 3 are shown.
+SLOT_TOP_K = {"topwear": 5, "bottomwear": 5, "footwear": 5, "accessories": 10}
+
+def slot_categories(slot: str) -> list:
+    """Catalog categories that belong to an outfit slot, or None if the catalog is unavailable."""
+    try:
+        categories = get_family_index().categories()
+    except Exception as e:
+        print(f"Could not load catalog categories: {str(e)}")
+        return None
+    return sorted(c for c in categories if match_category({"category": c}, CATEGORY_MAP[slot]))
+
+async def query_slot(store, embedding, slot: str, top_k: int = None) -> list:
+    """Nearest neighbours restricted to one slot's categories, best first."""
+    top_k = top_k or SLOT_TOP_K.get(slot, 5)
+    categories = await run_blocking("db", slot_categories, slot)
+    if categories == []:
+        return []
+    if categories is None:
+        # No category list to filter on: over-fetch and match locally.
+        result = await store.aquery(vector=embedding, top_k=top_k * 10, include_metadata=True)
+    else:
+        result = await store.aquery(vector=embedding, top_k=top_k, filter={"category": {"$in": categories}},
+                                    include_metadata=True)
+    return [m for m in result["matches"] if match_category(m["metadata"], CATEGORY_MAP[slot])][:top_k]
+
+async def query_outfit_slots(store, embedding, slots=None) -> dict:
+    """Run one filtered query per slot concurrently; latency is the slowest single query."""
+    slots = slots or list(SLOT_TOP_K)
+    results = await asyncio.gather(*(query_slot(store, embedding, slot) for slot in slots))
+    return dict(zip(slots, results))
+
+def pick_slot_items(matches: list, prompt: str, limit: int, excluded: list) -> list:
+    """
+    Pick up to `limit` suitable items for a slot.
+
+    Matches above THRESHOLD come first; weaker matches only fill a slot that
+    would otherwise stay empty. Unsuitable items are appended to `excluded`.
+    """
+    strong = group_into_families([m["metadata"] for m in matches if m["score"] >= THRESHOLD])
+    weak = group_into_families([m["metadata"] for m in matches if m["score"] < THRESHOLD])
+    picked = []
+    seen = set()
+    for tier in (strong, weak):
+        if picked:
+            break
+        for item in tier:
+            if item["id"] in seen:
+                continue
+            seen.add(item["id"])
+            if not is_contextually_suitable(item, prompt):
+                excluded.append(item)
+                continue
+            picked.append(item)
+            if len(picked) == limit:
+                return picked
+    return picked
+
+async def build_outfit(store, embedding, prompt: str):
+    """Fill every slot from its own filtered query; None if nothing suitable was found."""
+    slot_matches = await query_outfit_slots(store, embedding)
+
+    outfit = {
+        "topwear": None,
+        "bottomwear": None,
+        "footwear": None,
+        "accessories": [],
+        "others": []
+    }
+
+    for slot in ("topwear", "bottomwear", "footwear"):
+        picked = pick_slot_items(slot_matches[slot], prompt, 1, outfit["others"])
+        outfit[slot] = picked[0] if picked else None
+    outfit["accessories"] = pick_slot_items(slot_matches["accessories"], prompt, 3, outfit["others"])
+
+    if not any(outfit[slot] for slot in ("topwear", "bottomwear", "footwear", "accessories")):
+        return None
+    return outfit
+
+async def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
     """
     Generate a complete outfit suggestion based on the user's style prompt and context.
 
@@ -318,7 +534,7 @@ def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
 
     Excluded items (e.g. swimwear in winter) are listed separately as "others".
 
-    The result is also stored in session state (`tool_context.state["last_outfit_suggestion"]`) for later use
+    The product IDs of the result are stored in session state (`tool_context.state["last_outfit_suggestion"]`) for later use
     in tools like `get_product_details`, `change_outfit_part`, or `add_to_cart`.
 
     Args:
@@ -360,54 +576,33 @@ def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
     """
 
     try:
-        index = get_pinecone_index()
+        store = get_vector_store()
         # Get session state
         season = tool_context.state.get("season", "")
         gender = tool_context.state.get("gender", "")
         style_tags = tool_context.state.get("style_tags", "")
 
         # Get embedding
-        embedding = get_product_embedding(prompt, season, gender, style_tags, "")
-        matches = index.query(vector=embedding, top_k=50, include_metadata=True)
-        filtered = [m for m in matches["matches"] if m["score"] >= THRESHOLD]
-
-        if not filtered:
-            return {
-                "status": "failed",
-                "message": "Sorry, I couldn't find any suitable items for that style."
-            }
-
-        items = [m["metadata"] for m in filtered]
-        grouped = group_variants(items)
-
-        # Create empty outfit
-        outfit = {
-            "topwear": None,
-            "bottomwear": None,
-            "footwear": None,
-            "accessories": [],
-            "others": []
-        }
-
-        for item in grouped:
-            if not is_contextually_suitable(item, prompt):
-                outfit["others"].append(item)
-                continue
-
-            cat = item.get("category", "").lower()
-            if not outfit["topwear"] and match_category(item, CATEGORY_MAP["topwear"]):
-                outfit["topwear"] = item
-            elif not outfit["bottomwear"] and match_category(item, CATEGORY_MAP["bottomwear"]):
-                outfit["bottomwear"] = item
-            elif not outfit["footwear"] and match_category(item, CATEGORY_MAP["footwear"]):
-                outfit["footwear"] = item
-            elif match_category(item, CATEGORY_MAP["accessories"]):
-                outfit["accessories"].append(item)
-            else:
-                outfit["others"].append(item)
+        embedding = await aget_product_embedding(prompt, season, gender, style_tags, "")
+        # Near-identical prompts in the same session context reuse a recent outfit, as long as
+        # they allow the same gated categories (the cached picks and "others" depend on them).
+        cache = get_outfit_cache()
+        context = (season, gender, style_tags, unlocked_gates(prompt))
+        # Read once, before building: an outfit built across a product write is tagged with the older version.
+        version = await catalog_version()
+        outfit = cache.get(embedding, context, version)[0] if cache is not None else None
+        if outfit is None:
+            outfit = await build_outfit(store, embedding, prompt)
+            if outfit is None:
+                return {
+                    "status": "failed",
+                    "message": "Sorry, I couldn't find any suitable items for that style."
+                }
+            if cache is not None:
+                cache.put(embedding, outfit, context, version)
 
         # Write advising resuls in session state
-        tool_context.state["last_outfit_suggestion"] = outfit
+        tool_context.state["last_outfit_suggestion"] = compact_outfit(outfit, version)
 
         # write style (if can guess from prompt)
         if "casual" in prompt.lower():
@@ -415,25 +610,7 @@ def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
         elif "formal" in prompt.lower():
             tool_context.state["style_tags"] = "formal"
 
-        def fmt(label, item):
-            if not item:
-                return f"{label}: ❌ Not found\n"
-            return f"{label}: {item['name']} - {item['price']}$\n{item['image_url']}\n"
-
-        message = f"👗 Outfit suggestion for: **{prompt}**\n\n"
-        message += fmt("👕 Topwear", outfit["topwear"])
-        message += fmt("👖 Bottomwear", outfit["bottomwear"])
-        message += fmt("👟 Footwear", outfit["footwear"])
-
-        if outfit["accessories"]:
-            message += "\n👜 Accessories:\n"
-            for acc in outfit["accessories"][:3]:
-                message += f" - {acc['name']} ({acc['price']}$)\n{acc['image_url']}\n"
-        else:
-            message += "\n👜 Accessories: Not found.\n"
-
-        if outfit["others"]:
-            message += f"\n⚠️ {len(outfit['others'])} item(s) were excluded due to style mismatch."
+        message = format_outfit(prompt, outfit)
 
         return {
             "status": "success",
@@ -446,7 +623,7 @@ def advise_outfit(prompt: str, tool_context: ToolContext = None) -> dict:
             "message": f"Something went wrong while generating outfit: {str(e)}"
         }
 
-def change_outfit_part(part: str, prompt: str, tool_context: ToolContext = None) -> dict:
+async def change_outfit_part(part: str, prompt: str, tool_context: ToolContext = None) -> dict:
     """
     """
     try:
@@ -460,32 +637,29 @@ def change_outfit_part(part: str, prompt: str, tool_context: ToolContext = None)
         gender = tool_context.state.get("gender", "")
         style_tags = tool_context.state.get("style_tags", "")
 
-        index = get_pinecone_index()
-        embedding = get_product_embedding(prompt, season, gender, style_tags, "")
-        matches = index.query(vector=embedding, top_k=30, include_metadat=True)
-
-        filtered = [m["metadata"] for m in matches["matches"] if m["score"] >= THRESHOLD]
-        grouped = group_variants(filtered)
-
-        found = None
         if part not in CATEGORY_MAP:
             return {
                 "status": "error",
                 "message": f"Unsupported outfit part: {part}"
             }
-        for item in grouped:
-            if match_category(item, CATEGORY_MAP[part]):
-                found = item
-                break
+
+        store = get_vector_store()
+        embedding = await aget_product_embedding(prompt, season, gender, style_tags, "")
+        matches = await query_slot(store, embedding, part)
+
+        filtered = [m["metadata"] for m in matches if m["score"] >= THRESHOLD]
+        grouped = await run_blocking("db", group_into_families, filtered)
+        found = grouped[0] if grouped else None
         if not found:
             return {
                 "status": "error",
                 "message": f"Sorry, couldn't found a suitable alternative for {part}."
             }
         if part == "accessories":
-            outfit["accessories"] = [found]
+            outfit["accessories"] = [_product_ref(found)]
         else:
-            outfit[part] = found
+            outfit[part] = _product_ref(found)
+        outfit["version"] = await catalog_version()
         
         tool_context.state["last_outfit_suggestion"] = outfit
 
@@ -500,12 +674,12 @@ def change_outfit_part(part: str, prompt: str, tool_context: ToolContext = None)
         }
     
 
-get_product_by_keyword = FunctionTool(func=get_product_by_keyword)
-get_product_details = FunctionTool(func=get_product_details)
-add_to_cart = FunctionTool(func=add_to_cart)
-view_cart = FunctionTool(func=view_cart)
-place_order = FunctionTool(func=place_order)
-advise_outfit = FunctionTool(func=advise_outfit)
-change_outfit_part = FunctionTool(func=change_outfit_part)
+get_product_by_keyword = FunctionTool(func=traced_tool(get_product_by_keyword))
+get_product_details = FunctionTool(func=traced_tool(get_product_details))
+add_to_cart = FunctionTool(func=traced_tool(add_to_cart))
+view_cart = FunctionTool(func=traced_tool(view_cart))
+place_order = FunctionTool(func=traced_tool(place_order))
+advise_outfit = FunctionTool(func=traced_tool(advise_outfit))
+change_outfit_part = FunctionTool(func=traced_tool(change_outfit_part))
 
 customer_tools = [get_product_by_keyword, get_product_details, add_to_cart, view_cart, place_order, advise_outfit]
\ No newline at end of file
@@ -1,15 +1,25 @@
-from shared.db.queries import add_product, remove_product, get_all_product, update_product, get_weekly_orders_query, get_weekly_feedbacks_query
-from shared.pinecone.index_product_vectors import index_product_in_pinecone
-import pandas as pd
-import os
+from shared.db.async_queries import add_product, remove_product, get_product_by_id, update_product, update_vector_ids
+from shared.db.async_queries import export_products, sales_report
+from shared.db.queries import convert_drive_link_to_direct
+from shared.pinecone.index_product_vectors import aindex_product_in_pinecone, adelete_product_vectors
+from shared.pinecone.bulk_import import aimport_products
+from shared.pinecone.embed_utils import product_content_hash
+from shared.vector_store.client import get_vector_store
+from shared.db.db_utils import get_current_week_range
+from shared.tracing import traced_tool
 from google.adk.tools import FunctionTool
-import datetime
 from google.adk.tools import ToolContext
 
-def get_all_product_and_export() -> dict:
+async def get_all_product_and_export(file_format: str = "xlsx", compress: bool = False) -> dict:
     """
-    Read all products that are currently in table "products"
-    and exports them into an Excel file, the file has format name: "<YYYY-MM-DD_HH-MM-SS>_product.xlsx".
+    Read all products that are currently in table "products" and export them into a file
+    named "<YYYY-MM-DD_HH-MM-SS>_products.<ext>" in the "exports" folder.
+
+    Rows are streamed from the database in chunks, so exporting a large catalog does not load it into memory.
+
+    Args:
+        file_format (str): "xlsx" (default), "csv" or "parquet".
+        compress (bool): Compress the output with zstd (csv and parquet only).
 
     Returns:
         dict: {
@@ -18,26 +28,22 @@ def get_all_product_and_export() -> dict:
         }
     """
     try:
-        products = get_all_product()
-        if not products:
+        result = await export_products(
+            file_format=file_format.lower(),
+            compression="zstd" if compress else None,
+        )
+        if not result["rows"]:
             return {
                 "status": "error",
                 "message": "No product found in table 'products'."
             }
-        
-        df = pd.DataFrame(products)
-
-        export_dir = "exports"
-        os.makedirs(export_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = f"{timestamp}_products.xlsx"
-        filepath = os.path.join(export_dir, filename)
 
-        df.to_excel(filepath, index=False)
         return {
             "status": "success",
-            "message": f"Exported {len(df)} products to file: {filepath}"
+            "message": (
+                f"Exported {result['rows']} products to file: {result['path']} "
+                f"({result['rows_per_second']} rows/s)"
+            )
         }
     except Exception as e:
         return {
@@ -46,10 +52,10 @@ def get_all_product_and_export() -> dict:
         }
 
 
-def add_product_with_vector(product_data: dict) -> str:
+async def add_product_with_vector(product_data: dict) -> str:
     """
-    Collects and processes product information provided by the manager, generates a vector embedding 
-    for style matching using Pinecone, and stores both metadata and the vector ID into the database.
+    Collects and processes product information provided by the manager, stores it in the database,
+    then generates a vector embedding for style matching and records its vector ID on the product.
 
     Args:
         product_data (dict): A dictionary containing product details including:
@@ -68,17 +74,69 @@ def add_product_with_vector(product_data: dict) -> str:
             or describing any error that occurred.
     """
     try:
-        vector_id = index_product_in_pinecone(product_data)
-
-        product_data['vector_id'] = vector_id
-
-        add_product(product_data)
+        product_id = await add_product(product_data)
+        if product_id is None:
+            return "Failed to add product: the product could not be saved."
+
+        # The vector id is derived from the product id, so the row has to exist first.
+        vector_id = await aindex_product_in_pinecone({
+            **product_data,
+            "id": product_id,
+            "image_url": convert_drive_link_to_direct(product_data["img_url"]),
+        })
+        await update_vector_ids({product_id: vector_id}, {product_id: product_content_hash(product_data)})
 
         return "Product has been added and indexed successfully."
     except Exception as e:
         return f"Failed to add product: {str(e)}"
 
-def update_exisiting_product(product_id: str, updated_data: dict) -> str:
+async def import_products_from_file(file_path: str, dry_run: bool = False) -> dict:
+    """
+    Import many products at once from a CSV or XLSX spreadsheet and index them for style search.
+
+    The first row must be a header with the columns name, category, price, description, style_tags,
+    color, season, gender and img_url (or image_url). Rows are validated, inserted and indexed in
+    batches; rows that are invalid or fail are reported and skipped without stopping the import.
+
+    Args:
+        file_path (str): Path of the .csv, .csv.zst or .xlsx file on the server.
+        dry_run (bool): Only validate the file and report errors, without saving anything.
+
+    Returns:
+        dict: {
+            "status": "success" | "error",
+            "message": str,
+            "errors": list of {"row", "name", "error"} (first 50)
+        }
+    """
+    try:
+        report = await aimport_products(file_path, dry_run=dry_run)
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to import products: {str(e)}"
+        }
+
+    succeeded = report["valid"] if dry_run else report["imported"]
+    if dry_run:
+        message = f"Validated {report['valid']} rows; {report['failed']} rows have errors."
+    else:
+        message = (
+            f"Imported {report['imported']} products ({report['indexed']} indexed) "
+            f"in {report['elapsed_seconds']}s; {report['failed']} rows failed."
+        )
+    for error in report["errors"][:10]:
+        message += f"\n - Row {error['row']} ({error['name'] or 'no name'}): {error['error']}"
+    if report["failed"] > 10:
+        message += f"\n ... and {report['failed'] - 10} more."
+
+    return {
+        "status": "success" if succeeded or not report["failed"] else "error",
+        "message": message,
+        "errors": report["errors"][:50],
+    }
+
+async def update_exisiting_product(product_id: str, updated_data: dict) -> str:
     """
     Update an existing product with new data.
 
@@ -90,25 +148,37 @@ def update_exisiting_product(product_id: str, updated_data: dict) -> str:
         Message (str).
     """
     try:
-        embedding_fields = {"name", "description", "style_tags", "category", "season"}
+        # Fields stored in the vector (embedded text or metadata)
+        vector_fields = {"name", "description", "style_tags", "category", "season",
+                         "gender", "price", "color", "image_url"}
 
-        if embedding_fields.intersection(updated_data.keys()):
-            all_products = get_all_product()
-            existing_product = next((p for p in all_products if p["id"] == product_id), None)
+        if vector_fields.intersection(updated_data.keys()):
+            rows = await get_product_by_id(product_id)
 
-            if not existing_product:
+            if not rows:
                 return f"Product with ID: {product_id} not found."
+            existing_product = rows[0]
             full_product = {**existing_product, **updated_data}
 
-            new_vector_id = index_product_in_pinecone(full_product)
-            updated_data['vector_id'] = new_vector_id
-        update_product(product_id, updated_data)
+            # The vector and its content hash follow the row, so only touch them once the update committed.
+            if not await update_product(product_id, updated_data):
+                return f"Failed to update product: {product_id} was not updated."
+            # Same id every time: the vector is overwritten in place.
+            vector_id = await aindex_product_in_pinecone(full_product)
+            old_vector_id = existing_product.get("vector_id")
+            if old_vector_id and old_vector_id != vector_id:
+                # Drop the random id written before vector ids became stable.
+                await get_vector_store().adelete([old_vector_id])
+            await update_vector_ids({existing_product["id"]: vector_id},
+                                    {existing_product["id"]: product_content_hash(full_product)})
+        elif not await update_product(product_id, updated_data):
+            return f"Failed to update product: {product_id} was not updated."
         return "Product has been updated successfully."
     except Exception as e:
         return f"Failed to update product: {str(e)}"
 
     
-def remove_a_product(product_id: str) -> dict:
+async def remove_a_product(product_id: str) -> dict:
     """
     Remove a product from the database by its ID, including metadata and vector.
 
@@ -126,8 +196,8 @@ def remove_a_product(product_id: str) -> dict:
         }
     """
     try:
-        products = get_all_product()
-        matched = next((p for p in products if str(p["id"]) == str(product_id)), None)
+        rows = await get_product_by_id(product_id)
+        matched = rows[0] if rows else None
 
         if not matched:
             return {
@@ -135,9 +205,10 @@ def remove_a_product(product_id: str) -> dict:
                 "message": f"No product with ID {product_id} found."
             }
 
-        success = remove_product(product_id)
+        success = await remove_product(product_id)
 
         if success:
+            await adelete_product_vectors(matched["id"], matched.get("vector_id"))
             return {
                 "status": "success",
                 "message": f"✅ Product {product_id} removed successfully."
@@ -155,40 +226,70 @@ def remove_a_product(product_id: str) -> dict:
         }
 
     
-def generate_weekly_report(tool_context: ToolContext=None) -> dict:
+async def generate_weekly_report(start_date: str = "", end_date: str = "", top_n: int = 5, tool_context: ToolContext=None) -> dict:
     """
-    Export a weekly report
+    Generate a sales report (revenue, units sold, order count, top products and per-day breakdown).
+
+    Defaults to the current week (Monday to Sunday) when no dates are given.
+
+    Args:
+        start_date (str, optional): First day of the report, "YYYY-MM-DD".
+        end_date (str, optional): Last day of the report, "YYYY-MM-DD".
+        top_n (int, optional): Number of best-selling products to list. Defaults to 5.
+
+    Returns:
+        dict: {
+            "status": "success" | "error",
+            "message": Formatted report,
+            "report": Structured report data
+        }
     """
     try:
-        revenue = 0
-        total_sold_unit = 0
-        week_orders = get_weekly_orders_query()
-        products = get_all_product()
-        week_feedbacks = get_weekly_feedbacks_query()
+        week_start, week_end = get_current_week_range()
+        report = await sales_report(start_date or week_start, end_date or week_end, top_n=top_n)
+
+        message = (
+            f"📊 Sales report {report['start_date']} → {report['end_date']}\n\n"
+            f"💰 Revenue: {report['revenue']}$\n"
+            f"📦 Units sold: {report['units_sold']}\n"
+            f"🧾 Orders: {report['order_count']}\n"
+        )
+        if report["feedback_count"] is not None:
+            message += f"💬 Feedbacks: {report['feedback_count']}\n"
+
+        if report["top_products"]:
+            message += "\n🏆 Top products:\n"
+            for idx, p in enumerate(report["top_products"], start=1):
+                message += f"{idx}. {p['product_name']} (ID {p['product_id']}): {p['units_sold']} sold, {p['revenue']}$\n"
+
+        if report["daily"]:
+            message += "\n📅 Per day:\n"
+            for day in report["daily"]:
+                message += f" - {day['date']}: {day['revenue']}$ | {day['units_sold']} units | {day['order_count']} orders\n"
+        else:
+            message += "\nNo orders in this period."
 
-        if not week_orders or not products or not week_feedbacks:
-            return {
-                "status": "error",
-                "message": "Can not found any of information. Please check!"
-            }
-        for total_price in week_orders["total_price"]:
-            revenue += total_price
-        
-        for total_unit in week_orders["quantity"]:
-            total_sold_unit += total_unit
-        
-        
+        return {
+            "status": "success",
+            "message": message,
+            "report": report
+        }
     except Exception as e:
-        pass
+        return {
+            "status": "error",
+            "message": f"Failed to generate report: {str(e)}"
+        }
 
 
 def read_and_process_policy(): pass
 
 
-get_all_product_and_export = FunctionTool(func=get_all_product_and_export)
-add_product_with_vector = FunctionTool(func=add_product_with_vector)
-update_exisiting_product = FunctionTool(func=update_exisiting_product)
-remove_a_product = FunctionTool(func=remove_a_product)
+get_all_product_and_export = FunctionTool(func=traced_tool(get_all_product_and_export))
+add_product_with_vector = FunctionTool(func=traced_tool(add_product_with_vector))
+import_products_from_file = FunctionTool(func=traced_tool(import_products_from_file))
+update_exisiting_product = FunctionTool(func=traced_tool(update_exisiting_product))
+remove_a_product = FunctionTool(func=traced_tool(remove_a_product))
+generate_weekly_report = FunctionTool(func=traced_tool(generate_weekly_report))
 
     
-manager_tools = [add_product_with_vector, get_all_product_and_export, update_exisiting_product, remove_a_product]
\ No newline at end of file
+manager_tools = [add_product_with_vector, import_products_from_file, get_all_product_and_export, update_exisiting_product, remove_a_product, generate_weekly_report]
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+Micro-benchmarks for the pure-Python hot paths, on synthetic catalogs.
+
+Runs offline: no database, vector store or model is needed. Each benchmark is
+timed with `timeit` (best of `--repeat` rounds) and then run once more to
+record allocations (memory blocks still held by the return value, via
+`sys.getallocatedblocks`) and peak memory (`tracemalloc`).
+
+    python -m benchmarks.hot_paths                        # 1k, 100k, 1M rows
+    python -m benchmarks.hot_paths --sizes 1000 --save local
+    python -m benchmarks.hot_paths --compare local        # exit 1 on regression
+
+Baselines are JSON files in benchmarks/baselines/<name>.json.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from shared.db.db_utils import group_variants
+from shared.pinecone.embed_utils import compose_product_text, MODEL_NAME
+from shared.pinecone.embedding_cache import cache_key
+from agent.tools.utils import paginate
+from agent.tools.customer_tools.customer import (
+    is_contextually_suitable,
+    match_category,
+    CATEGORY_MAP,
+    format_search_page,
+    format_product_details,
+    format_cart,
+    format_outfit,
+)
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+_CATEGORIES = ["T-Shirts", "Shirts", "Blouses", "Tank Tops", "Jeans", "Pants", "Skirts", "Shorts",
+               "Sneakers", "Boots", "Heels", "Sandals", "Bags", "Watches", "Hats", "Sunglasses",
+               "Swimwear", "Sleepwear", "Sportswear", "Jackets", "Coats"]
+_COLORS = ["black", "white", "red", "blue", "green", "beige", "pink", "grey"]
+_SEASONS = ["spring", "summer", "autumn", "winter", "all"]
+_GENDERS = ["male", "female", "unisex"]
+_TAGS = ["casual", "formal", "sporty", "vintage", "streetwear", "elegant", "minimal", "boho"]
+_WORDS = ["soft", "cotton", "linen", "slim", "relaxed", "classic", "lightweight", "breathable",
+          "tailored", "everyday", "premium", "stretch", "warm", "cropped", "oversized"]
+_PROMPTS = [
+    "a casual look for a summer picnic",
+    "something warm for a chilly winter trip",
+    "an outfit for the gym and a morning run",
+    "beachwear for a pool party on vacation",
+    "a classy outfit for a formal dinner",
+]
+
+
+def synthetic_catalog(size: int, seed: int = 42) -> list:
+    """`size` product rows in families of 1-4 color variants, deterministic for a given seed."""
+    rng = random.Random(seed)
+    rows = []
+    family = 0
+    while len(rows) < size:
+        family += 1
+        category = rng.choice(_CATEGORIES)
+        base = {
+            "name": f"{rng.choice(_WORDS).title()} {category[:-1] if category.endswith('s') else category} {family}",
+            "category": category,
+            "description": " ".join(rng.choices(_WORDS, k=18)),
+            "style_tags": ", ".join(rng.sample(_TAGS, 2)),
+            "season": rng.choice(_SEASONS),
+            "gender": rng.choice(_GENDERS),
+            "price": round(rng.uniform(5, 300), 2),
+            "image_url": f"https://drive.google.com/uc?export=view&id=img{family:08d}",
+        }
+        for color in rng.sample(_COLORS, rng.randint(1, 4)):
+            if len(rows) == size:
+                break
+            rows.append({**base, "id": len(rows) + 1, "color": color})
+    return rows
+
+
+def _sample(catalog: list, n: int, seed: int = 7) -> list:
+    return random.Random(seed).sample(catalog, min(n, len(catalog)))
+
+
+def build_benchmarks(catalog: list) -> dict:
+    """name -> (callable, items processed per call)."""
+    size = len(catalog)
+    grouped_page = group_variants(catalog[:40])[:10]
+    outfit = {
+        "topwear": grouped_page[0],
+        "bottomwear": grouped_page[1],
+        "footwear": grouped_page[2],
+        "accessories": grouped_page[3:6],
+        "others": grouped_page[6:8],
+    }
+    cart = [
+        {"product_id": p["id"], "product_name": p["name"], "quantity": 2, "unit_price": p["price"]}
+        for p in grouped_page
+    ]
+    prompts = _PROMPTS
+    keywords = CATEGORY_MAP["footwear"]
+    texts_sample = _sample(catalog, 1_000)
+    middle_page = max(1, size // 10 // 2)
+
+    def run_suitable():
+        for i, item in enumerate(catalog):
+            is_contextually_suitable(item, prompts[i % len(prompts)])
+
+    def run_match():
+        for item in catalog:
+            match_category(item, keywords)
+
+    def run_compose():
+        for p in texts_sample:
+            compose_product_text(p["name"], p["description"], p["style_tags"], p["category"], p["season"])
+
+    def run_compose_and_key():
+        for p in texts_sample:
+            text = compose_product_text(p["name"], p["description"], p["style_tags"], p["category"], p["season"])
+            cache_key(MODEL_NAME, text)
+
+    return {
+        "group_variants": (lambda: group_variants(catalog), size),
+        "paginate": (lambda: paginate(catalog, page=middle_page, page_size=10), 1),
+        "is_contextually_suitable": (run_suitable, size),
+        "match_category": (run_match, size),
+        "compose_product_text": (run_compose, len(texts_sample)),
+        "compose_and_cache_key": (run_compose_and_key, len(texts_sample)),
+        "format_search_page": (lambda: format_search_page("summer dress", grouped_page, size, 3, size // 10), 1),
+        "format_product_details": (lambda: format_product_details(grouped_page[0]), 1),
+        "format_outfit": (lambda: format_outfit(prompts[0], outfit), 1),
+        "format_cart": (lambda: format_cart(cart), 1),
+    }
+
+
+def model_benchmark(catalog: list):
+    """Optional: real MiniLM encoding (needs the model weights locally)."""
+    from shared.pinecone.embed_utils import get_model
+    model = get_model()
+    texts = [
+        compose_product_text(p["name"], p["description"], p["style_tags"], p["category"], p["season"])
+        for p in _sample(catalog, 64)
+    ]
+    return (lambda: model.encode(texts, batch_size=64), len(texts))
+
+
+def measure(func, items: int, repeat: int = 3) -> dict:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    result = func()
+    allocations = max(0, sys.getallocatedblocks() - blocks_before)
+    del result
+    gc.collect()
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "seconds_per_op": best,
+        "ops_per_sec": round(1 / best, 2) if best else None,
+        "items_per_sec": round(items / best, 1) if best else None,
+        "allocations": allocations,
+        "peak_memory_bytes": peak,
+    }
+
+
+def run(sizes, repeat: int = 3, only=None, with_model: bool = False, seed: int = 42) -> dict:
+    results = {}
+    for size in sizes:
+        catalog = synthetic_catalog(size, seed=seed)
+        benchmarks = build_benchmarks(catalog)
+        if with_model:
+            benchmarks["model_encode"] = model_benchmark(catalog)
+        for name, (func, items) in benchmarks.items():
+            if only and name not in only:
+                continue
+            result = measure(func, items, repeat=repeat)
+            results[f"{name}@{size}"] = result
+            print(f"{name:<26} {size:>9,} rows  {result['ops_per_sec']:>12,.2f} ops/s  "
+                  f"{result['allocations']:>9,} allocs  {result['peak_memory_bytes'] / 1024:>10,.1f} KiB peak")
+        del catalog, benchmarks
+        gc.collect()
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def save_baseline(report: dict, name: str) -> str:
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(report: dict, baseline: dict, tolerance: float = 0.20) -> list:
+    """Benchmarks that got slower (ops/sec) or hungrier (peak memory) than `tolerance` allows."""
+    regressions = []
+    for key, current in report["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        if previous["ops_per_sec"] and current["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{key}: {previous['ops_per_sec']:,.2f} -> {current['ops_per_sec']:,.2f} ops/s")
+        if previous["peak_memory_bytes"] and current["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + tolerance):
+            regressions.append(f"{key}: peak {previous['peak_memory_bytes']:,} -> {current['peak_memory_bytes']:,} bytes")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for hot pure-Python paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="synthetic catalog sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timing rounds per benchmark (best is kept)")
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--with-model", action="store_true", help="also time real model encoding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", metavar="NAME", help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="compare against benchmarks/baselines/NAME.json")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="allowed slowdown before flagging (0.20 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, repeat=args.repeat, only=args.only, with_model=args.with_model, seed=args.seed)
+
+    exit_code = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json"), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against '{args.compare}':")
+            for line in regressions:
+                print(f" - {line}")
+            exit_code = 1
+        else:
+            print(f"\n✅ No regressions against '{args.compare}'.")
+    if args.save:
+        print(f"Saved baseline: {save_baseline(report, args.save)}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Async counterparts of the query layer for use inside the agent's event loop.
+
+mysql-connector is a blocking driver, so each call runs the synchronous
+function from `shared.db.queries` on the bounded "db" executor. Signatures
+and return values are the same as the synchronous versions.
+"""
+from shared.db import queries
+from shared.db import reports
+from shared.db import export
+from shared.executors import run_blocking
+
+
+async def search_families_page(keyword: str, page_size: int = 10, cursor: str = None) -> dict:
+    return await run_blocking("db", queries.search_families_page, keyword, page_size, cursor)
+
+
+async def count_families_by_keyword(keyword: str) -> int:
+    return await run_blocking("db", queries.count_families_by_keyword, keyword)
+
+
+async def catalog_version() -> str:
+    return await run_blocking("db", queries.catalog_version)
+
+
+async def get_product_by_id(product_id: str):
+    return await run_blocking("db", queries.get_product_by_id, product_id)
+
+
+async def get_products_by_ids(product_ids: list) -> list:
+    return await run_blocking("db", queries.get_products_by_ids, product_ids)
+
+
+async def add_product(product_data: dict):
+    return await run_blocking("db", queries.add_product, product_data)
+
+
+async def update_product(product_id: str, updated_data: dict) -> bool:
+    return await run_blocking("db", queries.update_product, product_id, updated_data)
+
+
+async def remove_product(product_id: str) -> bool:
+    return await run_blocking("db", queries.remove_product, product_id)
+
+
+async def update_vector_ids(vector_ids: dict, content_hashes: dict = None) -> int:
+    return await run_blocking("db", queries.update_vector_ids, vector_ids, content_hashes)
+
+
+async def place_order_with_lines(customer_name: str, phone: str, items: list, comment: str = ""):
+    return await run_blocking("db", queries.place_order_with_lines, customer_name, phone, items, comment)
+
+
+async def sales_report(start_date, end_date, top_n: int = 5, use_rollups: bool = True) -> dict:
+    return await run_blocking("db", reports.sales_report, start_date, end_date, top_n, use_rollups)
+
+
+async def export_products(file_format: str = "xlsx", compression: str = None, chunk_size: int = 1000,
+                          export_dir: str = "exports") -> dict:
+    return await run_blocking("db", export.export_products, file_format, compression, chunk_size, export_dir)
@@ -1,13 +1,303 @@
 import mysql.connector
 from dotenv import load_dotenv
+from contextlib import contextmanager
+from collections import deque
+import threading
+import time
 import os
 
 load_dotenv()
 
-def get_connection():
+POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "10"))        # max seconds to wait for a free connection
+POOL_RECYCLE = float(os.getenv("MYSQL_POOL_RECYCLE", "3600"))      # close connections older than this
+POOL_IDLE_TIMEOUT = float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", "300"))  # ping connections idle longer than this
+
+
+def _connect():
     return mysql.connector.connect(
         host=os.getenv("MYSQL_HOST", 'localhost'),
         user=os.getenv("MYSQL_USER", 'root'),
         password=os.getenv("MYSQL_PASSWORD",''),
         database=os.getenv("MYSQL_DATABASE", "fashion_store")
-    )
\ No newline at end of file
+    )
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class _PooledEntry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of MySQL connections.
+
+    Connections are created lazily up to `size`. On checkout a connection is
+    recycled if it is older than `recycle` seconds, and pinged if it has been
+    idle longer than `idle_timeout` seconds; broken connections are replaced.
+    When every connection is in use, callers wait up to `timeout` seconds.
+    """
+
+    def __init__(self, size=POOL_SIZE, timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, factory=_connect):
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self._factory = factory
+        self._idle = deque()
+        self._in_use = 0
+        self._created = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "exhaustion_events": 0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+        }
+
+    def _is_healthy(self, entry: _PooledEntry) -> bool:
+        # Called without the pool lock held: the ping is a network round trip.
+        now = time.monotonic()
+        if now - entry.created_at > self.recycle:
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+            return False
+        if now - entry.last_used > self.idle_timeout:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                return False
+        return True
+
+    def _discard(self, entry: _PooledEntry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        exhausted = False
+
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+
+                    if self._created < self.size:
+                        # Reserve the slot, then connect outside the lock.
+                        self._created += 1
+                        break
+
+                    if not exhausted:
+                        exhausted = True
+                        self._stats["exhaustion_events"] += 1
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolExhaustedError(
+                            f"No MySQL connection available after {self.timeout}s (pool size {self.size})."
+                        )
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                break
+            # The popped entry keeps its slot while it is checked outside the lock.
+            if self._is_healthy(entry):
+                with self._cond:
+                    return self._checkout(entry, start)
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            self._discard(entry)
+
+        try:
+            entry = _PooledEntry(self._factory())
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats["connections_created"] += 1
+            return self._checkout(entry, start)
+
+    def _checkout(self, entry: _PooledEntry, start: float):
+        waited = time.perf_counter() - start
+        self._in_use += 1
+        self._stats["checkouts"] += 1
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return entry
+
+    def release(self, entry: _PooledEntry, broken: bool = False):
+        if not broken:
+            try:
+                # Never hand an open transaction to the next caller.
+                if entry.conn.in_transaction:
+                    entry.conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._created -= 1
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+        if broken:
+            self._discard(entry)
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self) -> dict:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                **self._stats,
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "open": self._created,
+                "wait_time_avg": self._stats["wait_time_total"] / checkouts if checkouts else 0.0,
+            }
+
+
+_BROKEN_LINK_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+
+class _PooledCursor:
+    """Cursor proxy that flags its connection as broken when a statement loses the link."""
+
+    def __init__(self, owner: "PooledConnection", cursor):
+        self._owner = owner
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except _BROKEN_LINK_ERRORS:
+            # Callers usually catch and log query errors themselves, so record it here.
+            self._owner._broken = True
+            raise
+
+    def execute(self, *args, **kwargs):
+        return self._call(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._call(self._cursor.executemany, *args, **kwargs)
+
+    def fetchone(self):
+        return self._call(self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._call(self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._call(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled connection; `close()` returns it to the pool.
+
+    A connection whose statements failed with a lost-link error is discarded on
+    close instead of being handed to the next caller.
+    """
+
+    def __init__(self, pool: ConnectionPool, entry: _PooledEntry):
+        self._pool = pool
+        self._entry = entry
+        self._broken = False
+
+    def __getattr__(self, name):
+        if self._entry is None:
+            raise AttributeError(f"Connection already returned to the pool ({name}).")
+        return getattr(self._entry.conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _PooledCursor(self, self.__getattr__("cursor")(*args, **kwargs))
+
+    def close(self, broken: bool = False):
+        if self._entry is not None:
+            entry, self._entry = self._entry, None
+            self._pool.release(entry, broken=broken or self._broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(broken=isinstance(exc, _BROKEN_LINK_ERRORS))
+        return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_connection() -> PooledConnection:
+    """Check a connection out of the process-wide pool. Call `close()` to return it."""
+    pool = get_pool()
+    return PooledConnection(pool, pool.acquire())
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a pooled connection for the duration of a `with` block.
+
+    Connections that hit a lost-link error (server gone away, dropped socket) are
+    discarded instead of being returned to the pool, even when the caller catches
+    the error itself.
+    """
+    with get_connection() as conn:
+        yield conn
+
+
+def pool_stats() -> dict:
+    """Checkout wait time, in-use count, exhaustion events and connection churn."""
+    return get_pool().stats()
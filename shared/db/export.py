@@ -0,0 +1,202 @@
+"""
+Streaming export of database tables to CSV, Parquet or XLSX.
+
+Rows are read through an unbuffered (server-side) cursor `chunk_size` at a
+time and handed straight to an incremental writer, so memory stays flat no
+matter how large the table is.
+
+- csv:     stdlib csv writer; `compression="zstd"` wraps it in a zstd stream (.csv.zst)
+- parquet: pyarrow ParquetWriter, one row group per chunk; `compression` is the codec
+- xlsx:    openpyxl write-only workbook (already zip-compressed)
+"""
+import csv
+import io
+import os
+import time
+from datetime import datetime
+
+from shared.db.connection import pooled_connection
+
+SUPPORTED_FORMATS = ("csv", "parquet", "xlsx")
+
+
+def iter_query_chunks(query: str, params=None, chunk_size: int = 1000):
+    """
+    Yield (column_names, column_descriptions, rows) for successive chunks of a query result.
+
+    Uses an unbuffered cursor, so the server streams rows instead of the
+    client materializing the whole result set. `column_descriptions` are the
+    cursor's DB-API description tuples (type code, flags, ...).
+    """
+    exhausted = False
+    with pooled_connection() as conn:
+        cursor = conn.cursor(buffered=False)
+        try:
+            cursor.execute(query, params or ())
+            columns = [col[0] for col in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield columns, cursor.description, rows
+            exhausted = True
+        finally:
+            if exhausted:
+                cursor.close()
+            else:
+                # Rows left unread on the socket would break the next borrower; drop the link instead.
+                conn.close(broken=True)
+
+
+class _CsvWriter:
+    def __init__(self, path: str, compression: str = None):
+        self._raw = open(path, "wb")
+        self._zstd_stream = None
+        binary = self._raw
+        if compression == "zstd":
+            import zstandard
+            self._zstd_stream = zstandard.ZstdCompressor(level=3).stream_writer(self._raw, closefd=False)
+            binary = self._zstd_stream
+        self._text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        self._writer = csv.writer(self._text)
+        self._header_written = False
+
+    def write(self, columns, descriptions, rows):
+        if not self._header_written:
+            self._writer.writerow(columns)
+            self._header_written = True
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._text.flush()
+        if self._zstd_stream is not None:
+            self._zstd_stream.flush()
+            self._text.detach()
+            self._zstd_stream.close()
+        else:
+            self._text.detach()
+        self._raw.close()
+
+
+def _arrow_type(pa, description):
+    """Arrow type for a MySQL result column, from its cursor description."""
+    from mysql.connector.constants import FieldFlag, FieldType
+    type_code, flags = description[1], description[7]
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.INT24,
+                     FieldType.LONGLONG, FieldType.YEAR, FieldType.BIT):
+        return pa.int64()
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DECIMAL, FieldType.NEWDECIMAL):
+        return pa.decimal128(38, 10)
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    if type_code == FieldType.TIME:
+        return pa.duration("us")
+    if type_code in (FieldType.TINY_BLOB, FieldType.MEDIUM_BLOB, FieldType.LONG_BLOB,
+                     FieldType.BLOB) and flags & FieldFlag.BINARY:
+        return pa.binary()
+    return pa.string()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str, compression: str = None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._compression = compression or "snappy"
+        self._writer = None
+
+    def write(self, columns, descriptions, rows):
+        pa = self._pa
+        if self._writer is None:
+            # Type every column from its SQL type so all chunks share one schema, whatever values they hold.
+            schema = pa.schema([pa.field(column, _arrow_type(pa, description))
+                                for column, description in zip(columns, descriptions)])
+            self._writer = self._pq.ParquetWriter(self._path, schema, compression=self._compression)
+        table = pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _XlsxWriter:
+    def __init__(self, path: str, compression: str = None):
+        from openpyxl import Workbook
+        self._path = path
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("products")
+        self._header_written = False
+
+    def write(self, columns, descriptions, rows):
+        if not self._header_written:
+            self._sheet.append(columns)
+            self._header_written = True
+        for row in rows:
+            self._sheet.append(list(row))
+
+    def close(self):
+        self._workbook.save(self._path)
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter, "xlsx": _XlsxWriter}
+
+
+def export_query(query: str, path: str, file_format: str, params=None, chunk_size: int = 1000,
+                 compression: str = None) -> dict:
+    """
+    Stream the result of `query` into `path`.
+
+    Returns:
+        dict: {"rows", "path", "elapsed_seconds", "rows_per_second"}; "path" is None
+        (and no file is left) when the query returned no rows.
+    """
+    if file_format not in _WRITERS:
+        raise ValueError(f"Unsupported export format '{file_format}'. Use one of: {', '.join(SUPPORTED_FORMATS)}.")
+    if compression and file_format == "xlsx":
+        raise ValueError("XLSX files are already compressed; use csv or parquet for zstd output.")
+
+    started = time.perf_counter()
+    writer = _WRITERS[file_format](path, compression)
+    total = 0
+    chunks = iter_query_chunks(query, params, chunk_size)
+    try:
+        for columns, descriptions, rows in chunks:
+            writer.write(columns, descriptions, rows)
+            total += len(rows)
+    finally:
+        # Runs the reader's cleanup now, even if the writer raised mid-stream.
+        chunks.close()
+        writer.close()
+
+    if not total and os.path.exists(path):
+        # Nothing to export: don't leave an empty or header-only file behind.
+        os.remove(path)
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": total,
+        "path": path if total else None,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(total / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def export_products(file_format: str = "xlsx", compression: str = None, chunk_size: int = 1000,
+                    export_dir: str = "exports") -> dict:
+    """
+    Export the products table to "<export_dir>/<YYYY-MM-DD_HH-MM-SS>_products.<ext>".
+    """
+    os.makedirs(export_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    extension = file_format
+    if file_format == "csv" and compression == "zstd":
+        extension = "csv.zst"
+    path = os.path.join(export_dir, f"{timestamp}_products.{extension}")
+    return export_query("SELECT * FROM products ORDER BY id", path, file_format,
+                        chunk_size=chunk_size, compression=compression)
@@ -0,0 +1,431 @@
+"""
+Product families: one parent row per product plus one variant row per color/size.
+
+- product_families: the attributes shared by all variants (name, category,
+  description, style_tags, season, gender, price, image_url), unique on
+  `family_key`, an MD5 of those attributes.
+- product_variants: product_id (the existing `products.id`, still used by
+  orders, carts and vectors) -> family_id, color, size.
+
+`python -m shared.db.families --migrate` creates both tables from the flat
+`products` rows (idempotent; re-running it also drops families left without
+variants). Variant sizes come from `products.size` when that column exists.
+A process-wide `FamilyIndex` then maps every product id to its pre-grouped
+family, so requests group results with a dict lookup per row instead of
+`group_variants`.
+"""
+import argparse
+import os
+import threading
+import time
+
+from shared.db.connection import pooled_connection
+from shared.db.db_utils import group_variants
+
+FAMILY_INDEX_TTL = float(os.getenv("FAMILY_INDEX_TTL", "300"))
+
+FAMILY_COLUMNS = ["name", "category", "description", "style_tags", "season", "gender", "price", "image_url"]
+
+# Same attributes group_variants keys on; \x1f keeps field boundaries unambiguous.
+# CONCAT_WS skips NULL arguments, so each part is COALESCEd to keep its position.
+_FAMILY_KEY_SQL = "MD5(CONCAT_WS(CHAR(31), " + ", ".join(
+    f"COALESCE(p.{col}, '')" for col in FAMILY_COLUMNS
+) + "))"
+
+_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS product_families (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        family_key CHAR(32) NOT NULL UNIQUE,
+        name VARCHAR(255),
+        category VARCHAR(255),
+        description TEXT,
+        style_tags VARCHAR(255),
+        season VARCHAR(64),
+        gender VARCHAR(32),
+        price DECIMAL(12, 2),
+        image_url TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_variants (
+        product_id INT NOT NULL PRIMARY KEY,
+        family_id INT NOT NULL,
+        color VARCHAR(64),
+        size VARCHAR(32),
+        KEY idx_product_variants_family (family_id)
+    )
+    """,
+]
+
+_FAMILY_SELECT = """
+SELECT f.id AS family_id, f.name, f.category, f.description, f.style_tags, f.season,
+       f.gender, f.price, f.image_url,
+       MIN(v.product_id) AS id,
+       GROUP_CONCAT(v.product_id ORDER BY v.product_id) AS variant_ids,
+       GROUP_CONCAT(DISTINCT v.color ORDER BY v.color SEPARATOR CHAR(31)) AS colors,
+       GROUP_CONCAT(DISTINCT v.size ORDER BY v.size SEPARATOR CHAR(31)) AS sizes
+FROM product_families f
+JOIN product_variants v ON v.family_id = f.id
+{where}
+GROUP BY f.id
+"""
+
+
+def _family_from_row(row: dict) -> dict:
+    family = {
+        "id": row["id"],
+        "family_id": row["family_id"],
+        **{col: row[col] for col in FAMILY_COLUMNS},
+        "colors": row["colors"].split("\x1f") if row["colors"] else [],
+        "sizes": row["sizes"].split("\x1f") if row["sizes"] else ["Unknown"],
+        "variant_ids": [int(v) for v in str(row["variant_ids"]).split(",") if v],
+    }
+    return family
+
+
+def _table_exists(cursor, table: str) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cursor.fetchone()[0] > 0
+
+
+# ====================== migration & maintenance ======================
+
+def migrate_flat_products() -> dict:
+    """
+    Create the family tables and fill them from `products` (safe to re-run).
+
+    Returns:
+        dict: {"families", "variants", "elapsed_seconds"}
+    """
+    started = time.perf_counter()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for ddl in _DDL:
+                cursor.execute(ddl)
+            _assign(cursor, where="")
+            # Families whose variants all moved to another key (e.g. after a key change).
+            cursor.execute("""
+                DELETE f FROM product_families f
+                LEFT JOIN product_variants v ON v.family_id = f.id
+                WHERE v.product_id IS NULL
+            """)
+            conn.commit()
+            cursor.execute("SELECT COUNT(*) FROM product_families")
+            families = cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM product_variants")
+            variants = cursor.fetchone()[0]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    reset_family_index()
+    report = {
+        "families": families,
+        "variants": variants,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    print(f"✅ Product families migrated: {report}")
+    return report
+
+
+_size_column = None
+
+def _has_size_column(cursor) -> bool:
+    """Whether `products.size` exists (checked once per process)."""
+    global _size_column
+    if _size_column is None:
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = 'products' AND column_name = 'size'"
+        )
+        _size_column = cursor.fetchone()[0] > 0
+    return _size_column
+
+
+def _assign(cursor, where: str, params=()):
+    """(Re)attach the selected products to the family matching their shared attributes."""
+    size = "p.size" if _has_size_column(cursor) else "NULL"
+    cursor.execute(f"""
+        INSERT IGNORE INTO product_families
+            (family_key, name, category, description, style_tags, season, gender, price, image_url)
+        SELECT {_FAMILY_KEY_SQL}, ANY_VALUE(p.name), ANY_VALUE(p.category), ANY_VALUE(p.description),
+               ANY_VALUE(p.style_tags), ANY_VALUE(p.season), ANY_VALUE(p.gender),
+               ANY_VALUE(p.price), ANY_VALUE(p.image_url)
+        FROM products p {where}
+        GROUP BY {_FAMILY_KEY_SQL}
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO product_variants (product_id, family_id, color, size)
+        SELECT p.id, f.id, p.color, {size}
+        FROM products p
+        JOIN product_families f ON f.family_key = {_FAMILY_KEY_SQL}
+        {where}
+        ON DUPLICATE KEY UPDATE family_id = VALUES(family_id), color = VALUES(color), size = VALUES(size)
+    """, params)
+
+
+def _prune(cursor, family_ids):
+    if not family_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(family_ids))
+    cursor.execute(f"""
+        DELETE f FROM product_families f
+        LEFT JOIN product_variants v ON v.family_id = f.id
+        WHERE f.id IN ({placeholders}) AND v.product_id IS NULL
+    """, list(family_ids))
+
+
+def _old_family_ids(cursor, product_ids):
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    cursor.execute(f"SELECT DISTINCT family_id FROM product_variants WHERE product_id IN ({placeholders})",
+                   list(product_ids))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def sync_products(product_ids, removed: bool = False):
+    """
+    Keep families in step with inserted, updated (removed=False) or deleted products.
+
+    No-op until the family tables have been migrated.
+    """
+    product_ids = [int(p) for p in product_ids if str(p).strip().isdigit()]
+    index = _family_index
+    if not product_ids or index is None:
+        return
+    if not index.from_tables:
+        # Flat fallback: let these rows be grouped per request until the next load.
+        index.reload_families([], product_ids)
+        return
+    try:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                old_families = _old_family_ids(cursor, product_ids)
+                placeholders = ", ".join(["%s"] * len(product_ids))
+                if removed:
+                    cursor.execute(f"DELETE FROM product_variants WHERE product_id IN ({placeholders})",
+                                   product_ids)
+                else:
+                    _assign(cursor, where=f"WHERE p.id IN ({placeholders})", params=product_ids)
+                _prune(cursor, old_families)
+                conn.commit()
+                new_families = [] if removed else _old_family_ids(cursor, product_ids)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        index.reload_families(set(old_families) | set(new_families), product_ids)
+    except Exception as e:
+        print(f"Failed to sync product families for {product_ids}: {str(e)}")
+
+
+# ====================== in-memory index ======================
+
+class FamilyIndex:
+    """product_id -> pre-grouped family dict, loaded once and refreshed incrementally."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._families = {}
+        self._by_product = {}
+        self._categories = None
+        self.from_tables = False
+        self.built_at = 0.0
+
+    def load(self):
+        with pooled_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                raw = conn.cursor()
+                try:
+                    self.from_tables = _table_exists(raw, "product_families")
+                finally:
+                    raw.close()
+                if self.from_tables:
+                    cursor.execute(_FAMILY_SELECT.format(where=""))
+                    families = [_family_from_row(row) for row in cursor.fetchall()]
+                else:
+                    # Not migrated yet: group the flat rows once per load instead of per request.
+                    cursor.execute("SELECT * FROM products ORDER BY id")
+                    families = self._group_flat(cursor.fetchall())
+            finally:
+                cursor.close()
+
+        with self._lock:
+            self._families = {}
+            self._by_product = {}
+            self._categories = None
+            for family in families:
+                self._add(family)
+            self.built_at = time.monotonic()
+
+    @staticmethod
+    def _group_flat(rows):
+        variant_ids = {}
+        for row in rows:
+            variant_ids.setdefault(_flat_key(row), []).append(row["id"])
+        families = []
+        for family in group_variants(rows):
+            families.append({**family, "family_id": family["id"],
+                             "variant_ids": variant_ids.get(_flat_key(family), [family["id"]])})
+        return families
+
+    def _add(self, family):
+        self._categories = None
+        self._families[family["family_id"]] = family
+        for product_id in family["variant_ids"]:
+            self._by_product[product_id] = family["family_id"]
+
+    def _drop(self, family_id):
+        family = self._families.pop(family_id, None)
+        self._categories = None
+        if family:
+            for product_id in family["variant_ids"]:
+                if self._by_product.get(product_id) == family_id:
+                    del self._by_product[product_id]
+
+    def reload_families(self, family_ids, product_ids=()):
+        family_ids = [f for f in family_ids if f is not None]
+        with self._lock:
+            for product_id in product_ids:
+                self._by_product.pop(product_id, None)
+            for family_id in family_ids:
+                self._drop(family_id)
+        if not family_ids:
+            return
+        placeholders = ", ".join(["%s"] * len(family_ids))
+        with pooled_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(_FAMILY_SELECT.format(where=f"WHERE f.id IN ({placeholders})"), family_ids)
+                families = [_family_from_row(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        with self._lock:
+            for family in families:
+                self._add(family)
+
+    def family_of(self, product_id):
+        with self._lock:
+            family_id = self._by_product.get(product_id)
+            if family_id is None and isinstance(product_id, str) and product_id.isdigit():
+                family_id = self._by_product.get(int(product_id))
+            return self._families.get(family_id) if family_id is not None else None
+
+    def categories(self) -> frozenset:
+        """Distinct product categories in the catalog."""
+        with self._lock:
+            if self._categories is None:
+                self._categories = frozenset(f["category"] for f in self._families.values() if f.get("category"))
+            return self._categories
+
+    def __len__(self):
+        return len(self._families)
+
+
+_family_index = None
+_family_index_lock = threading.Lock()
+
+
+def get_family_index() -> FamilyIndex:
+    global _family_index
+    index = _family_index
+    if index is not None and time.monotonic() - index.built_at < FAMILY_INDEX_TTL:
+        return index
+    with _family_index_lock:
+        if _family_index is None or time.monotonic() - _family_index.built_at >= FAMILY_INDEX_TTL:
+            fresh = FamilyIndex()
+            fresh.load()
+            _family_index = fresh
+        return _family_index
+
+
+def reset_family_index():
+    global _family_index
+    with _family_index_lock:
+        _family_index = None
+
+
+def family_grouper():
+    """
+    Product row -> id of the family it is listed under, for family-level search pages.
+
+    Products the family index does not know yet stand alone as `-product_id`.
+    """
+    try:
+        index = get_family_index()
+    except Exception as e:
+        print(f"Family index unavailable, listing products one by one: {str(e)}")
+        index = None
+
+    def group_of(product: dict) -> int:
+        family = index.family_of(product.get("id")) if index is not None else None
+        return family["family_id"] if family is not None else -int(product["id"])
+    return group_of
+
+
+def group_into_families(products: list) -> list:
+    """
+    Drop-in replacement for `group_variants` backed by the family index.
+
+    Rows are mapped to their pre-grouped family by product id (first occurrence
+    wins, so the input ranking is kept). Rows the index does not know yet
+    (e.g. vector metadata without an id) are grouped with `group_variants`.
+    """
+    try:
+        index = get_family_index()
+    except Exception as e:
+        print(f"Family index unavailable, grouping per request: {str(e)}")
+        return group_variants(products)
+
+    slots = []
+    seen = set()
+    unknown = []
+    for p in products:
+        family = index.family_of(p.get("id"))
+        if family is None:
+            unknown.append(p)
+            slots.append(("row", p))
+        elif family["family_id"] not in seen:
+            seen.add(family["family_id"])
+            slots.append(("family", dict(family)))
+    if not unknown:
+        return [family for _, family in slots]
+
+    # Keep the input ranking for rows grouped on the fly as well.
+    grouped = {_flat_key(f): f for f in group_variants(unknown)}
+    families = []
+    for kind, value in slots:
+        if kind == "family":
+            families.append(value)
+            continue
+        family = grouped.pop(_flat_key(value), None)
+        if family is not None:
+            families.append(family)
+    return families
+
+
+def _flat_key(row: dict) -> tuple:
+    return tuple(row.get(col) for col in FAMILY_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Product family tables.")
+    parser.add_argument("--migrate", action="store_true", help="create/fill families from the flat products table")
+    args = parser.parse_args(argv)
+    if args.migrate:
+        migrate_flat_products()
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
-from shared.db.connection import get_connection
+from shared.db.connection import pooled_connection
 from datetime import datetime
+import base64
+import json
 from .db_utils import get_current_week_range, generate_order_code
+from . import search_index
+from . import rollups
+from . import families
+from . import query_cache
+from .query_cache import cached, query_cache_stats, catalog_version
+from shared.tracing import traced
 
 # ======================== PRODUCTS ===========================================================
 
@@ -12,135 +20,442 @@ def convert_drive_link_to_direct(link: str) -> str:
         return f"https://drive.google.com/uc?export=view&id={file_id}"
     return link 
 
+@traced("db.search_products_by_keyword")
+@cached(keyword_arg="keyword")
 def search_products_by_keyword(keyword: str, limit: int = 10):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
+    """
+    Ranked keyword search over name, description, style_tags, category and gender.
+
+    Served from the in-process BM25 index (see `shared.db.search_index`); falls back
+    to the SQL LIKE scan if the index cannot be built.
+    """
+    try:
+        return search_index.get_search_index().search(keyword, limit=limit)
+    except Exception as e:
+        print("⚠️ Search index unavailable, falling back to SQL:", e)
+        return _search_products_by_like(keyword, limit)
 
-    keywords = keyword.lower().split()
+
+def _like_clause(keyword: str):
     like_clauses = []
     params = []
-
-    for word in keywords:
+    for word in keyword.lower().split():
         wildcard = f"%{word}%"
         for field in ["name", "description", "style_tags", "category", "gender"]:
             like_clauses.append(f"{field} LIKE %s")
             params.append(wildcard)
+    return " OR ".join(like_clauses) or "1 = 0", params
+
 
-    where_clause = " OR ".join(like_clauses)
+def _search_products_by_like(keyword: str, limit: int = 10, after_id=None):
+    where_clause, params = _like_clause(keyword)
+    keyset = ""
+    if after_id is not None:
+        keyset = "AND id > %s"
+        params.append(after_id)
     query = f"""
         SELECT id, name, category, price, color, image_url,
                description, style_tags, season, gender
         FROM products
-        WHERE {where_clause}
+        WHERE ({where_clause}) {keyset}
+        ORDER BY id
         LIMIT %s;
     """
     params.append(limit)
 
-    try:
-        cursor.execute(query, params)
-        return cursor.fetchall()
-    except Exception as e:
-        print("❌ Error in search_products_by_keyword:", e)
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Exception as e:
+            print("❌ Error in search_products_by_keyword:", e)
+            raise query_cache.LoadFailed([])
+        finally:
+            cursor.close()
 
 
-def get_all_product():
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-    SELECT * FROM products
+def _family_group_sql(cursor):
+    """(FROM clause, group id expression) matching `families.family_grouper` in SQL."""
+    if families._table_exists(cursor, "product_variants"):
+        return ("products p LEFT JOIN product_variants v ON v.product_id = p.id",
+                "COALESCE(v.family_id, -p.id)")
+    # Not migrated: the index groups flat rows under their lowest id, like group_variants.
+    return "products p", None
+
+
+def _search_families_by_like(keyword: str, limit: int = 10, after_group=None):
+    where_clause, params = _like_clause(keyword)
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            raw = conn.cursor()
+            try:
+                source, group_expr = _family_group_sql(raw)
+            finally:
+                raw.close()
+            group_by = group_expr or families._FAMILY_KEY_SQL
+            group_id = group_expr or "MIN(p.id)"
+            keyset = ""
+            if after_group is not None:
+                keyset = "HAVING group_id > %s"
+                params.append(after_group)
+            query = f"""
+                SELECT p.id, p.name, p.category, p.price, p.color, p.image_url,
+                       p.description, p.style_tags, p.season, p.gender, g.group_id
+                FROM (
+                    SELECT {group_id} AS group_id, MIN(p.id) AS id
+                    FROM {source}
+                    WHERE ({where_clause})
+                    GROUP BY {group_by} {keyset}
+                    ORDER BY group_id
+                    LIMIT %s
+                ) g
+                JOIN products p ON p.id = g.id
+                ORDER BY g.group_id;
+            """
+            params.append(limit)
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        except Exception as e:
+            print("❌ Error in search_families_by_keyword:", e)
+            raise query_cache.LoadFailed([])
+        finally:
+            cursor.close()
+
+
+def _encode_cursor(parts) -> str:
+    return base64.urlsafe_b64encode(json.dumps(parts).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(token: str):
+    return json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+
+
+@traced("db.search_families_page")
+@cached(keyword_arg="keyword")
+def search_families_page(keyword: str, page_size: int = 10, cursor: str = None) -> dict:
+    """
+    Keyset-paginated keyword search over product families.
+
+    Each family (all color/size variants of a product) takes one slot, ranked by its
+    best-matching variant, so a page always holds `page_size` distinct families. Pages
+    are ordered by (relevance desc, family id asc) and continue strictly after the
+    `cursor` of the previous page, so fetching page N costs the same as page 1.
+
+    Args:
+        keyword (str): Search text.
+        page_size (int): Families per page.
+        cursor (str, optional): `next_cursor` returned for the previous page.
+
+    Returns:
+        dict: {"rows": [...], "next_cursor": str | None}, one product row per family.
     """
+    after = _decode_cursor(cursor) if cursor else None
+    if after is None or after[0] == "bm25":
+        try:
+            index = search_index.get_search_index()
+            rows, last_key = index.search_groups_after(keyword, families.family_grouper(), page_size,
+                                                       tuple(after[1:]) if after else None)
+            return {
+                "rows": rows,
+                "next_cursor": _encode_cursor(["bm25", *last_key]) if last_key else None,
+            }
+        except Exception as e:
+            if after is not None:
+                raise
+            print("⚠️ Search index unavailable, falling back to SQL:", e)
+
     try:
-        cursor.execute(query)
-        results = cursor.fetchall()
-        print("Get products successfully.")
-        return results
+        rows = _search_families_by_like(keyword, page_size + 1, after[1] if after else None)
+    except query_cache.LoadFailed:
+        raise query_cache.LoadFailed({"rows": [], "next_cursor": None})
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "rows": [{k: v for k, v in row.items() if k != "group_id"} for row in rows],
+        "next_cursor": _encode_cursor(["sql", rows[-1]["group_id"]]) if has_more else None,
+    }
+
+
+@traced("db.count_families_by_keyword")
+@cached(keyword_arg="keyword")
+def count_families_by_keyword(keyword: str) -> int:
+    """Number of product families matching `keyword` (no ranking, no row transfer)."""
+    try:
+        return search_index.get_search_index().count_groups(keyword, families.family_grouper())
     except Exception as e:
-        print(f"Failed to get all products {str(e)}.")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+        print("⚠️ Search index unavailable, counting with SQL:", e)
+    where_clause, params = _like_clause(keyword)
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            source, group_expr = _family_group_sql(cursor)
+            cursor.execute(
+                f"SELECT COUNT(DISTINCT {group_expr or families._FAMILY_KEY_SQL}) FROM {source} WHERE {where_clause}",
+                params,
+            )
+            return cursor.fetchone()[0]
+        except Exception as e:
+            print("❌ Error in count_families_by_keyword:", e)
+            raise query_cache.LoadFailed(0)
+        finally:
+            cursor.close()
 
+
+@traced("db.get_all_product")
+@cached(catalog_wide=True)
+def get_all_product():
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        query = """
+        SELECT * FROM products
+        """
+        try:
+            cursor.execute(query)
+            results = cursor.fetchall()
+            print("Get products successfully.")
+            return results
+        except Exception as e:
+            print(f"Failed to get all products {str(e)}.")
+            raise query_cache.LoadFailed([])
+        finally:
+            cursor.close()
+
+@traced("db.get_product_by_id")
+@cached(ids_arg="product_id")
 def get_product_by_id(product_id: str):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = """
-    SELECT * FROM products WHERE id=%s
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        query = """
+        SELECT * FROM products WHERE id=%s
+        """
+        try:
+            cursor.execute(query, (product_id,))
+            results = cursor.fetchall()
+            print("Get product by id successfully.")
+            return results
+        except Exception as e:
+            print(f"Failed to get product by id {str(e)}.")
+            raise query_cache.LoadFailed([])
+        finally:
+            cursor.close()
+
+@traced("db.get_products_by_ids")
+@cached(ids_arg="product_ids")
+def get_products_by_ids(product_ids: list) -> list:
     """
-    try:
-        cursor.execute(query, (product_id,))
-        results = cursor.fetchall()
-        print("Get product by id successfully.")
-        return results
-    except Exception as e:
-        print(f"Failed to get product by id {str(e)}.")
+    Fetch many products by primary key with a single `IN (...)` query.
+
+    Args:
+        product_ids (list): Product IDs; duplicates are ignored.
+
+    Returns:
+        list: Matching product rows (dicts), in the order of `product_ids`.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
         return []
-    finally:
-        cursor.close()
-        conn.close()
+    placeholders = ", ".join(["%s"] * len(ids))
+    query = f"SELECT * FROM products WHERE id IN ({placeholders})"
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(query, ids)
+            rows = {str(row["id"]): row for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"Failed to get products by ids {str(e)}.")
+            raise query_cache.LoadFailed([])
+        finally:
+            cursor.close()
+    return [rows[str(product_id)] for product_id in ids if str(product_id) in rows]
     
 
-def add_product(product_data: dict):
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    image_url = convert_drive_link_to_direct(product_data["img_url"])
-    query = """
-        INSERT INTO products (
-            name, category, price, description, style_tags,
-            color, season, gender, image_url, vector_id
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
-    """
-
-    values = (
-        product_data["name"],
-        product_data["category"],
-        product_data["price"],
-        product_data["description"],
-        product_data["style_tags"],
-        product_data["color"],
-        product_data["season"],
-        product_data["gender"],
-        image_url,
-        product_data["vector_id"],
+@traced("db.lookup_products", attributes=lambda result, args, kwargs: {"result.count": len(result)})
+def lookup_products(product_ids: list) -> dict:
+    """
+    Resolve product ids through the shared per-product cache.
+
+    Cached rows are served from memory; the misses are fetched with one
+    `IN (...)` query and cached individually, so any session asking for the
+    same product reuses the row.
+
+    Returns:
+        dict: {str(product_id): row} for the ids that exist.
+    """
+    ids = [str(p) for p in dict.fromkeys(product_ids) if p is not None]
+    if not ids:
+        return {}
+    if not query_cache.QUERY_CACHE_ENABLED:
+        return {str(row["id"]): row for row in get_products_by_ids.uncached(ids)}
+
+    cache = query_cache.get_query_cache()
+    hits = cache.get_many([("product", pid) for pid in ids])
+    rows = {key[1]: row for key, row in hits.items()}
+    missing = [pid for pid in ids if pid not in rows]
+    if missing:
+        generation = cache.generation()
+        fetched = {str(row["id"]): row for row in get_products_by_ids.uncached(missing)}
+        cache.put_many({("product", pid): row for pid, row in fetched.items()}, generation,
+                       product_ids_of=lambda key: [key[1]])
+        rows.update({pid: dict(row) for pid, row in fetched.items()})
+    return rows
+
+
+_PRODUCT_INSERT_COLUMNS = ("name", "category", "price", "description", "style_tags",
+                           "color", "season", "gender", "image_url", "vector_id")
+_PRODUCT_ROW_PLACEHOLDER = "(" + ", ".join(["%s"] * len(_PRODUCT_INSERT_COLUMNS)) + ")"
+_PRODUCT_INSERT_SQL = f"INSERT INTO products ({', '.join(_PRODUCT_INSERT_COLUMNS)}) VALUES "
+
+def _product_insert_values(product_data: dict) -> tuple:
+    # Missing fields (e.g. vector_id, written after indexing by update_vector_ids) are stored as NULL.
+    image_url = convert_drive_link_to_direct(product_data.get("img_url") or product_data.get("image_url") or "")
+    return tuple(
+        image_url if column == "image_url" else product_data.get(column)
+        for column in _PRODUCT_INSERT_COLUMNS
     )
 
-    try:
-        cursor.execute(query, values)
-        conn.commit()
-        print("Product added successfully.")
-    except Exception as e:
-        print("Failed to add product: ", e)
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
+@traced("db.add_product")
+def add_product(product_data: dict):
+    product_id = None
+    query_cache.ensure_catalog_state()
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(_PRODUCT_INSERT_SQL + _PRODUCT_ROW_PLACEHOLDER, _product_insert_values(product_data))
+            new_id = cursor.lastrowid
+            query_cache.bump_catalog_version(cursor)
+            conn.commit()
+            product_id = new_id
+            print("Product added successfully.")
+        except Exception as e:
+            print("Failed to add product: ", e)
+            conn.rollback()
+        finally:
+            cursor.close()
 
-def update_product(product_id: str, updated_data: dict):
-    conn = get_connection()
-    cursor = conn.cursor()
+    if product_id is not None:
+        query_cache.invalidate_products([product_id], [query_cache.product_text(product_data)])
+        search_index.refresh_products([product_id])
+        families.sync_products([product_id])
+    return product_id
 
-    set_clause = ", ".join(f"{key} = %s" for key in updated_data.keys())
-    values = list(updated_data.values())
+@traced("db.add_products", attributes=lambda result, args, kwargs: {
+    "result.count": sum(1 for product_id, _ in result if product_id is not None)})
+def add_products(products: list) -> list:
+    """
+    Insert many products with one multi-row INSERT in a single transaction.
 
-    query= f"""
-    UPDATE products SET {set_clause} WHERE id = %s
+    If the batch statement fails, the rows are retried one by one so a bad
+    row only fails itself.
+
+    Args:
+        products (list): Product dicts with the same fields as `add_product`.
+
+    Returns:
+        list: One (product_id, error) pair per input row, in order; product_id is None when the row failed.
     """
-    try:
-        cursor.execute(query, values + [product_id])
-        conn.commit()
-        print("Product updated successfully.")
-    except Exception as e:
-        conn.rollback()
-        print("Error updating product:", e)
-    finally:
+    if not products:
+        return []
+    values = [_product_insert_values(p) for p in products]
+    results = None
+    query_cache.ensure_catalog_state()
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                _PRODUCT_INSERT_SQL + ", ".join([_PRODUCT_ROW_PLACEHOLDER] * len(values)),
+                [value for row in values for value in row],
+            )
+            # A single multi-row INSERT reserves a consecutive AUTO_INCREMENT block starting at lastrowid.
+            first_id = cursor.lastrowid
+            ids = list(range(first_id, first_id + len(values)))
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"SELECT id, name FROM products WHERE id IN ({placeholders})", ids)
+            names = dict(cursor.fetchall())
+            if all(names.get(product_id) == row[0] for product_id, row in zip(ids, values)):
+                query_cache.bump_catalog_version(cursor)
+                conn.commit()
+                results = [(product_id, None) for product_id in ids]
+            else:
+                conn.rollback()
+                print("⚠️ Inserted ids were not consecutive, retrying the batch row by row.")
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ Batch insert failed ({str(e)}), retrying row by row.")
+
+        if results is None:
+            results = []
+            single = _PRODUCT_INSERT_SQL + _PRODUCT_ROW_PLACEHOLDER
+            for row in values:
+                try:
+                    cursor.execute(single, row)
+                    product_id = cursor.lastrowid
+                    query_cache.bump_catalog_version(cursor)
+                    conn.commit()
+                    results.append((product_id, None))
+                except Exception as e:
+                    conn.rollback()
+                    results.append((None, str(e)))
         cursor.close()
-        conn.close()
 
+    inserted = [product_id for product_id, _ in results if product_id is not None]
+    if inserted:
+        texts = [query_cache.product_text(p) for p, (product_id, _) in zip(products, results) if product_id is not None]
+        query_cache.invalidate_products(inserted, texts)
+        search_index.refresh_products(inserted)
+        families.sync_products(inserted)
+    return results
+
+@traced("db.update_product")
+def update_product(product_id: str, updated_data: dict) -> bool:
+    """
+    Update the given columns of a product.
+
+    Args:
+        product_id (str): The ID of the product to update.
+        updated_data (dict): Column names mapped to their new values.
+
+    Returns:
+        bool: True if the update was committed for an existing product, False otherwise.
+    """
+    updated = False
+    before = get_products_by_ids.uncached([product_id])
+    if not before:
+        print(f"Product {product_id} not found, nothing to update.")
+        return False
+    query_cache.ensure_catalog_state()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        set_clause = ", ".join(f"{key} = %s" for key in updated_data.keys())
+        values = list(updated_data.values())
+
+        query= f"""
+        UPDATE products SET {set_clause} WHERE id = %s
+        """
+        try:
+            cursor.execute(query, values + [product_id])
+            query_cache.bump_catalog_version(cursor)
+            conn.commit()
+            updated = True
+            print("Product updated successfully.")
+        except Exception as e:
+            conn.rollback()
+            print("Error updating product:", e)
+        finally:
+            cursor.close()
+
+    if updated:
+        texts = [query_cache.product_text(row) for row in before]
+        texts += [query_cache.product_text({**row, **updated_data}) for row in before]
+        query_cache.invalidate_products([product_id], texts)
+        search_index.refresh_products([product_id])
+        families.sync_products([product_id])
+    return updated
+
+@traced("db.remove_product")
 def remove_product(product_id: str) -> bool:
     """
     Permanently remove a product from the database using its unique ID.
@@ -151,100 +466,326 @@ def remove_product(product_id: str) -> bool:
     Returns:
         bool: True if a product was deleted, False if not found or error occurred.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    query = "DELETE FROM products WHERE id = %s"
+    before = get_products_by_ids.uncached([product_id])
+    removed = False
+    query_cache.ensure_catalog_state()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        query = "DELETE FROM products WHERE id = %s"
     
-    try:
-        cursor.execute(query, (product_id,))
-        conn.commit()
-        if cursor.rowcount > 0:
-            print(f"✅ Product {product_id} removed.")
-            return True
-        else:
-            print(f"⚠️ Product {product_id} not found.")
-            return False
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Failed to remove product {product_id}: {str(e)}")
+        try:
+            cursor.execute(query, (product_id,))
+            removed = cursor.rowcount > 0
+            if removed:
+                query_cache.bump_catalog_version(cursor)
+            conn.commit()
+            if removed:
+                print(f"✅ Product {product_id} removed.")
+            else:
+                print(f"⚠️ Product {product_id} not found.")
+        except Exception as e:
+            conn.rollback()
+            removed = False
+            print(f"❌ Failed to remove product {product_id}: {str(e)}")
+        finally:
+            cursor.close()
+
+    if removed:
+        # After the connection is returned: sync_products checks out its own.
+        query_cache.invalidate_products([product_id], [query_cache.product_text(row) for row in before])
+        search_index.remove_products([product_id])
+        families.sync_products([product_id], removed=True)
+    return removed
+
+
+def iter_products_by_id(batch_size: int = 500, after_id: int = 0, only_missing_vectors: bool = False):
+    """
+    Stream products in id order, `batch_size` rows at a time.
+
+    Uses keyset pagination (`id > last_id`) so each page is an index range scan
+    and a caller can resume from the last id it finished.
+
+    Yields:
+        list: A non-empty list of product dicts per batch.
+    """
+    missing_clause = "AND (vector_id IS NULL OR vector_id = '')" if only_missing_vectors else ""
+    query = f"""
+    SELECT * FROM products
+    WHERE id > %s {missing_clause}
+    ORDER BY id
+    LIMIT %s
+    """
+    last_id = after_id
+    while True:
+        with pooled_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute(query, (last_id, batch_size))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]["id"]
+
+
+_content_hash_column = None
+
+def has_content_hash_column() -> bool:
+    """Whether `products.content_hash` exists (checked once per process; see `add_content_hash_column`)."""
+    global _content_hash_column
+    if _content_hash_column is None:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.columns "
+                    "WHERE table_schema = DATABASE() AND table_name = 'products' AND column_name = 'content_hash'"
+                )
+                _content_hash_column = cursor.fetchone()[0] > 0
+            finally:
+                cursor.close()
+    return _content_hash_column
+
+def add_content_hash_column() -> bool:
+    """
+    Add `products.content_hash`: the hash of the embedded text the row's vector was built from.
+
+    Returns:
+        bool: True if the column was created, False if it already existed.
+    """
+    global _content_hash_column
+    if has_content_hash_column():
         return False
-    finally:
-        cursor.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("ALTER TABLE products ADD COLUMN content_hash CHAR(32) NULL AFTER vector_id")
+            conn.commit()
+        finally:
+            cursor.close()
+    _content_hash_column = True
+    print("✅ Added products.content_hash.")
+    return True
 
+@traced("db.update_vector_ids")
+def update_vector_ids(vector_ids: dict, content_hashes: dict = None, strict: bool = False) -> int:
+    """
+    Write many product -> vector_id assignments with a single multi-row UPDATE.
+
+    Args:
+        vector_ids (dict): {product_id: vector_id}
+        content_hashes (dict, optional): {product_id: content hash of the indexed text}; written
+            alongside the vector ids once the content_hash column exists, ignored before.
+        strict (bool): Re-raise database errors instead of returning 0, for callers that
+            must not record progress past a failed write.
+
+    Returns:
+        int: Number of rows updated (0 on error).
+    """
+    if not vector_ids:
+        return 0
+    ids = list(vector_ids)
+    case_clause = " ".join("WHEN %s THEN %s" for _ in ids)
+    placeholders = ", ".join(["%s"] * len(ids))
+    params = []
+    for product_id in ids:
+        params.extend((product_id, vector_ids[product_id]))
+    set_clause = f"vector_id = CASE id {case_clause} END"
+    if content_hashes and has_content_hash_column():
+        set_clause += f", content_hash = CASE id {case_clause} ELSE content_hash END"
+        for product_id in ids:
+            params.extend((product_id, content_hashes.get(product_id)))
+    query = f"""
+    UPDATE products SET {set_clause}
+    WHERE id IN ({placeholders})
+    """
+    params.extend(ids)
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            conn.commit()
+            query_cache.invalidate_products(ids)
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            print(f"Failed to update vector ids: {str(e)}")
+            if strict:
+                raise
+            return 0
+        finally:
+            cursor.close()
+
+@traced("db.get_product_vector_ids")
+def get_product_vector_ids() -> dict:
+    """
+    Returns:
+        dict: {product_id: vector_id} for every product (vector_id may be None).
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id, vector_id FROM products")
+            return {product_id: vector_id for product_id, vector_id in cursor.fetchall()}
+        except Exception as e:
+            print(f"Failed to get product vector ids {str(e)}.")
+            return {}
+        finally:
+            cursor.close()
 
 
 # =================ORDERS===================================================
 
-def add_order(order_data: dict):
-    conn = get_connection()
-    cursor = conn.cursor()
-    created_time = datetime.now().isoformat()
+_ORDER_HEADERS_DDL = """
+CREATE TABLE IF NOT EXISTS order_headers (
+    order_code VARCHAR(32) NOT NULL PRIMARY KEY,
+    customer_name VARCHAR(255),
+    phone VARCHAR(32),
+    comment TEXT,
+    item_count INT NOT NULL,
+    total_price DECIMAL(14, 2) NOT NULL,
+    order_date DATETIME NOT NULL
+)
+"""
+_order_headers_ready = False
+
+def _ensure_order_headers():
+    global _order_headers_ready
+    if _order_headers_ready:
+        return
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_ORDER_HEADERS_DDL)
+            conn.commit()
+        finally:
+            cursor.close()
+    _order_headers_ready = True
+
+@traced("db.place_order_with_lines")
+def place_order_with_lines(customer_name: str, phone: str, items: list, comment: str = ""):
+    """
+    Write a whole checkout in one transaction under a single order code.
+
+    One header row goes to `order_headers` and every cart line to `orders` with a
+    single multi-row INSERT, so the number of statements does not grow with the
+    cart and a failure leaves nothing behind.
+
+    Args:
+        customer_name (str): Customer name.
+        phone (str): Customer phone number.
+        items (list): Dicts with product_id, product_name, quantity, unit_price and total_price.
+        comment (str, optional): Customer note, stored on the header.
+
+    Returns:
+        str | None: The order code, or None if the order could not be saved.
+    """
+    if not items:
+        return None
+    _ensure_order_headers()
+    if rollups.SALES_ROLLUP_MODE == "transaction":
+        rollups.ensure_rollup_tables()
+
+    created_time = datetime.now().replace(microsecond=0)
     order_code = generate_order_code()
-    query = """INSERT INTO orders (
-    customer_name, phone, product_name, product_id, quantity, unit_price, total_price, order_code
+    header_query = """INSERT INTO order_headers (
+    order_code, customer_name, phone, comment, item_count, total_price, order_date
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    line_query = """INSERT INTO orders (
+    customer_name, phone, product_name, product_id, quantity, unit_price, total_price, order_code, order_date
     )
     VALUES 
-    (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    values = (
-        order_data["customer_name"],
-        order_data["phone"],
-        order_data["product_name"],
-        order_data["product_id"],
-        order_data["quantity"],
-        order_data["unit_price"],
-        order_data["total_price"],
+    (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+    header = (
         order_code,
+        customer_name,
+        phone,
+        comment,
+        len(items),
+        sum(item["total_price"] for item in items),
+        created_time,
     )
-    try:
-        cursor.execute(query, values)
-        conn.commit()
-        print("Order added successfully.")
-    except Exception as e:
-        print("Failed to add order: ", e)
-        conn.rollback()
-    finally:
-        cursor.close()
-        conn.close()
+    lines = [
+        (
+            customer_name,
+            phone,
+            item["product_name"],
+            item["product_id"],
+            item["quantity"],
+            item["unit_price"],
+            item["total_price"],
+            order_code,
+            created_time,
+        )
+        for item in items
+    ]
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(header_query, header)
+            # executemany rewrites a plain INSERT ... VALUES into one multi-row INSERT.
+            cursor.executemany(line_query, lines)
+            # Same transaction: the rollups never disagree with the orders table.
+            rollups.record_order_lines(cursor, items, created_time)
+            conn.commit()
+            print(f"Order {order_code} added successfully ({len(items)} line(s)).")
+            return order_code
+        except Exception as e:
+            print("Failed to add order: ", e)
+            conn.rollback()
+            return None
+        finally:
+            cursor.close()
 
+@traced("db.add_order")
+def add_order(order_data: dict):
+    """Place a single-line order (see `place_order_with_lines`)."""
+    return place_order_with_lines(order_data["customer_name"], order_data["phone"], [order_data])
+
+@traced("db.get_weekly_orders_query")
 def get_weekly_orders_query():
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    start, end = get_current_week_range()
-    query = f"""
-    SELECT * FROM orders WHERE order_date BETWEEN '{start}' AND '{end}'
-    """
-    try:
-        cursor.execute(query)
-        results = cursor.fetchall()
-        print("Get all the orders in the week successfully.")
-        return results
-    except Exception as e:
-        print(f"Failed to get orders {str(e)}.")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        start, end = get_current_week_range()
+        query = f"""
+        SELECT * FROM orders WHERE order_date BETWEEN '{start}' AND '{end}'
+        """
+        try:
+            cursor.execute(query)
+            results = cursor.fetchall()
+            print("Get all the orders in the week successfully.")
+            return results
+        except Exception as e:
+            print(f"Failed to get orders {str(e)}.")
+            return []
+        finally:
+            cursor.close()
 
 
 # ===============================FEEDBACKS========================================
 
+@traced("db.get_weekly_feedbacks_query")
 def get_weekly_feedbacks_query():
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    start, end  = get_current_week_range()
-    query=f"""
-    SELECT * FROM feedbacks WHERE created_date BETWEEN {start} AND {end}
-    """
-    try:
-        cursor.execute(query)
-        results = cursor.fetchall()
-        print("Get all the weekly feedbacks successfully.")
-        return results
-    except Exception as e:
-        print(f"Failed to get all the weekly feedbacks.")
-        return []
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        start, end  = get_current_week_range()
+        query=f"""
+        SELECT * FROM feedbacks WHERE created_date BETWEEN {start} AND {end}
+        """
+        try:
+            cursor.execute(query)
+            results = cursor.fetchall()
+            print("Get all the weekly feedbacks successfully.")
+            return results
+        except Exception as e:
+            print(f"Failed to get all the weekly feedbacks.")
+            return []
+        finally:
+            cursor.close()
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""
+Result cache for catalog reads in `shared.db.queries`.
+
+- TTL + LRU: entries expire after QUERY_CACHE_TTL seconds, and at most
+  QUERY_CACHE_SIZE entries are kept (least recently used evicted first).
+- Single-flight: concurrent identical misses share one database call.
+- Invalidation on write: each entry remembers the product ids it returned and,
+  for keyword reads, the keyword. A write to product P drops entries that
+  contain P, keyword entries whose keyword matches P's old or new text, and
+  catalog-wide entries (`get_all_product`).
+
+The cache and its invalidation are per process: a write made by another
+worker is only seen here once the affected entries expire.
+
+Read functions report a swallowed database error by raising `LoadFailed` with
+the value to return; that value is handed to the caller but never cached.
+
+Set QUERY_CACHE=off to bypass the cache.
+
+`catalog_version()` reads a counter from the `catalog_state` table that every
+product write bumps in its own transaction (`bump_catalog_version`), so it is
+the same in every worker, survives restarts and sees other processes' writes.
+Callers that keep product ids around (e.g. session state) use it to tell
+whether the catalog moved. The value is re-read at most every
+CATALOG_VERSION_TTL seconds, and right after a local write. Reading it can hit
+the database, so async code goes through `shared.db.async_queries.catalog_version`.
+"""
+import copy
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from shared.db.connection import pooled_connection
+from shared.db.search_index import normalize, tokenize
+from shared.tracing import set_attributes
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE", "on").lower() not in ("0", "off", "false")
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "2"))
+
+_CATALOG_STATE_DDL = """
+CREATE TABLE IF NOT EXISTS catalog_state (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+)
+"""
+_catalog_state_ready = False
+
+TEXT_FIELDS = ["name", "description", "style_tags", "category", "gender"]
+
+
+class LoadFailed(Exception):
+    """Raised by a cached read that failed: the caller gets `fallback`, the cache stores nothing."""
+
+    def __init__(self, fallback):
+        super().__init__("load failed")
+        self.fallback = fallback
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "product_ids", "keyword", "keyword_tokens", "catalog_wide")
+
+    def __init__(self, value, expires_at, product_ids, keyword, catalog_wide):
+        self.value = value
+        self.expires_at = expires_at
+        self.product_ids = product_ids
+        self.keyword = normalize(keyword) if keyword is not None else None
+        self.keyword_tokens = frozenset(tokenize(keyword)) if keyword is not None else frozenset()
+        self.catalog_wide = catalog_wide
+
+
+class _Flight:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def _product_ids(value) -> frozenset:
+    if isinstance(value, dict) and "rows" in value:
+        value = value["rows"]
+    if isinstance(value, list):
+        return frozenset(str(row["id"]) for row in value if isinstance(row, dict) and "id" in row)
+    return frozenset()
+
+
+def _copy(value):
+    # Callers mutate returned rows (e.g. filling defaults), so never hand out the cached objects.
+    if isinstance(value, list):
+        return [dict(row) if isinstance(row, dict) else row for row in value]
+    if isinstance(value, dict):
+        return copy.deepcopy(value)
+    return value
+
+
+def product_text(row: dict) -> str:
+    return " ".join(str(row.get(field) or "") for field in TEXT_FIELDS)
+
+
+class QueryCache:
+    def __init__(self, max_size: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; loads that overlap one are not stored.
+        self._generation = 0
+        self._version = None
+        self._version_expires_at = 0.0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get_or_load(self, key, loader, keyword: str = None, product_ids=(), catalog_wide: bool = False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    set_attributes(**{"cache.hit": True})
+                    return _copy(entry.value)
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self._stats["misses"] += 1
+                generation = self._generation
+            else:
+                self._stats["coalesced"] += 1
+
+        set_attributes(**{"cache.hit": False, "cache.coalesced": not leader})
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return _copy(flight.value)
+
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if flight.error is None and generation == self._generation:
+                    ids = _product_ids(flight.value) | frozenset(str(p) for p in product_ids)
+                    self._entries[key] = _Entry(flight.value, time.monotonic() + self.ttl, ids,
+                                                keyword, catalog_wide)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self._stats["evictions"] += 1
+            flight.event.set()
+        return _copy(flight.value)
+
+    def get_many(self, keys) -> dict:
+        """Fresh cached values for `keys` (no loading); returns {key: value} for hits only."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self._stats["misses"] += 1
+                elif entry.expires_at <= now:
+                    del self._entries[key]
+                    self._stats["expirations"] += 1
+                    self._stats["misses"] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    found[key] = _copy(entry.value)
+        set_attributes(**{"cache.hits": len(found), "cache.misses": len(keys) - len(found)})
+        return found
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put_many(self, items: dict, generation: int, product_ids_of=None):
+        """
+        Store {key: value} loaded while the cache was at `generation`.
+
+        Skipped entirely if an invalidation happened in between.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            expires_at = time.monotonic() + self.ttl
+            for key, value in items.items():
+                ids = frozenset(str(p) for p in product_ids_of(key)) if product_ids_of else _product_ids(value)
+                self._entries[key] = _Entry(value, expires_at, ids, None, False)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate_products(self, product_ids, texts=()) -> int:
+        """
+        Drop every entry a write to `product_ids` can change.
+
+        Args:
+            product_ids: Products that were inserted, updated or deleted.
+            texts: Their searchable text before and/or after the write.
+        """
+        ids = {str(p) for p in product_ids}
+        norm_texts = [normalize(t) for t in texts if t]
+        tokens = set()
+        for text in texts:
+            tokens.update(tokenize(text))
+
+        def affected(entry):
+            if entry.catalog_wide or entry.product_ids & ids:
+                return True
+            if entry.keyword is None:
+                return False
+            # Token overlap covers the BM25 index; substring covers the SQL LIKE fallback.
+            return bool(entry.keyword_tokens & tokens) or any(
+                word in text for word in entry.keyword.split() for text in norm_texts
+            )
+
+        with self._lock:
+            self._generation += 1
+            # The write may have bumped the shared version; re-read it on next use.
+            self._version_expires_at = 0.0
+            stale = [key for key, entry in self._entries.items() if affected(entry)]
+            for key in stale:
+                del self._entries[key]
+            self._stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def catalog_version(self) -> str:
+        with self._lock:
+            if self._version is not None and self._version_expires_at > time.monotonic():
+                return self._version
+            previous = self._version
+        try:
+            version = _read_catalog_version()
+        except Exception as e:
+            print(f"Failed to read catalog version: {str(e)}")
+            return previous if previous is not None else "0"
+        with self._lock:
+            self._version = version
+            self._version_expires_at = time.monotonic() + CATALOG_VERSION_TTL
+        return version
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+def ensure_catalog_state():
+    """Create `catalog_state` once per process. Call before opening a write transaction (DDL commits)."""
+    global _catalog_state_ready
+    if _catalog_state_ready:
+        return
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_CATALOG_STATE_DDL)
+            conn.commit()
+        finally:
+            cursor.close()
+    _catalog_state_ready = True
+
+
+def bump_catalog_version(cursor):
+    """Increment the shared catalog version inside the caller's write transaction."""
+    cursor.execute(
+        "INSERT INTO catalog_state (name, version) VALUES ('products', 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1"
+    )
+
+
+def _read_catalog_version() -> str:
+    ensure_catalog_state()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT version FROM catalog_state WHERE name = 'products'")
+            row = cursor.fetchone()
+            return str(row[0]) if row else "0"
+        finally:
+            cursor.close()
+
+
+_cache = QueryCache()
+
+
+def get_query_cache() -> QueryCache:
+    return _cache
+
+
+def cached(keyword_arg: str = None, ids_arg: str = None, catalog_wide: bool = False):
+    """
+    Cache a read function's result, keyed on its name and bound arguments.
+
+    Args:
+        keyword_arg (str, optional): Parameter holding the search keyword.
+        ids_arg (str, optional): Parameter holding a product id or list of ids.
+        catalog_wide (bool): Result depends on every product (invalidated by any write).
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def uncached(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except LoadFailed as e:
+                return e.fallback
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not QUERY_CACHE_ENABLED:
+                return uncached(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            key = (func.__name__,) + tuple(
+                (name, tuple(value) if isinstance(value, list) else value) for name, value in arguments.items()
+            )
+            product_ids = ()
+            if ids_arg is not None:
+                value = arguments[ids_arg]
+                product_ids = value if isinstance(value, (list, tuple)) else [value]
+            try:
+                return _cache.get_or_load(
+                    key,
+                    lambda: func(*args, **kwargs),
+                    keyword=arguments[keyword_arg] if keyword_arg else None,
+                    product_ids=product_ids,
+                    catalog_wide=catalog_wide,
+                )
+            except LoadFailed as e:
+                # Coalesced callers receive the same error; none of them caches it.
+                return _copy(e.fallback)
+
+        wrapper.uncached = uncached
+        return wrapper
+    return decorator
+
+
+def invalidate_products(product_ids, texts=()) -> int:
+    return _cache.invalidate_products(product_ids, texts)
+
+
+def query_cache_stats() -> dict:
+    return _cache.stats()
+
+
+def catalog_version() -> str:
+    return _cache.catalog_version()
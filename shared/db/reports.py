@@ -0,0 +1,142 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from shared.db.connection import pooled_connection
+from shared.db import rollups
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+def _num(value):
+    if value is None:
+        return 0
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _feedback_count(start: date, end: date):
+    query = """
+    SELECT COUNT(*) FROM feedbacks
+    WHERE created_date >= %s AND created_date < %s
+    """
+    try:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(query, (start, end + timedelta(days=1)))
+                return cursor.fetchone()[0]
+            finally:
+                cursor.close()
+    except Exception as e:
+        print(f"Failed to count feedbacks: {str(e)}")
+        return None
+
+
+def sales_report(start_date, end_date, top_n: int = 5, use_rollups: bool = True) -> dict:
+    """
+    Aggregate sales between two dates (both inclusive) inside MySQL.
+
+    Only aggregates cross the wire: totals, the top `top_n` products by units
+    sold, and one row per day. When the sales rollups are maintained and
+    backfilled (see `shared.db.rollups`), they are summed instead of scanning
+    `orders`.
+
+    Args:
+        start_date (date | str): First day, "YYYY-MM-DD" if a string.
+        end_date (date | str): Last day, "YYYY-MM-DD" if a string.
+        top_n (int): Number of best-selling products to return.
+        use_rollups (bool): Allow answering from the rollup tables.
+
+    Returns:
+        dict: {
+            "start_date", "end_date": ISO dates,
+            "revenue", "units_sold", "order_count", "feedback_count",
+            "top_products": [{"product_id", "product_name", "units_sold", "revenue"}],
+            "daily": [{"date", "revenue", "units_sold", "order_count"}],
+            "source": "rollups" | "orders"
+        }
+    """
+    start = _to_date(start_date)
+    end = _to_date(end_date)
+    if use_rollups and rollups.rollups_ready():
+        report = rollups.rollup_sales(start, end, top_n=top_n)
+        report["feedback_count"] = _feedback_count(start, end)
+        report["source"] = "rollups"
+        return report
+
+    # Half-open range keeps the predicate sargable on a DATETIME order_date.
+    params = (start, end + timedelta(days=1))
+
+    totals_query = """
+    SELECT COALESCE(SUM(total_price), 0) AS revenue,
+           COALESCE(SUM(quantity), 0) AS units_sold,
+           COUNT(DISTINCT order_code) AS order_count
+    FROM orders
+    WHERE order_date >= %s AND order_date < %s
+    """
+    top_query = """
+    SELECT product_id, product_name,
+           SUM(quantity) AS units_sold,
+           SUM(total_price) AS revenue
+    FROM orders
+    WHERE order_date >= %s AND order_date < %s
+    GROUP BY product_id, product_name
+    ORDER BY units_sold DESC, revenue DESC
+    LIMIT %s
+    """
+    daily_query = """
+    SELECT DATE(order_date) AS day,
+           SUM(total_price) AS revenue,
+           SUM(quantity) AS units_sold,
+           COUNT(DISTINCT order_code) AS order_count
+    FROM orders
+    WHERE order_date >= %s AND order_date < %s
+    GROUP BY DATE(order_date)
+    ORDER BY day
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(totals_query, params)
+            totals = cursor.fetchone() or {}
+
+            cursor.execute(top_query, params + (top_n,))
+            top_products = cursor.fetchall()
+
+            cursor.execute(daily_query, params)
+            daily = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "revenue": _num(totals.get("revenue")),
+        "units_sold": _num(totals.get("units_sold")),
+        "order_count": _num(totals.get("order_count")),
+        "feedback_count": _feedback_count(start, end),
+        "top_products": [
+            {
+                "product_id": row["product_id"],
+                "product_name": row["product_name"],
+                "units_sold": _num(row["units_sold"]),
+                "revenue": _num(row["revenue"]),
+            }
+            for row in top_products
+        ],
+        "daily": [
+            {
+                "date": _to_date(row["day"]).isoformat(),
+                "revenue": _num(row["revenue"]),
+                "units_sold": _num(row["units_sold"]),
+                "order_count": _num(row["order_count"]),
+            }
+            for row in daily
+        ],
+        "source": "orders",
+    }
@@ -0,0 +1,595 @@
+"""
+Pre-aggregated sales rollups.
+
+Three tables hold per-bucket sums so reports never rescan `orders`:
+
+- sales_rollup_hourly (hour_start, product_id): units_sold, revenue, order_lines
+- sales_rollup_daily  (day, product_id):        units_sold, revenue, order_lines
+- sales_rollup_orders_hourly (hour_start, shard): order_count
+
+The order counter is split over SALES_ROLLUP_ORDER_SHARDS rows per hour (each
+write picks one at random and reads sum them), so concurrent checkouts in the
+same hour do not all queue on a single row lock.
+
+Maintenance is selected with SALES_ROLLUP_MODE:
+
+- "transaction" (default): `record_order_lines` runs inside `add_order`'s transaction.
+- "folder": a background thread (`start_rollup_folder`, started by
+  `shared.startup.warm_up`) folds new `orders` rows in batches, tracking the last
+  folded order id in `sales_rollup_state`. Ids below that mark that were not yet
+  visible (a transaction that took its auto-increment id earlier but committed
+  later) are kept in `sales_rollup_gaps` and re-checked on every fold until they
+  appear or SALES_ROLLUP_GAP_TIMEOUT seconds pass (a rolled-back insert never
+  fills its id). Reports fall back to `orders` while no fold has completed within
+  SALES_ROLLUP_STALE_AFTER seconds.
+- "off": rollups are not maintained and reports read `orders` directly.
+
+Existing history is loaded with `python -m shared.db.rollups --backfill` (run it
+while no orders are being placed); reports only read rollups once a backfill has
+completed. The folder and the backfill rely on the auto-increment `orders.id`.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal
+
+from shared.db.connection import pooled_connection
+
+SALES_ROLLUP_MODE = os.getenv("SALES_ROLLUP_MODE", "transaction").lower()
+FOLD_INTERVAL = float(os.getenv("SALES_ROLLUP_FOLD_INTERVAL", "30"))
+FOLD_BATCH_SIZE = int(os.getenv("SALES_ROLLUP_FOLD_BATCH_SIZE", "5000"))
+FOLD_STALE_AFTER = float(os.getenv("SALES_ROLLUP_STALE_AFTER", str(3 * FOLD_INTERVAL)))
+FOLD_GAP_TIMEOUT = float(os.getenv("SALES_ROLLUP_GAP_TIMEOUT", "600"))
+ORDER_COUNT_SHARDS = max(1, int(os.getenv("SALES_ROLLUP_ORDER_SHARDS", "8")))
+
+_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollup_hourly (
+        hour_start DATETIME NOT NULL,
+        product_id INT NOT NULL,
+        product_name VARCHAR(255),
+        units_sold BIGINT NOT NULL DEFAULT 0,
+        revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+        order_lines INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour_start, product_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollup_daily (
+        day DATE NOT NULL,
+        product_id INT NOT NULL,
+        product_name VARCHAR(255),
+        units_sold BIGINT NOT NULL DEFAULT 0,
+        revenue DECIMAL(16, 2) NOT NULL DEFAULT 0,
+        order_lines INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollup_orders_hourly (
+        hour_start DATETIME NOT NULL,
+        shard TINYINT UNSIGNED NOT NULL DEFAULT 0,
+        order_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (hour_start, shard)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollup_state (
+        name VARCHAR(64) NOT NULL PRIMARY KEY,
+        value VARCHAR(64)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollup_gaps (
+        order_id INT NOT NULL PRIMARY KEY,
+        seen_at DATETIME NOT NULL
+    )
+    """,
+]
+
+_UPSERT_HOURLY = """
+INSERT INTO sales_rollup_hourly (hour_start, product_id, product_name, units_sold, revenue, order_lines)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE product_name = VALUES(product_name),
+    units_sold = units_sold + VALUES(units_sold),
+    revenue = revenue + VALUES(revenue),
+    order_lines = order_lines + VALUES(order_lines)
+"""
+_UPSERT_DAILY = """
+INSERT INTO sales_rollup_daily (day, product_id, product_name, units_sold, revenue, order_lines)
+VALUES (%s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE product_name = VALUES(product_name),
+    units_sold = units_sold + VALUES(units_sold),
+    revenue = revenue + VALUES(revenue),
+    order_lines = order_lines + VALUES(order_lines)
+"""
+_UPSERT_ORDERS = """
+INSERT INTO sales_rollup_orders_hourly (hour_start, shard, order_count)
+VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count)
+"""
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_rollup_tables():
+    """Create the rollup tables once per process (CREATE TABLE IF NOT EXISTS)."""
+    global _tables_ready
+    if _tables_ready:
+        return
+    with _tables_lock:
+        if _tables_ready:
+            return
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for ddl in _DDL:
+                    cursor.execute(ddl)
+                cursor.execute(
+                    "SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = DATABASE() "
+                    "AND table_name = 'sales_rollup_orders_hourly' AND column_name = 'shard'"
+                )
+                if not cursor.fetchone()[0]:
+                    # Created before the counter was sharded: existing counts become shard 0.
+                    cursor.execute("""
+                        ALTER TABLE sales_rollup_orders_hourly
+                        ADD COLUMN shard TINYINT UNSIGNED NOT NULL DEFAULT 0 AFTER hour_start,
+                        DROP PRIMARY KEY, ADD PRIMARY KEY (hour_start, shard)
+                    """)
+                conn.commit()
+            finally:
+                cursor.close()
+        _tables_ready = True
+
+
+def _hour_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _num(value):
+    if value is None:
+        return 0
+    return float(value) if isinstance(value, Decimal) else value
+
+
+# ====================== maintenance ======================
+
+def _apply_deltas(cursor, lines: list, orders_per_hour: dict):
+    """
+    lines: [(order_time, product_id, product_name, quantity, total_price)]
+    orders_per_hour: {hour_start: number of new orders}
+    """
+    hourly = defaultdict(lambda: [None, 0, 0, 0])
+    daily = defaultdict(lambda: [None, 0, 0, 0])
+    for order_time, product_id, product_name, quantity, total_price in lines:
+        for bucket in (hourly[(_hour_start(order_time), product_id)], daily[(order_time.date(), product_id)]):
+            bucket[0] = product_name
+            bucket[1] += quantity
+            bucket[2] += total_price
+            bucket[3] += 1
+
+    # Rows are always locked in key order, so two writers touching the same buckets cannot deadlock.
+    if hourly:
+        cursor.executemany(_UPSERT_HOURLY, [(k[0], k[1], *v) for k, v in sorted(hourly.items())])
+    if daily:
+        cursor.executemany(_UPSERT_DAILY, [(k[0], k[1], *v) for k, v in sorted(daily.items())])
+    if orders_per_hour:
+        cursor.executemany(_UPSERT_ORDERS, sorted(
+            (hour, random.randrange(ORDER_COUNT_SHARDS), count) for hour, count in orders_per_hour.items()
+        ))
+
+
+def record_order_lines(cursor, order_lines: list, order_time: datetime = None):
+    """
+    Add one order's lines to the rollups using the caller's cursor, so the
+    update commits (or rolls back) together with the order itself.
+
+    No-op unless SALES_ROLLUP_MODE is "transaction". Call `ensure_rollup_tables()`
+    before opening the transaction.
+
+    Args:
+        cursor: Cursor of the transaction that inserts the order.
+        order_lines (list): Dicts with product_id, product_name, quantity and total_price.
+        order_time (datetime, optional): Defaults to now.
+    """
+    if SALES_ROLLUP_MODE != "transaction" or not order_lines:
+        return
+    order_time = order_time or datetime.now()
+    lines = [
+        (order_time, line["product_id"], line["product_name"], line["quantity"], line["total_price"])
+        for line in order_lines
+    ]
+    _apply_deltas(cursor, lines, {_hour_start(order_time): 1})
+
+
+def _get_state(cursor, name: str, for_update: bool = False):
+    lock = " FOR UPDATE" if for_update else ""
+    cursor.execute(f"SELECT value FROM sales_rollup_state WHERE name = %s{lock}", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _set_state(cursor, name: str, value):
+    cursor.execute(
+        "INSERT INTO sales_rollup_state (name, value) VALUES (%s, %s) "
+        "ON DUPLICATE KEY UPDATE value = VALUES(value)",
+        (name, str(value)),
+    )
+
+
+def _fold_batch(rows: list, watermark: int, batch_size: int):
+    """
+    Pick the rows of a fold batch that can be applied now.
+
+    rows: [(id, order_date, product_id, product_name, quantity, total_price, order_code, is_gap)],
+    recovered gap rows first, then new rows in id order.
+
+    Returns:
+        (rows to fold, new watermark, new gap ids)
+    """
+    new_rows = [r for r in rows if not r[7]]
+    if len(new_rows) == batch_size:
+        # Do not split one order across batches, or it would be counted twice: cut before the
+        # first line of every order that reaches the end of the batch.
+        cut = new_rows[-1][0]
+        while True:
+            cut_codes = {r[6] for r in new_rows if r[0] >= cut}
+            lowest = min(r[0] for r in new_rows if r[6] in cut_codes)
+            if lowest == cut:
+                break
+            cut = lowest
+        kept = [r for r in rows if r[6] not in cut_codes]
+        if any(not r[7] for r in kept):
+            rows, new_rows = kept, [r for r in kept if not r[7]]
+
+    new_watermark = new_rows[-1][0] if new_rows else watermark
+    gaps = []
+    previous = watermark
+    for r in new_rows:
+        # Longer runs of missing ids are deleted history, not transactions still in flight.
+        if 1 < r[0] - previous <= batch_size:
+            gaps.extend(range(previous + 1, r[0]))
+        previous = r[0]
+    return rows, new_watermark, gaps
+
+
+def fold_new_orders(batch_size: int = FOLD_BATCH_SIZE) -> int:
+    """
+    Fold orders inserted since the last run into the rollups, one batch per transaction.
+
+    Every batch also re-checks the pending gap ids, so an order that committed after
+    higher ids were folded is picked up (with the rest of its lines) once visible.
+
+    Returns:
+        int: Number of order lines folded.
+    """
+    ensure_rollup_tables()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            # The row must exist for FOR UPDATE to serialize concurrent folders.
+            cursor.execute("INSERT IGNORE INTO sales_rollup_state (name, value) VALUES ('folded_order_id', '0')")
+            conn.commit()
+        finally:
+            cursor.close()
+
+    select_lines = "SELECT id, order_date, product_id, product_name, quantity, total_price, order_code FROM orders"
+    folded = 0
+    while True:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Locked until commit: two workers never fold the same orders.
+                watermark = int(_get_state(cursor, "folded_order_id", for_update=True) or 0)
+                cursor.execute(
+                    "DELETE FROM sales_rollup_gaps WHERE seen_at < NOW() - INTERVAL %s SECOND",
+                    (int(FOLD_GAP_TIMEOUT),),
+                )
+                cursor.execute("SELECT order_id FROM sales_rollup_gaps")
+                gap_ids = [r[0] for r in cursor.fetchall()]
+                rows = []
+                if gap_ids:
+                    placeholders = ", ".join(["%s"] * len(gap_ids))
+                    cursor.execute(f"{select_lines} WHERE id IN ({placeholders}) ORDER BY id", gap_ids)
+                    rows = [(*r, True) for r in cursor.fetchall()]
+                cursor.execute(f"{select_lines} WHERE id > %s ORDER BY id LIMIT %s", (watermark, batch_size))
+                rows += [(*r, False) for r in cursor.fetchall()]
+                if not rows:
+                    _set_state(cursor, "folded_at", datetime.now().isoformat(timespec="seconds"))
+                    conn.commit()
+                    return folded
+
+                rows, new_watermark, new_gaps = _fold_batch(rows, watermark, batch_size)
+                lines = [(r[1], r[2], r[3], r[4], r[5]) for r in rows]
+                codes_per_hour = defaultdict(set)
+                for r in rows:
+                    codes_per_hour[_hour_start(r[1])].add(r[6])
+                _apply_deltas(cursor, lines, {h: len(codes) for h, codes in codes_per_hour.items()})
+
+                recovered = [r[0] for r in rows if r[7]]
+                if recovered:
+                    placeholders = ", ".join(["%s"] * len(recovered))
+                    cursor.execute(f"DELETE FROM sales_rollup_gaps WHERE order_id IN ({placeholders})", recovered)
+                if new_gaps:
+                    cursor.executemany(
+                        "INSERT IGNORE INTO sales_rollup_gaps (order_id, seen_at) VALUES (%s, NOW())",
+                        [(order_id,) for order_id in new_gaps],
+                    )
+                _set_state(cursor, "folded_order_id", new_watermark)
+                conn.commit()
+                folded += len(rows)
+                if new_watermark == watermark:
+                    # Only gap rows were left to fold; new orders are picked up on the next run.
+                    return folded
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+
+_folder_thread = None
+
+
+def start_rollup_folder(interval: float = FOLD_INTERVAL) -> threading.Thread:
+    """Start the background folder thread (SALES_ROLLUP_MODE=folder). Idempotent."""
+    global _folder_thread
+    if _folder_thread is not None and _folder_thread.is_alive():
+        return _folder_thread
+
+    def run():
+        while True:
+            try:
+                folded = fold_new_orders()
+                if folded:
+                    print(f"Folded {folded} order line(s) into sales rollups.")
+            except Exception as e:
+                print(f"❌ Sales rollup fold failed: {str(e)}")
+            time.sleep(interval)
+
+    _folder_thread = threading.Thread(target=run, name="sales-rollup-folder", daemon=True)
+    _folder_thread.start()
+    return _folder_thread
+
+
+def backfill_rollups() -> dict:
+    """
+    Rebuild every rollup table from the full `orders` history in one transaction.
+
+    Returns:
+        dict: {"hourly_buckets", "daily_buckets", "last_order_id", "elapsed_seconds"}
+    """
+    ensure_rollup_tables()
+    started = time.perf_counter()
+    hour_expr = "TIMESTAMP(DATE(order_date), MAKETIME(HOUR(order_date), 0, 0))"
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM orders")
+            last_id = cursor.fetchone()[0]
+
+            cursor.execute("DELETE FROM sales_rollup_hourly")
+            cursor.execute("DELETE FROM sales_rollup_daily")
+            cursor.execute("DELETE FROM sales_rollup_orders_hourly")
+            cursor.execute("DELETE FROM sales_rollup_gaps")
+            cursor.execute(f"""
+                INSERT INTO sales_rollup_hourly (hour_start, product_id, product_name, units_sold, revenue, order_lines)
+                SELECT {hour_expr}, product_id, MAX(product_name), SUM(quantity), SUM(total_price), COUNT(*)
+                FROM orders WHERE id <= %s
+                GROUP BY {hour_expr}, product_id
+            """, (last_id,))
+            hourly_buckets = cursor.rowcount
+            cursor.execute("""
+                INSERT INTO sales_rollup_daily (day, product_id, product_name, units_sold, revenue, order_lines)
+                SELECT DATE(hour_start), product_id, MAX(product_name), SUM(units_sold), SUM(revenue), SUM(order_lines)
+                FROM sales_rollup_hourly
+                GROUP BY DATE(hour_start), product_id
+            """)
+            daily_buckets = cursor.rowcount
+            cursor.execute(f"""
+                INSERT INTO sales_rollup_orders_hourly (hour_start, order_count)
+                SELECT {hour_expr}, COUNT(DISTINCT order_code)
+                FROM orders WHERE id <= %s
+                GROUP BY {hour_expr}
+            """, (last_id,))
+
+            _set_state(cursor, "folded_order_id", last_id)
+            _set_state(cursor, "backfilled_at", datetime.now().isoformat(timespec="seconds"))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    report = {
+        "hourly_buckets": hourly_buckets,
+        "daily_buckets": daily_buckets,
+        "last_order_id": last_id,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    print(f"✅ Sales rollups backfilled: {report}")
+    return report
+
+
+def rollups_ready() -> bool:
+    """
+    True when rollups are maintained and have been backfilled at least once; in
+    folder mode the last fold must also be recent, or the rollups are stale.
+    """
+    if SALES_ROLLUP_MODE == "off":
+        return False
+    try:
+        ensure_rollup_tables()
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if _get_state(cursor, "backfilled_at") is None:
+                    return False
+                if SALES_ROLLUP_MODE != "folder":
+                    return True
+                folded_at = _get_state(cursor, "folded_at")
+            finally:
+                cursor.close()
+        if folded_at is None:
+            return False
+        return (datetime.now() - datetime.fromisoformat(folded_at)).total_seconds() <= FOLD_STALE_AFTER
+    except Exception as e:
+        print(f"Sales rollups unavailable: {str(e)}")
+        return False
+
+
+# ====================== queries ======================
+
+def _window(start, end):
+    """
+    Normalize a window to [start_dt, end_dt) on hour boundaries.
+
+    Dates are whole days (end inclusive); datetimes are used as given.
+    """
+    if isinstance(start, datetime):
+        start_dt = _hour_start(start)
+    else:
+        start_dt = datetime.combine(start, dtime.min)
+    if isinstance(end, datetime):
+        end_dt = _hour_start(end) + (timedelta(hours=1) if end != _hour_start(end) else timedelta())
+    else:
+        end_dt = datetime.combine(end, dtime.min) + timedelta(days=1)
+    return start_dt, end_dt
+
+
+def _split_window(start_dt: datetime, end_dt: datetime):
+    """
+    Split [start_dt, end_dt) into whole days (served by the daily table) and the
+    partial-day hour ranges at either edge (served by the hourly table).
+    """
+    first_day = start_dt.date() if start_dt.time() == dtime.min else start_dt.date() + timedelta(days=1)
+    last_day_excl = end_dt.date()
+    if first_day >= last_day_excl:
+        return None, [(start_dt, end_dt)]
+    edges = []
+    if start_dt < datetime.combine(first_day, dtime.min):
+        edges.append((start_dt, datetime.combine(first_day, dtime.min)))
+    if datetime.combine(last_day_excl, dtime.min) < end_dt:
+        edges.append((datetime.combine(last_day_excl, dtime.min), end_dt))
+    return (first_day, last_day_excl), edges
+
+
+def rollup_sales(start, end, top_n: int = 5) -> dict:
+    """
+    Answer a sales window from the rollup tables.
+
+    Whole days are summed from `sales_rollup_daily`, the partial hours at the edges
+    from `sales_rollup_hourly`, so the cost depends on the number of buckets in the
+    window, not the number of orders.
+
+    Args:
+        start (date | datetime): Window start (inclusive).
+        end (date | datetime): Window end (inclusive for dates, exclusive for datetimes).
+        top_n (int): Number of best-selling products to return.
+
+    Returns:
+        dict: Same shape as `shared.db.reports.sales_report` (without feedback_count).
+    """
+    start_dt, end_dt = _window(start, end)
+    days, edges = _split_window(start_dt, end_dt)
+
+    parts = []
+    params = []
+    if days:
+        parts.append("""
+            SELECT day AS bucket_day, product_id, product_name, units_sold, revenue
+            FROM sales_rollup_daily WHERE day >= %s AND day < %s
+        """)
+        params.extend(days)
+    for edge_start, edge_end in edges:
+        parts.append("""
+            SELECT DATE(hour_start) AS bucket_day, product_id, product_name, units_sold, revenue
+            FROM sales_rollup_hourly WHERE hour_start >= %s AND hour_start < %s
+        """)
+        params.extend((edge_start, edge_end))
+    buckets = " UNION ALL ".join(parts)
+
+    top_products_query = f"""
+    SELECT product_id, MAX(product_name) AS product_name,
+           SUM(units_sold) AS units_sold, SUM(revenue) AS revenue
+    FROM ({buckets}) b
+    GROUP BY product_id
+    ORDER BY units_sold DESC, revenue DESC
+    LIMIT %s
+    """
+    by_day_query = f"""
+    SELECT bucket_day AS day, SUM(units_sold) AS units_sold, SUM(revenue) AS revenue
+    FROM ({buckets}) b
+    GROUP BY bucket_day
+    ORDER BY bucket_day
+    """
+    orders_query = """
+    SELECT DATE(hour_start) AS day, SUM(order_count) AS order_count
+    FROM sales_rollup_orders_hourly
+    WHERE hour_start >= %s AND hour_start < %s
+    GROUP BY DATE(hour_start)
+    """
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(top_products_query, params + [top_n])
+            top_products = cursor.fetchall()
+            cursor.execute(by_day_query, params)
+            by_day = cursor.fetchall()
+            cursor.execute(orders_query, (start_dt, end_dt))
+            orders_by_day = {row["day"]: _num(row["order_count"]) for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    last_day = (end_dt - timedelta(microseconds=1)).date()
+    return {
+        "start_date": start_dt.date().isoformat(),
+        "end_date": last_day.isoformat(),
+        # Every bucket falls on exactly one day, so the daily rows add up to the window totals.
+        "revenue": sum(_num(r["revenue"]) for r in by_day),
+        "units_sold": sum(_num(r["units_sold"]) for r in by_day),
+        "order_count": sum(orders_by_day.values()),
+        "top_products": [
+            {
+                "product_id": row["product_id"],
+                "product_name": row["product_name"],
+                "units_sold": _num(row["units_sold"]),
+                "revenue": _num(row["revenue"]),
+            }
+            for row in top_products
+        ],
+        "daily": [
+            {
+                "date": row["day"].isoformat() if isinstance(row["day"], date) else str(row["day"]),
+                "revenue": _num(row["revenue"]),
+                "units_sold": _num(row["units_sold"]),
+                "order_count": orders_by_day.get(row["day"], 0),
+            }
+            for row in by_day
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the sales rollup tables.")
+    parser.add_argument("--backfill", action="store_true", help="rebuild rollups from the full order history")
+    parser.add_argument("--fold", action="store_true", help="fold orders inserted since the last run")
+    args = parser.parse_args(argv)
+
+    if args.backfill:
+        backfill_rollups()
+    if args.fold:
+        print(f"Folded {fold_new_orders()} order line(s).")
+    if not (args.backfill or args.fold):
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
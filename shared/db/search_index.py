@@ -0,0 +1,316 @@
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from shared.db.connection import pooled_connection
+
+# Searchable fields and how much a match in each one is worth.
+FIELD_BOOSTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "style_tags": 1.5,
+    "gender": 1.0,
+    "description": 1.0,
+}
+FIELDS = list(FIELD_BOOSTS)
+
+# Columns kept per document so search results can be served without a DB round trip.
+RESULT_COLUMNS = ["id", "name", "category", "price", "color", "image_url",
+                  "description", "style_tags", "season", "gender"]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rebuild from the table periodically to pick up writes made by other processes.
+INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text) -> str:
+    """Lowercase and strip accents ("Áo sơ mi" -> "ao so mi")."""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text).lower().replace("đ", "d"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _stem(token: str) -> str:
+    # Light plural folding so "shirts"/"shirt" and "dresses"/"dress" meet.
+    if len(token) > 4 and token.endswith("es") and token[-3] in "sxz":
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text) -> list:
+    return [_stem(t) for t in _TOKEN_RE.findall(normalize(text))]
+
+
+def _doc_key(product_id):
+    # Tools receive ids as strings, the table returns ints.
+    if isinstance(product_id, str) and product_id.strip().isdigit():
+        return int(product_id)
+    return product_id
+
+
+class ProductSearchIndex:
+    """
+    Inverted index over the products table with BM25F ranking.
+
+    Postings map a term to {product_id: [tf per field]}; per-field document
+    lengths are kept for length normalization, and field scores are combined
+    using FIELD_BOOSTS before BM25 saturation.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._doc_lengths = {}
+        self._docs = {}
+        self._field_length_totals = [0] * len(FIELDS)
+        self.built_at = 0.0
+
+    # ---------------------------------------------------------------- build
+
+    def build(self, rows):
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._doc_terms = {}
+            self._doc_lengths = {}
+            self._docs = {}
+            self._field_length_totals = [0] * len(FIELDS)
+            for row in rows:
+                self._add(row)
+            self.built_at = time.monotonic()
+
+    def _add(self, row):
+        doc_id = _doc_key(row["id"])
+        tfs = defaultdict(lambda: [0] * len(FIELDS))
+        lengths = [0] * len(FIELDS)
+        for i, field in enumerate(FIELDS):
+            tokens = tokenize(row.get(field))
+            lengths[i] = len(tokens)
+            self._field_length_totals[i] += len(tokens)
+            for token in tokens:
+                tfs[token][i] += 1
+
+        for term, tf in tfs.items():
+            self._postings[term][doc_id] = tf
+        self._doc_terms[doc_id] = list(tfs)
+        self._doc_lengths[doc_id] = lengths
+        self._docs[doc_id] = {col: row.get(col) for col in RESULT_COLUMNS}
+
+    def _remove(self, doc_id):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        for i, length in enumerate(self._doc_lengths.pop(doc_id)):
+            self._field_length_totals[i] -= length
+        self._docs.pop(doc_id, None)
+        return True
+
+    # -------------------------------------------------------- incremental
+
+    def upsert(self, row):
+        with self._lock:
+            self._remove(_doc_key(row["id"]))
+            self._add(row)
+
+    def remove(self, doc_id) -> bool:
+        with self._lock:
+            return self._remove(_doc_key(doc_id))
+
+    # --------------------------------------------------------------- query
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _score(self, terms) -> dict:
+        n_docs = len(self._docs)
+        avg_lengths = [max(total / n_docs, 1e-9) for total in self._field_length_totals]
+        boosts = [FIELD_BOOSTS[f] for f in FIELDS]
+
+        scores = defaultdict(float)
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for doc_id, tf in postings.items():
+                lengths = self._doc_lengths[doc_id]
+                weighted_tf = 0.0
+                for i, f_tf in enumerate(tf):
+                    if f_tf:
+                        norm = 1 - BM25_B + BM25_B * lengths[i] / avg_lengths[i]
+                        weighted_tf += boosts[i] * f_tf / norm
+                scores[doc_id] += idf * weighted_tf / (BM25_K1 + weighted_tf)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Return up to `limit` product rows ranked by BM25F score."""
+        rows, _ = self.search_after(query, limit)
+        return rows
+
+    def search_after(self, query: str, limit: int = 10, after=None):
+        """
+        Keyset page over the ranking: rows strictly after `after` in (score desc, id asc) order.
+
+        Args:
+            query (str): Search text.
+            limit (int): Page size.
+            after (tuple, optional): (score, product_id) of the last row of the previous page.
+
+        Returns:
+            tuple: (rows, last_key) where last_key is the (score, product_id) to pass for
+            the next page, or None when there are no more results.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return [], None
+
+        with self._lock:
+            if not self._docs:
+                return [], None
+            scores = self._score(terms)
+            candidates = scores.items()
+            if after is not None:
+                after_key = (-after[0], after[1])
+                candidates = [kv for kv in candidates if (-kv[1], kv[0]) > after_key]
+            # Bounded heap: the cost is the same for page 1 and page N.
+            ranked = heapq.nsmallest(limit + 1, candidates, key=lambda kv: (-kv[1], kv[0]))
+            has_more = len(ranked) > limit
+            ranked = ranked[:limit]
+            rows = [dict(self._docs[doc_id]) for doc_id, _ in ranked]
+            last_key = (ranked[-1][1], ranked[-1][0]) if has_more else None
+            return rows, last_key
+
+    def search_groups_after(self, query: str, group_of, limit: int = 10, after=None):
+        """
+        Keyset page over groups of products (e.g. families), each ranked by its best-scoring member.
+
+        Args:
+            query (str): Search text.
+            group_of (callable): Product row -> int group id.
+            limit (int): Groups per page.
+            after (tuple, optional): (score, group_id) of the last group of the previous page.
+
+        Returns:
+            tuple: (rows, last_key) with one row (the best match) per group; last_key is the
+            (score, group_id) to pass for the next page, or None when there are no more groups.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return [], None
+
+        with self._lock:
+            if not self._docs:
+                return [], None
+            matches = [(score, self._docs[doc_id]) for doc_id, score in self._score(terms).items()]
+
+        best = {}
+        for score, row in matches:
+            group_id = group_of(row)
+            current = best.get(group_id)
+            if current is None or (-score, row["id"]) < (-current[0], current[1]["id"]):
+                best[group_id] = (score, row)
+        candidates = best.items()
+        if after is not None:
+            after_key = (-after[0], after[1])
+            candidates = [kv for kv in candidates if (-kv[1][0], kv[0]) > after_key]
+        ranked = heapq.nsmallest(limit + 1, candidates, key=lambda kv: (-kv[1][0], kv[0]))
+        has_more = len(ranked) > limit
+        ranked = ranked[:limit]
+        rows = [dict(row) for _, (_, row) in ranked]
+        last_key = (ranked[-1][1][0], ranked[-1][0]) if has_more else None
+        return rows, last_key
+
+    def count_groups(self, query: str, group_of) -> int:
+        """Number of distinct groups (see `search_groups_after`) with a product matching `query`."""
+        terms = set(tokenize(query))
+        with self._lock:
+            matched = set()
+            for term in terms:
+                matched.update(self._postings.get(term, ()))
+            rows = [self._docs[doc_id] for doc_id in matched]
+        return len({group_of(row) for row in rows})
+
+    def count(self, query: str) -> int:
+        """Number of products matching at least one query term (no scoring)."""
+        terms = set(tokenize(query))
+        with self._lock:
+            matched = set()
+            for term in terms:
+                matched.update(self._postings.get(term, ()))
+            return len(matched)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _load_rows(product_ids=None):
+    columns = ", ".join(RESULT_COLUMNS)
+    with pooled_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            if product_ids is None:
+                cursor.execute(f"SELECT {columns} FROM products")
+            else:
+                placeholders = ", ".join(["%s"] * len(product_ids))
+                cursor.execute(f"SELECT {columns} FROM products WHERE id IN ({placeholders})", list(product_ids))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+def get_search_index() -> ProductSearchIndex:
+    """Return the process-wide index, building it from the products table on first use."""
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.built_at < INDEX_TTL:
+        return index
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.built_at >= INDEX_TTL:
+            fresh = ProductSearchIndex()
+            fresh.build(_load_rows())
+            _index = fresh
+            print(f"Search index built with {len(fresh)} products.")
+        return _index
+
+
+def refresh_products(product_ids):
+    """Re-read the given products and update (or drop) their index entries."""
+    if _index is None or not product_ids:
+        return
+    try:
+        rows = _load_rows(product_ids)
+        found = {_doc_key(row["id"]) for row in rows}
+        for row in rows:
+            _index.upsert(row)
+        for product_id in product_ids:
+            if _doc_key(product_id) not in found:
+                _index.remove(product_id)
+    except Exception as e:
+        print(f"Failed to refresh search index for {product_ids}: {str(e)}")
+
+
+def remove_products(product_ids):
+    if _index is None:
+        return
+    for product_id in product_ids:
+        _index.remove(product_id)
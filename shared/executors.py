@@ -0,0 +1,63 @@
+"""
+Bounded thread pools for running blocking work off the event loop.
+
+The agent's tools are coroutines; anything that blocks (MySQL, vector-store
+HTTP calls, model inference) is handed to one of these pools with
+`run_blocking`, so a slow call only occupies a worker thread instead of
+stalling every session on the loop.
+
+- "db":    sized to the MySQL pool, so threads never queue on a connection
+- "io":    vector-store calls (VECTOR_IO_WORKERS)
+- "embed": CPU-bound encoding (EMBED_WORKERS); kept small because the model
+           already parallelizes each forward pass internally
+- "import": whole bulk-import jobs (IMPORT_WORKERS, default 1), so a long import
+           never holds a vector-store worker and concurrent imports queue up
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXECUTOR_SIZES = {
+    "db": int(os.getenv("MYSQL_POOL_SIZE", "10")),
+    "io": int(os.getenv("VECTOR_IO_WORKERS", "8")),
+    "embed": int(os.getenv("EMBED_WORKERS", "2")),
+    "import": int(os.getenv("IMPORT_WORKERS", "1")),
+}
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(kind: str) -> ThreadPoolExecutor:
+    executor = _executors.get(kind)
+    if executor is not None:
+        return executor
+    if kind not in EXECUTOR_SIZES:
+        raise ValueError(f"Unknown executor: {kind}")
+    with _executors_lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max(1, EXECUTOR_SIZES[kind]), thread_name_prefix=f"{kind}-worker")
+            _executors[kind] = executor
+    return executor
+
+
+async def run_blocking(kind: str, func, *args, **kwargs):
+    """Await `func(*args, **kwargs)` on the `kind` pool."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the current trace span) into the worker thread.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(kind), functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executors(wait: bool = True):
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=wait)
+        _executors.clear()
@@ -0,0 +1,258 @@
+"""
+Bulk import of products from a CSV or XLSX spreadsheet.
+
+    python -m shared.pinecone.bulk_import drop.xlsx --batch-size 500
+    python -m shared.pinecone.bulk_import drop.csv --dry-run --errors exports/drop_errors.csv
+
+The file is read row by row (csv reader / openpyxl read-only mode; .csv.zst
+is decompressed on the fly), so a file of any size is never fully loaded.
+Every batch of valid rows is inserted with one multi-row INSERT, embedded in
+one batched model call, upserted in chunked requests and its vector ids
+written back with one UPDATE. Invalid or failed rows are reported with their
+spreadsheet line number and never abort the rest of the import.
+
+The first row must be a header; column names are matched case-insensitively.
+Both `img_url` and `image_url` are accepted, and extra columns (e.g. `id` and
+`vector_id` in a file produced by the product export) are ignored.
+"""
+import argparse
+import csv
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+from shared.db.queries import add_products, update_vector_ids
+from shared.executors import run_blocking
+from shared.pinecone.embed_utils import get_product_embeddings, product_content_hash
+from shared.pinecone.index_product_vectors import build_vector_metadata, product_vector_id
+from shared.vector_store.client import get_vector_store
+
+REQUIRED_FIELDS = ("name", "category", "price", "description", "style_tags", "color", "season", "gender", "img_url")
+SUPPORTED_FORMATS = (".csv", ".csv.zst", ".xlsx")
+
+
+def _open_csv(path: str):
+    raw = open(path, "rb")
+    binary = raw
+    if path.endswith(".zst"):
+        import zstandard
+        binary = zstandard.ZstdDecompressor().stream_reader(raw)
+    return raw, io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+def iter_spreadsheet_rows(path: str):
+    """
+    Stream (line_number, row dict) pairs from a CSV or XLSX file.
+
+    Keys are the lower-cased header names; blank rows are skipped.
+    """
+    lower = path.lower()
+    if lower.endswith(".xlsx"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(h).strip().lower() if h is not None else "" for h in next(rows, ())]
+            for line, values in enumerate(rows, start=2):
+                if values and any(v not in (None, "") for v in values):
+                    yield line, dict(zip(header, values))
+        finally:
+            workbook.close()
+    elif lower.endswith(".csv") or lower.endswith(".csv.zst"):
+        raw, text = _open_csv(path)
+        try:
+            reader = csv.reader(text)
+            header = [h.strip().lower() for h in next(reader, [])]
+            for values in reader:
+                if any(v.strip() for v in values):
+                    yield reader.line_num, dict(zip(header, values))
+        finally:
+            text.close()
+            raw.close()
+    else:
+        raise ValueError(f"Unsupported import file '{path}'. Use one of: {', '.join(SUPPORTED_FORMATS)}.")
+
+
+def validate_row(row: dict):
+    """
+    Normalize a spreadsheet row into product data.
+
+    Returns:
+        tuple: (product dict, None) for a valid row, or (None, error message).
+    """
+    if not row.get("img_url") and row.get("image_url"):
+        row = {**row, "img_url": row["image_url"]}
+    product = {}
+    missing = []
+    for field in REQUIRED_FIELDS:
+        value = row.get(field)
+        value = "" if value is None else str(value).strip()
+        if not value:
+            missing.append(field)
+        product[field] = value
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+
+    try:
+        price = Decimal(product["price"].replace(",", ""))
+    except InvalidOperation:
+        return None, f"invalid price '{product['price']}'"
+    if not price.is_finite() or price < 0:
+        return None, f"invalid price '{product['price']}'"
+    product["price"] = float(round(price, 2))
+    if len(product["name"]) > 255:
+        return None, "name longer than 255 characters"
+    return product, None
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _iter_batches(path: str, batch_size: int, errors: list):
+    """Yield lists of (line, product) with up to `batch_size` valid rows; invalid rows go to `errors`."""
+    batch = []
+    for line, row in iter_spreadsheet_rows(path):
+        product, error = validate_row(row)
+        if error:
+            errors.append({"row": line, "name": str(row.get("name") or ""), "error": error})
+            continue
+        batch.append((line, product))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_products(path: str, batch_size: int = 500, encode_batch_size: int = 64, upsert_chunk_size: int = 100,
+                    max_concurrency: int = 4, dry_run: bool = False, index_name: str = None,
+                    backend: str = None) -> dict:
+    """
+    Import every valid row of a CSV/XLSX file as a new, indexed product.
+
+    Args:
+        path (str): Spreadsheet path (.csv, .csv.zst or .xlsx).
+        batch_size (int): Valid rows inserted, embedded and upserted together.
+        encode_batch_size (int): Texts per SentenceTransformer forward pass.
+        upsert_chunk_size (int): Vectors per upsert request.
+        max_concurrency (int): Upsert requests in flight at once.
+        dry_run (bool): Only validate the file; nothing is written.
+        index_name (str, optional): Target vector index (defaults to VECTOR_INDEX_NAME).
+        backend (str, optional): Vector store backend (defaults to VECTOR_STORE_BACKEND).
+
+    Returns:
+        dict: {"valid", "imported", "indexed", "failed", "errors", "elapsed_seconds", "rows_per_second"}
+            where "errors" lists {"row", "name", "error"} for every rejected or failed row.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Import file not found: {path}")
+    store = None if dry_run else get_vector_store(backend, index_name)
+    errors = []
+    valid = imported = indexed = 0
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for batch in _iter_batches(path, batch_size, errors):
+            valid += len(batch)
+            if dry_run:
+                continue
+
+            saved = []
+            for (line, product), (product_id, error) in zip(batch, add_products([p for _, p in batch])):
+                if product_id is None:
+                    errors.append({"row": line, "name": product["name"], "error": f"insert failed: {error}"})
+                else:
+                    saved.append((line, {**product, "id": product_id}))
+            imported += len(saved)
+            if not saved:
+                continue
+
+            try:
+                products = [p for _, p in saved]
+                embeddings = get_product_embeddings(products, batch_size=encode_batch_size)
+                vectors = [(product_vector_id(p["id"]), embedding, build_vector_metadata(p))
+                           for p, embedding in zip(products, embeddings)]
+                futures = [executor.submit(store.upsert, chunk) for chunk in _chunks(vectors, upsert_chunk_size)]
+                for future in futures:
+                    future.result()
+                update_vector_ids({p["id"]: product_vector_id(p["id"]) for p in products},
+                                  {p["id"]: product_content_hash(p) for p in products})
+                indexed += len(products)
+            except Exception as e:
+                # The rows are saved; `bulk_index --only-missing` indexes them later.
+                for line, product in saved:
+                    errors.append({"row": line, "name": product["name"],
+                                   "error": f"saved as product {product['id']} but not indexed: {str(e)}"})
+
+            elapsed = time.perf_counter() - started
+            print(f"Imported {imported} products ({indexed} indexed, {len(errors)} errors, "
+                  f"{imported / elapsed:.1f} rows/s).")
+
+    errors.sort(key=lambda e: e["row"])
+    elapsed = time.perf_counter() - started
+    report = {
+        "valid": valid,
+        "imported": imported,
+        "indexed": indexed,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(imported / elapsed, 1) if elapsed else 0.0,
+    }
+    summary = {key: value for key, value in report.items() if key != "errors"}
+    print(f"{'✅' if not errors else '⚠️'} Bulk import finished: {summary}")
+    return report
+
+
+async def aimport_products(path: str, batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Async `import_products`, run on the dedicated "import" executor (it is a long, mostly blocking job)."""
+    return await run_blocking("import", import_products, path, batch_size, dry_run=dry_run)
+
+
+def write_error_report(errors: list, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["row", "name", "error"])
+        writer.writeheader()
+        writer.writerows(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import products from a CSV/XLSX file and index them.")
+    parser.add_argument("path", help="spreadsheet to import (.csv, .csv.zst or .xlsx)")
+    parser.add_argument("--batch-size", type=int, default=500, help="valid rows per insert/embed/upsert batch")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="texts per model forward pass")
+    parser.add_argument("--upsert-chunk-size", type=int, default=100, help="vectors per upsert request")
+    parser.add_argument("--concurrency", type=int, default=4, help="upsert requests in flight")
+    parser.add_argument("--dry-run", action="store_true", help="only validate the file")
+    parser.add_argument("--errors", metavar="PATH", help="write rejected rows to this CSV file")
+    parser.add_argument("--index-name", default=None, help="vector index (default: VECTOR_INDEX_NAME)")
+    parser.add_argument("--backend", default=None, choices=["pinecone", "local"],
+                        help="vector store backend (default: VECTOR_STORE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    report = import_products(
+        args.path,
+        batch_size=args.batch_size,
+        encode_batch_size=args.encode_batch_size,
+        upsert_chunk_size=args.upsert_chunk_size,
+        max_concurrency=args.concurrency,
+        dry_run=args.dry_run,
+        index_name=args.index_name,
+        backend=args.backend,
+    )
+    for error in report["errors"][:20]:
+        print(f"❌ Row {error['row']} ({error['name'] or 'no name'}): {error['error']}")
+    if len(report["errors"]) > 20:
+        print(f"... and {len(report['errors']) - 20} more.")
+    if args.errors and report["errors"]:
+        write_error_report(report["errors"], args.errors)
+        print(f"Saved: {args.errors}")
+
+
+if __name__ == "__main__":
+    main()
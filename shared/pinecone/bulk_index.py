@@ -0,0 +1,167 @@
+"""
+Bulk (re-)indexing of the products table into the vector store.
+
+    python -m shared.pinecone.bulk_index --batch-size 512 --concurrency 4 --resume
+
+Rows are streamed from MySQL in id order, encoded in batches, upserted in
+chunked requests on a bounded thread pool, and their vector ids written back
+with one multi-row UPDATE per batch. After every completed batch the last
+product id is saved to a checkpoint file so an interrupted run can resume.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.db.queries import iter_products_by_id, update_vector_ids
+from shared.pinecone.embed_utils import get_product_embeddings, product_content_hash
+from shared.pinecone.index_product_vectors import build_vector_metadata, product_vector_id
+from shared.vector_store.client import get_vector_store
+
+DEFAULT_CHECKPOINT = os.path.join("exports", "bulk_index.checkpoint.json")
+
+
+def _load_checkpoint(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path: str, state: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_index_products(batch_size: int = 256, encode_batch_size: int = 64, upsert_chunk_size: int = 100,
+                        max_concurrency: int = 4, only_missing: bool = False, resume: bool = False,
+                        checkpoint_path: str = DEFAULT_CHECKPOINT, index_name: str = None,
+                        backend: str = None) -> dict:
+    """
+    Embed and upsert every product (or only those without a vector).
+
+    Vectors are written under the product's stable id (`product_vector_id`),
+    so re-indexing overwrites in place; legacy random ids are deleted.
+
+    Args:
+        batch_size (int): Rows read from MySQL and written back per batch.
+        encode_batch_size (int): Texts per SentenceTransformer forward pass.
+        upsert_chunk_size (int): Vectors per upsert request.
+        max_concurrency (int): Upsert requests in flight at once.
+        only_missing (bool): Only index rows whose vector_id is empty.
+        resume (bool): Continue after the last id recorded in `checkpoint_path`.
+        checkpoint_path (str): Where progress is recorded after every batch.
+        index_name (str, optional): Target vector index (defaults to VECTOR_INDEX_NAME).
+        backend (str, optional): Vector store backend (defaults to VECTOR_STORE_BACKEND).
+
+    Returns:
+        dict: {"indexed", "batches", "last_id", "elapsed_seconds", "rows_per_second"}
+    """
+    store = get_vector_store(backend, index_name)
+    state = _load_checkpoint(checkpoint_path) if resume else {}
+    after_id = state.get("last_id", 0)
+    indexed = state.get("indexed", 0) if resume else 0
+    if after_id:
+        print(f"Resuming after product id {after_id} ({indexed} already indexed).")
+
+    started = time.perf_counter()
+    run_indexed = 0
+    batches = 0
+    last_id = after_id
+    pending = None  # (rows, vector_ids, content_hashes, legacy_ids, futures) of the batch whose upserts are in flight
+
+    def finish(batch):
+        nonlocal indexed, run_indexed, batches, last_id
+        rows, vector_ids, content_hashes, legacy_ids, futures = batch
+        for future in futures:
+            future.result()
+        # Raises on a failed write so the checkpoint never moves past rows whose ids were not recorded.
+        update_vector_ids(vector_ids, content_hashes, strict=True)
+        if legacy_ids:
+            store.delete(legacy_ids)
+        indexed += len(rows)
+        run_indexed += len(rows)
+        batches += 1
+        last_id = rows[-1]["id"]
+        _save_checkpoint(checkpoint_path, {"last_id": last_id, "indexed": indexed})
+        elapsed = time.perf_counter() - started
+        print(f"Indexed {indexed} products (last id {last_id}, {run_indexed / elapsed:.1f} rows/s).")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for rows in iter_products_by_id(batch_size=batch_size, after_id=after_id,
+                                        only_missing_vectors=only_missing):
+            # Encoding this batch overlaps with the previous batch's upserts.
+            embeddings = get_product_embeddings(rows, batch_size=encode_batch_size)
+
+            vector_ids = {}
+            content_hashes = {}
+            legacy_ids = []
+            vectors = []
+            for row, embedding in zip(rows, embeddings):
+                vector_id = product_vector_id(row["id"])
+                if row.get("vector_id") and row["vector_id"] != vector_id:
+                    legacy_ids.append(row["vector_id"])
+                vector_ids[row["id"]] = vector_id
+                content_hashes[row["id"]] = product_content_hash(row)
+                vectors.append((vector_id, embedding, build_vector_metadata(row)))
+
+            if pending is not None:
+                finish(pending)
+            futures = [executor.submit(store.upsert, chunk)
+                       for chunk in _chunks(vectors, upsert_chunk_size)]
+            pending = (rows, vector_ids, content_hashes, legacy_ids, futures)
+
+        if pending is not None:
+            finish(pending)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "indexed": run_indexed,
+        "batches": batches,
+        "last_id": last_id,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(run_indexed / elapsed, 1) if elapsed else 0.0,
+    }
+    print(f"✅ Bulk indexing finished: {report}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-index products into the vector store.")
+    parser.add_argument("--batch-size", type=int, default=256, help="rows per DB batch")
+    parser.add_argument("--encode-batch-size", type=int, default=64, help="texts per model forward pass")
+    parser.add_argument("--upsert-chunk-size", type=int, default=100, help="vectors per upsert request")
+    parser.add_argument("--concurrency", type=int, default=4, help="upsert requests in flight")
+    parser.add_argument("--only-missing", action="store_true", help="only index products without a vector_id")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint file")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--index-name", default=None, help="vector index (default: VECTOR_INDEX_NAME)")
+    parser.add_argument("--backend", default=None, choices=["pinecone", "local"],
+                        help="vector store backend (default: VECTOR_STORE_BACKEND)")
+    args = parser.parse_args(argv)
+
+    bulk_index_products(
+        batch_size=args.batch_size,
+        encode_batch_size=args.encode_batch_size,
+        upsert_chunk_size=args.upsert_chunk_size,
+        max_concurrency=args.concurrency,
+        only_missing=args.only_missing,
+        resume=args.resume,
+        checkpoint_path=args.checkpoint,
+        index_name=args.index_name,
+        backend=args.backend,
+    )
+
+
+if __name__ == "__main__":
+    main()
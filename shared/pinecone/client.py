@@ -1,12 +1,30 @@
 import os
+import threading
 from dotenv import load_dotenv
-from pinecone import Pinecone, PodSpec
 
 load_dotenv()
 
-# Tạo client Pinecone mới
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+# Built on first use so importing this module stays cheap.
+_pc = None
+_pc_lock = threading.Lock()
+
+def get_pinecone_client():
+    """Return the shared Pinecone client, creating it on first call (thread-safe)."""
+    global _pc
+    if _pc is None:
+        with _pc_lock:
+            if _pc is None:
+                from pinecone import Pinecone
+                # Tạo client Pinecone mới
+                _pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    return _pc
+
+def __getattr__(name):
+    # Keep `client.pc` working for callers that used the eager global.
+    if name == "pc":
+        return get_pinecone_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Lấy index (giả sử đã tạo sẵn trên dashboard)
 def get_pinecone_index(index_name="fashion-style"):
-    return pc.Index(index_name)
+    return get_pinecone_client().Index(index_name)
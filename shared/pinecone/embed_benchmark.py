@@ -0,0 +1,182 @@
+"""
+Accuracy and throughput of the CPU embedding backends against torch.
+
+For every candidate backend (see EMBED_BACKEND in embed_utils) the catalog
+and a set of queries are encoded with both torch and the candidate, and the
+top-k neighbours of each query are compared with the torch ones:
+
+- recall@k (switch):      catalog and queries both encoded by the candidate
+- recall@k (query-only):  candidate queries against the torch-built index,
+                          i.e. switching backends without re-indexing
+- cosine:                 mean cosine between torch and candidate vectors
+
+Throughput is batch encoding (texts/s) and single-text latency (p50/p95 ms).
+
+    python -m shared.pinecone.embed_benchmark                       # catalog from MySQL
+    python -m shared.pinecone.embed_benchmark --synthetic 5000 --threads 4
+    python -m shared.pinecone.embed_benchmark --backends onnx-int8 --json exports/embed_benchmark.json
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+from shared.pinecone.embed_utils import BACKENDS, EMBED_THREADS, MODEL_NAME, compose_product_text, load_model
+
+QUERY_PROMPTS = [
+    "a casual look for a summer picnic",
+    "something warm for a chilly winter trip",
+    "an outfit for the gym and a morning run",
+    "beachwear for a pool party on vacation",
+    "a classy outfit for a formal dinner",
+    "comfortable shoes for walking all day",
+    "a minimal black outfit for the office",
+    "vintage streetwear with sneakers",
+]
+
+
+def catalog_texts(limit: int = None, synthetic: int = None) -> list:
+    """Product texts as they are indexed, from MySQL or a synthetic catalog."""
+    if synthetic:
+        from benchmarks.hot_paths import synthetic_catalog
+        products = synthetic_catalog(synthetic)
+    else:
+        from shared.db.queries import iter_products_by_id
+        products = []
+        for batch in iter_products_by_id():
+            products.extend(batch)
+            if limit and len(products) >= limit:
+                break
+    products = products[:limit] if limit else products
+    return [
+        compose_product_text(p["name"], p["description"], p["style_tags"], p["category"], p["season"])
+        for p in products
+    ]
+
+
+def _encode(model, texts: list, batch_size: int) -> np.ndarray:
+    return np.asarray(model.encode(texts, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def recall_at_k(reference: np.ndarray, candidate: np.ndarray) -> float:
+    """Mean share of each reference top-k that the candidate also returns."""
+    hits = [len(set(ref) & set(cand)) / len(ref) for ref, cand in zip(reference.tolist(), candidate.tolist())]
+    return round(float(np.mean(hits)), 4)
+
+
+def throughput(model, texts: list, batch_size: int, singles: int = 50) -> dict:
+    sample = texts[: max(batch_size * 4, 256)]
+    model.encode(sample[:batch_size], batch_size=batch_size)  # warm-up
+    started = time.perf_counter()
+    model.encode(sample, batch_size=batch_size)
+    batch_rate = len(sample) / (time.perf_counter() - started)
+
+    latencies = []
+    for text in texts[:singles]:
+        started = time.perf_counter()
+        model.encode(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "batch_texts_per_s": round(batch_rate, 1),
+        "single_p50_ms": round(latencies[len(latencies) // 2], 2),
+        "single_p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+    }
+
+
+def run(texts: list, backends: list, k: int = 10, queries: int = 200, threads: int = EMBED_THREADS,
+        batch_size: int = 64, seed: int = 7) -> dict:
+    """
+    Compare each backend in `backends` with torch on `texts`.
+
+    Args:
+        texts (list): Catalog texts (the index).
+        backends (list): Candidate backends, e.g. ["onnx", "onnx-int8"].
+        k (int): Neighbours per query for recall@k.
+        queries (int): Catalog texts reused as queries, besides QUERY_PROMPTS.
+        threads (int): Intra-op threads for every backend (0 = runtime default).
+
+    Returns:
+        dict: {"model", "products", "queries", "k", "threads", "backends": {name: metrics}}
+    """
+    query_texts = QUERY_PROMPTS + random.Random(seed).sample(texts, min(queries, len(texts)))
+
+    reference_model = load_model("torch", threads)
+    reference_corpus = _encode(reference_model, texts, batch_size)
+    reference_queries = _encode(reference_model, query_texts, batch_size)
+    reference_top = _top_k(reference_queries, reference_corpus, k)
+
+    report = {"torch": {**throughput(reference_model, texts, batch_size),
+                        "recall_switch": 1.0, "recall_query_only": 1.0, "cosine": 1.0}}
+    del reference_model
+
+    for backend in backends:
+        if backend == "torch":
+            continue
+        model = load_model(backend, threads)
+        corpus = _encode(model, texts, batch_size)
+        query_vectors = _encode(model, query_texts, batch_size)
+        report[backend] = {
+            **throughput(model, texts, batch_size),
+            "recall_switch": recall_at_k(reference_top, _top_k(query_vectors, corpus, k)),
+            "recall_query_only": recall_at_k(reference_top, _top_k(query_vectors, reference_corpus, k)),
+            "cosine": round(float(np.mean(np.sum(corpus * reference_corpus, axis=1))), 4),
+        }
+        del model
+
+    return {
+        "model": MODEL_NAME,
+        "products": len(texts),
+        "queries": len(query_texts),
+        "k": k,
+        "threads": threads,
+        "backends": report,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare embedding backends with torch: recall@k and throughput.")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"], choices=BACKENDS)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="catalog texts reused as queries")
+    parser.add_argument("--limit", type=int, help="use at most this many products")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="use N synthetic products instead of MySQL")
+    parser.add_argument("--threads", type=int, default=EMBED_THREADS, help="intra-op threads (0 = default)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    texts = catalog_texts(args.limit, args.synthetic)
+    if len(texts) < 2:
+        print("❌ Not enough products to compare backends.")
+        return
+    report = run(texts, args.backends, k=args.k, queries=args.queries, threads=args.threads,
+                 batch_size=args.batch_size)
+
+    print(f"Embedding backends ({report['model']}, {report['products']} products, "
+          f"{report['queries']} queries, k={report['k']}, threads={report['threads'] or 'default'}):")
+    print(f"{'backend':<11} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall':>8} {'q-only':>8} {'cosine':>8}")
+    for name, row in report["backends"].items():
+        print(f"{name:<11} {row['batch_texts_per_s']:>9} {row['single_p50_ms']:>8} {row['single_p95_ms']:>8} "
+              f"{row['recall_switch']:>8} {row['recall_query_only']:>8} {row['cosine']:>8}")
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
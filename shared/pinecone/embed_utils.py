@@ -1,8 +1,185 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from shared.pinecone.embedding_cache import EmbeddingCache
+from shared.executors import run_blocking
+from shared.tracing import traced, set_attributes
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+load_dotenv()
 
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# "torch" (fp32 PyTorch), "onnx" (ONNX Runtime, fp32) or "onnx-int8" (dynamically quantized ONNX)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))                 # 0 = runtime default
+EMBED_QUANTIZATION = os.getenv("EMBED_QUANTIZATION", "avx2")          # arm64 | avx2 | avx512 | avx512_vnni
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", os.path.join(".cache", "onnx"))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Loaded on first use: importing sentence_transformers pulls in torch (seconds, hundreds of MB).
+_model = None
+_model_lock = threading.Lock()
+_embedding_cache = None
+_cache_lock = threading.Lock()
+
+def embedding_model_id(backend: str = None) -> str:
+    """
+    Identity of the vectors a backend produces (used to key the embedding cache).
+
+    torch and fp32 ONNX give the same vectors; int8 ones differ slightly, so they get their own cache.
+    """
+    backend = backend or EMBED_BACKEND
+    return MODEL_NAME if backend in ("torch", "onnx") else f"{MODEL_NAME}-{backend}-{EMBED_QUANTIZATION}"
+
+def _onnx_model_kwargs(threads: int) -> dict:
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    if threads:
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_kwargs["session_options"] = options
+    return model_kwargs
+
+def export_quantized_model(quantization: str = None) -> str:
+    """
+    Export MODEL_NAME to ONNX and write a dynamically int8-quantized copy.
+
+    Returns:
+        str: Local model directory (the quantized file is onnx/model_qint8_<quantization>.onnx).
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    quantization = quantization or EMBED_QUANTIZATION
+    path = os.path.join(EMBED_ONNX_DIR, MODEL_NAME)
+    model = SentenceTransformer(MODEL_NAME, backend="onnx")
+    model.save(path)
+    export_dynamic_quantized_onnx_model(model, quantization, path)
+    print(f"✅ Exported int8 ({quantization}) ONNX model to {path}")
+    return path
+
+def load_model(backend: str = None, threads: int = None):
+    """
+    Load MODEL_NAME on the given CPU backend.
+
+    Args:
+        backend (str, optional): "torch", "onnx" or "onnx-int8" (default: EMBED_BACKEND).
+        threads (int, optional): Intra-op threads; 0 keeps the runtime default (default: EMBED_THREADS).
+    """
+    from sentence_transformers import SentenceTransformer
+    backend = (backend or EMBED_BACKEND).lower()
+    threads = EMBED_THREADS if threads is None else threads
+
+    if backend == "torch":
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return SentenceTransformer(MODEL_NAME)
+    if backend == "onnx":
+        return SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs=_onnx_model_kwargs(threads))
+    if backend == "onnx-int8":
+        path = os.path.join(EMBED_ONNX_DIR, MODEL_NAME)
+        file_name = f"onnx/model_qint8_{EMBED_QUANTIZATION}.onnx"
+        if not os.path.exists(os.path.join(path, file_name)):
+            export_quantized_model()
+        return SentenceTransformer(path, backend="onnx",
+                                   model_kwargs={**_onnx_model_kwargs(threads), "file_name": file_name})
+    raise ValueError(f"Unknown embedding backend '{backend}'. Use one of: {', '.join(BACKENDS)}.")
+
+def get_model():
+    """Return the shared SentenceTransformer, loading it on first call (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                started = time.perf_counter()
+                _model = load_model()
+                print(f"Loaded embedding model {MODEL_NAME} ({EMBED_BACKEND}) in {time.perf_counter() - started:.2f}s.")
+    return _model
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(embedding_model_id())
+    return _embedding_cache
+
+def __getattr__(name):
+    # Keep `embed_utils.model` working for callers that used the eager global.
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def compose_product_text(name: str, description: str, style_tags: str, category: str, season: str) -> str:
+    return f"{name}. {description}. Category: {category}. Tags: {style_tags}. Season: {season}."
+
+def product_content_hash(product: dict) -> str:
+    """
+    MD5 of the text a product's vector is built from, plus the model that embeds it.
+
+    Stored in `products.content_hash` when the vector is written; a row whose current
+    hash differs has changed (or the model has) since it was indexed.
+    """
+    text = compose_product_text(product["name"], product["description"], product["style_tags"],
+                                product["category"], product["season"])
+    return hashlib.md5(f"{embedding_model_id()}\x1f{text}".encode("utf-8")).hexdigest()
+
+@traced("embedding.get_product_embedding", attributes=lambda result, args, kwargs: {"embedding.dim": len(result)})
 def get_product_embedding(name: str, description: str, style_tags: str, category: str, season: str):
-    text = f"{name}. {description}. Category: {category}. Tags: {style_tags}. Season: {season}."
-    return model.encode(text).tolist()
+    text = compose_product_text(name, description, style_tags, category, season)
+    embedding_cache = get_embedding_cache()
+    vector = embedding_cache.get(text)
+    set_attributes(**{"cache.hit": vector is not None})
+    if vector is None:
+        vector = get_model().encode(text)
+        embedding_cache.put(text, vector)
+    return vector.tolist()
+
+@traced("embedding.aget_product_embedding", attributes=lambda result, args, kwargs: {"embedding.dim": len(result)})
+async def aget_product_embedding(name: str, description: str, style_tags: str, category: str, season: str):
+    """Async `get_product_embedding`: cache hits return inline, misses are encoded on the "embed" executor."""
+    text = compose_product_text(name, description, style_tags, category, season)
+    vector = get_embedding_cache().get(text)
+    set_attributes(**{"cache.hit": vector is not None})
+    if vector is not None:
+        return vector.tolist()
+    return await run_blocking("embed", get_product_embedding, name, description, style_tags, category, season)
+
+@traced("embedding.get_product_embeddings")
+def get_product_embeddings(products: list, batch_size: int = 64) -> list:
+    """
+    Encode many products in one call; the model batches them internally.
+
+    Cached texts are served from the embedding cache; only the misses are encoded.
+
+    Args:
+        products (list): Product dicts with name, description, style_tags, category and season.
+        batch_size (int): Number of texts per forward pass.
+
+    Returns:
+        list: One embedding (list of floats) per product, in input order.
+    """
+    texts = [
+        compose_product_text(p["name"], p["description"], p["style_tags"], p["category"], p["season"])
+        for p in products
+    ]
+    embedding_cache = get_embedding_cache()
+    vectors = [embedding_cache.get(text) for text in texts]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    set_attributes(**{"cache.hits": len(texts) - len(missing), "cache.misses": len(missing)})
+    if missing:
+        encoded = get_model().encode([texts[i] for i in missing], batch_size=batch_size)
+        for i, vector in zip(missing, encoded):
+            embedding_cache.put(texts[i], vector)
+            vectors[i] = vector
+        embedding_cache.flush()
+    return [vector.tolist() for vector in vectors]
+
+async def aget_product_embeddings(products: list, batch_size: int = 64) -> list:
+    return await run_blocking("embed", get_product_embeddings, products, batch_size)
 
+def embedding_cache_stats() -> dict:
+    return get_embedding_cache().stats()
@@ -0,0 +1,248 @@
+"""
+Two-tier cache for text embeddings.
+
+Tier 1 is a bounded in-memory LRU. Tier 2 lives on disk and survives restarts:
+a memory-mapped float32 matrix (`vectors.f32`, one row per text) plus an
+append-only key index (`keys.idx`, one hex digest per row), shared safely by
+every process pointed at the same directory. Keys are a hash of
+the model name and the composed text. Each model gets its own subdirectory
+(recording the model in `meta.json`), so switching models starts a fresh tier
+without touching files other processes may still have mapped; subdirectories
+of models no longer in use can be deleted offline.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from filelock import FileLock
+
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(".cache", "embeddings"))
+MEMORY_CACHE_SIZE = int(os.getenv("EMBED_CACHE_MEMORY_SIZE", "2048"))
+DISK_CACHE_ENABLED = os.getenv("EMBED_CACHE_DISK", "1") != "0"
+
+_INITIAL_ROWS = 1024
+
+
+def cache_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """
+    The on-disk tier. Several processes may share one directory: appends happen
+    under a file lock after re-reading the rows other processes have added, so
+    each row index is assigned exactly once.
+    """
+
+    def __init__(self, directory: str, model_name: str):
+        # Model ids can contain "/" or ":", so the subdirectory is named by their hash.
+        self.directory = os.path.join(directory, hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16])
+        self.model_name = model_name
+        self.disabled = False
+        self.dim = None
+        self._rows = {}
+        self._next_row = 0
+        self._keys_offset = 0
+        self._matrix = None
+        self._keys_file = None
+        # Lives next to the directory so it survives the directory being deleted offline.
+        lock_path = os.path.abspath(self.directory) + ".lock"
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        self._file_lock = FileLock(lock_path)
+        with self._file_lock:
+            self._open()
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, "meta.json")
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _keys_path(self):
+        return os.path.join(self.directory, "keys.idx")
+
+    def _open(self):
+        meta = None
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        if meta is not None and meta.get("model") != self.model_name:
+            print(f"Embedding disk cache {self.directory} belongs to {meta.get('model')}, disabling it.")
+            self.disabled = True
+            return
+        if meta is None:
+            return
+
+        try:
+            self.dim = meta["dim"]
+            self._map()
+            self._catch_up()
+            self._keys_file = open(self._keys_path, "a", encoding="ascii")
+        except Exception as e:
+            # Other processes may still have it mapped; delete the directory offline to rebuild it.
+            print(f"Embedding disk cache {self.directory} is unreadable, disabling it: {str(e)}")
+            self.disabled = True
+            self.dim = None
+            self._rows = {}
+            self._matrix = None
+
+    def _map(self):
+        capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        if self._matrix is not None:
+            if capacity <= self._matrix.shape[0]:
+                return
+            self._matrix.flush()
+            del self._matrix
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _catch_up(self):
+        """Index the complete key lines appended since the last read, by this or another process."""
+        size = os.path.getsize(self._keys_path)
+        if size <= self._keys_offset:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read(size - self._keys_offset)
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            key = line.strip().decode("ascii")
+            if key:
+                self._rows[key] = self._next_row
+            self._next_row += 1
+        self._keys_offset += end
+        # Another process may have grown the matrix to hold those rows.
+        self._map()
+
+    def _create(self, dim: int):
+        os.makedirs(self.directory, exist_ok=True)
+        self.dim = dim
+        with open(self._vectors_path, "wb") as f:
+            f.truncate(_INITIAL_ROWS * dim * 4)
+        open(self._keys_path, "w").close()
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": dim}, f)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(_INITIAL_ROWS, dim))
+        self._keys_file = open(self._keys_path, "a", encoding="ascii")
+
+    def _grow(self):
+        capacity = self._matrix.shape[0] * 2
+        self._matrix.flush()
+        del self._matrix
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, key: str):
+        if self.disabled:
+            return None
+        row = self._rows.get(key)
+        if row is None and self._matrix is not None:
+            # Keys are written after their vectors, so complete lines are safe to read without the lock.
+            try:
+                self._catch_up()
+            except OSError as e:
+                print(f"Embedding disk cache {self.directory} went away, disabling it: {str(e)}")
+                self.disabled = True
+                return None
+            row = self._rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._matrix[row])
+
+    def put(self, key: str, vector: np.ndarray):
+        if self.disabled or key in self._rows:
+            return
+        with self._file_lock:
+            if self._matrix is None:
+                self._open()
+                if self.disabled:
+                    return
+                if self._matrix is None:
+                    self._create(len(vector))
+            self._catch_up()
+            if key in self._rows or len(vector) != self.dim:
+                return
+            row = self._next_row
+            if row >= self._matrix.shape[0]:
+                self._grow()
+            # Vector first, key second: a crash can leave an unused row, never a dangling key.
+            self._matrix[row] = vector
+            self._matrix.flush()
+            self._keys_file.write(key + "\n")
+            self._keys_file.flush()
+            self._rows[key] = row
+            self._next_row += 1
+            self._keys_offset = os.path.getsize(self._keys_path)
+
+    def flush(self):
+        if self._matrix is not None:
+            self._matrix.flush()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, memory_size: int = MEMORY_CACHE_SIZE,
+                 directory: str = CACHE_DIR, disk: bool = DISK_CACHE_ENABLED):
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._disk = _DiskTier(directory, model_name) if disk else None
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def get(self, text: str):
+        """Return the cached float32 vector for `text`, or None."""
+        key = cache_key(self.model_name, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return vector
+            if self._disk is not None:
+                vector = self._disk.get(key)
+                if vector is not None:
+                    self._stats["disk_hits"] += 1
+                    self._remember(key, vector)
+                    return vector
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, text: str, vector):
+        key = cache_key(self.model_name, text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.put(key, vector)
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+                "model": self.model_name,
+            }
@@ -1,9 +1,36 @@
-import uuid
-from shared.pinecone.client import get_pinecone_index
-from shared.pinecone.embed_utils import get_product_embedding
+from shared.vector_store.client import get_vector_store
+from shared.pinecone.embed_utils import get_product_embedding, aget_product_embedding
+
+def product_vector_id(product_id) -> str:
+    """Deterministic vector id for a product, so re-indexing overwrites instead of duplicating."""
+    return f"product-{product_id}"
+
+def build_vector_metadata(product_data: dict) -> dict:
+    return {
+        "id": product_data["id"],
+        "name": product_data["name"],
+        "category": product_data["category"],
+        "style_tags": product_data["style_tags"],
+        "season": product_data["season"],
+        "gender": product_data["gender"],
+        "description": product_data["description"],
+        "color": product_data.get("color") or "",
+        "image_url": product_data.get("image_url") or product_data.get("img_url") or "",
+        # DECIMAL columns come back as Decimal, which the vector API cannot serialize
+        "price": float(product_data["price"])
+    }
 
 def index_product_in_pinecone(product_data: dict) -> str:
-    index = get_pinecone_index()
+    """
+    Embed a stored product and upsert it under its stable vector id.
+
+    Args:
+        product_data (dict): Full product row, including its database `id`.
+
+    Returns:
+        str: The vector id (same value on every call for the same product).
+    """
+    store = get_vector_store()
 
     embedding = get_product_embedding(
         product_data["name"],
@@ -13,17 +40,40 @@ def index_product_in_pinecone(product_data: dict) -> str:
         product_data["season"]
     )
 
-    vector_id = str(uuid.uuid4())
+    vector_id = product_vector_id(product_data["id"])
 
-    metadata = {
-        "name": product_data["name"],
-        "category": product_data["category"],
-        "style_tags": product_data["style_tags"],
-        "season": product_data["season"],
-        "gender": product_data["gender"],
-        "description": product_data["description"],
-        "price": product_data["price"]
-    }
+    metadata = build_vector_metadata(product_data)
 
-    index.upsert([(vector_id, embedding, metadata)])
+    store.upsert([(vector_id, embedding, metadata)])
+    return vector_id
+
+async def aindex_product_in_pinecone(product_data: dict) -> str:
+    """Async `index_product_in_pinecone`: encodes on the "embed" executor, upserts on "io"."""
+    embedding = await aget_product_embedding(
+        product_data["name"],
+        product_data["description"],
+        product_data["style_tags"],
+        product_data["category"],
+        product_data["season"]
+    )
+    vector_id = product_vector_id(product_data["id"])
+    await get_vector_store().aupsert([(vector_id, embedding, build_vector_metadata(product_data))])
     return vector_id
+
+def delete_product_vectors(product_id, *vector_ids) -> list:
+    """
+    Delete the vectors of a product: its stable id plus any legacy ids passed in.
+
+    Returns:
+        list: The vector ids that were sent for deletion.
+    """
+    ids = {product_vector_id(product_id)}
+    ids.update(v for v in vector_ids if v)
+    get_vector_store().delete(sorted(ids))
+    return sorted(ids)
+
+async def adelete_product_vectors(product_id, *vector_ids) -> list:
+    ids = {product_vector_id(product_id)}
+    ids.update(v for v in vector_ids if v)
+    await get_vector_store().adelete(sorted(ids))
+    return sorted(ids)
@@ -0,0 +1,143 @@
+"""
+Semantic response cache: reuse a result for prompts that mean the same thing.
+
+Entries are keyed on a prompt embedding plus an exact context tuple (e.g. the
+session's season/gender/style_tags). A lookup returns the stored value of the
+most similar cached prompt in the same context if its cosine similarity is at
+least `threshold`. Entries expire after `ttl` seconds, the least recently used
+are evicted beyond `max_size`, and the whole cache is dropped whenever a
+caller passes a newer catalog version (any product write), so results never
+reference stale products. Callers read the version once per request (it is a
+database read) and pass it to `get` / `put`; the cache never reads it itself.
+
+    SEMANTIC_CACHE=off           disable
+    SEMANTIC_CACHE_THRESHOLD     minimum cosine similarity (default 0.92)
+    SEMANTIC_CACHE_TTL           seconds (default 600)
+    SEMANTIC_CACHE_SIZE          entries (default 512)
+"""
+import copy
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "on").lower() not in ("0", "off", "false")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "600"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL,
+                 max_size: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self._version = None
+        self._ids = itertools.count()
+        # entry id -> (context, unit vector, value, expires_at), in LRU order
+        self._entries = OrderedDict()
+        # context -> [entry ids]
+        self._by_context = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _check_version(self, version) -> bool:
+        """Drop everything on a newer version; False if `version` is older than the cache's."""
+        if version is None or version == self._version:
+            return True
+        if self._version is not None and int(version) < int(self._version):
+            return False
+        if self._entries:
+            self._stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+        self._by_context.clear()
+        self._version = version
+        return True
+
+    def _remove(self, entry_id):
+        context = self._entries.pop(entry_id)[0]
+        ids = self._by_context.get(context)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._by_context[context]
+
+    def get(self, embedding, context: tuple = (), version=None):
+        """Return (value, similarity) of the closest cached prompt, or (None, best similarity)."""
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            # An older version only means this process read it before another request saw the write.
+            self._check_version(version)
+            ids = list(self._by_context.get(context, ()))
+            for entry_id in ids:
+                if self._entries[entry_id][3] <= now:
+                    self._remove(entry_id)
+                    self._stats["expirations"] += 1
+            ids = self._by_context.get(context)
+            if not ids:
+                self._stats["misses"] += 1
+                return None, 0.0
+            matrix = np.stack([self._entries[entry_id][1] for entry_id in ids])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self._stats["misses"] += 1
+                return None, similarity
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self._stats["hits"] += 1
+            return copy.deepcopy(self._entries[entry_id][2]), similarity
+
+    def put(self, embedding, value, context: tuple = (), version=None):
+        vector = _unit(embedding)
+        with self._lock:
+            if not self._check_version(version):
+                # Built before a write the cache has already seen: it may reference stale products.
+                return
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (context, vector, copy.deepcopy(value), time.monotonic() + self.ttl)
+            self._by_context.setdefault(context, []).append(entry_id)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_outfit_cache = None
+_outfit_cache_lock = threading.Lock()
+
+
+def get_outfit_cache():
+    """Shared cache for `advise_outfit` results, or None when SEMANTIC_CACHE=off."""
+    global _outfit_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _outfit_cache is None:
+        with _outfit_cache_lock:
+            if _outfit_cache is None:
+                _outfit_cache = SemanticCache()
+    return _outfit_cache
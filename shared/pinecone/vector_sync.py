@@ -0,0 +1,246 @@
+"""
+Consistency checks between the products table and the vector store.
+
+    python -m shared.pinecone.vector_sync            # report orphan vectors
+    python -m shared.pinecone.vector_sync --delete   # report and delete them
+    python -m shared.pinecone.vector_sync --reconcile --batch-size 500 --max-changes 20000
+
+`--reconcile` is the incremental maintenance job. Every product's
+`content_hash` (stored when its vector was written) is compared with the hash
+of its current embedded text; only changed rows and rows without a vector are
+re-embedded, and vectors no product points to are deleted. Reading ids and
+hashes is cheap, so the run time follows the number of changes rather than
+the catalog size. The first run adds the content_hash column; pass `--adopt`
+once to record hashes for the vectors that already exist instead of
+re-embedding the whole catalog.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shared.db.queries import (
+    add_content_hash_column,
+    get_product_vector_ids,
+    has_content_hash_column,
+    iter_products_by_id,
+    update_vector_ids,
+)
+from shared.pinecone.embed_utils import get_product_embeddings, product_content_hash
+from shared.pinecone.index_product_vectors import build_vector_metadata, product_vector_id
+from shared.vector_store.client import get_vector_store
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def orphan_report(delete: bool = False, backend: str = None, index_name: str = None) -> dict:
+    """
+    Count vectors that no product points to, and products without a vector.
+
+    A vector is live if it is the stable id of an existing product or the
+    vector_id stored on its row; everything else is an orphan left behind by
+    an earlier update or delete.
+
+    Args:
+        delete (bool): Also delete the orphans that were found.
+
+    Returns:
+        dict: {"products", "vectors", "orphans", "missing", "deleted", "exact"}
+    """
+    store = get_vector_store(backend, index_name)
+    linked = get_product_vector_ids()
+    live = {product_vector_id(product_id) for product_id in linked}
+    live.update(v for v in linked.values() if v)
+
+    try:
+        vector_ids = set(store.list_ids())
+    except Exception as e:
+        # Pod-based Pinecone indexes cannot list ids; fall back to a count.
+        print(f"⚠️ Cannot list vector ids ({str(e)}), reporting an estimate.")
+        total = store.count()
+        return {
+            "products": len(linked),
+            "vectors": total,
+            "orphans": max(total - len(linked), 0),
+            "missing": None,
+            "deleted": 0,
+            "exact": False,
+        }
+
+    orphans = sorted(vector_ids - live)
+    missing = [
+        product_id for product_id, vector_id in linked.items()
+        if product_vector_id(product_id) not in vector_ids and vector_id not in vector_ids
+    ]
+
+    deleted = 0
+    if delete:
+        for start in range(0, len(orphans), DELETE_CHUNK_SIZE):
+            chunk = orphans[start:start + DELETE_CHUNK_SIZE]
+            store.delete(chunk)
+            deleted += len(chunk)
+
+    return {
+        "products": len(linked),
+        "vectors": len(vector_ids),
+        "orphans": len(orphans),
+        "missing": len(missing),
+        "deleted": deleted,
+        "exact": True,
+    }
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _reindex(store, executor, rows: list, encode_batch_size: int, upsert_chunk_size: int):
+    embeddings = get_product_embeddings(rows, batch_size=encode_batch_size)
+    vectors = [(product_vector_id(row["id"]), embedding, build_vector_metadata(row))
+               for row, embedding in zip(rows, embeddings)]
+    for future in [executor.submit(store.upsert, chunk) for chunk in _chunks(vectors, upsert_chunk_size)]:
+        future.result()
+    update_vector_ids({row["id"]: product_vector_id(row["id"]) for row in rows},
+                      {row["id"]: product_content_hash(row) for row in rows})
+
+
+def reconcile_vectors(batch_size: int = 500, max_changes: int = None, encode_batch_size: int = 64,
+                      upsert_chunk_size: int = 100, max_concurrency: int = 4, adopt: bool = False,
+                      dry_run: bool = False, backend: str = None, index_name: str = None) -> dict:
+    """
+    Bring the vector store in line with the products table, touching only what changed.
+
+    - changed:  content_hash differs from the current text (or vector_id is not the stable id) -> re-embed
+    - missing:  no vector under the product's stable id -> embed
+    - orphans:  vectors no product points to -> delete
+
+    Args:
+        batch_size (int): Products read, and re-embedded and upserted, per batch.
+        max_changes (int, optional): Re-embed at most this many products per run; the rest are
+            counted as "deferred" and picked up by the next run.
+        encode_batch_size (int): Texts per SentenceTransformer forward pass.
+        upsert_chunk_size (int): Vectors per upsert request.
+        max_concurrency (int): Upsert requests in flight at once.
+        adopt (bool): Rows with an existing vector but no stored hash get their current hash
+            recorded instead of being re-embedded (use once, after adding the column).
+        dry_run (bool): Only count; nothing is embedded, written or deleted.
+
+    Returns:
+        dict: {"products", "unchanged", "changed", "missing", "adopted", "reembedded", "deferred",
+            "orphans", "deleted", "exact", "elapsed_seconds"}
+    """
+    started = time.perf_counter()
+    if not dry_run:
+        add_content_hash_column()
+    hashed = has_content_hash_column()
+    store = get_vector_store(backend, index_name)
+    try:
+        vector_ids = set(store.list_ids())
+    except Exception as e:
+        # Pod-based Pinecone indexes cannot list ids; check existence per batch and skip orphans.
+        print(f"⚠️ Cannot list vector ids ({str(e)}), checking vectors per batch; orphans are not reported.")
+        vector_ids = None
+
+    report = {"products": 0, "unchanged": 0, "changed": 0, "missing": 0, "adopted": 0,
+              "reembedded": 0, "deferred": 0, "orphans": None, "deleted": 0, "exact": vector_ids is not None}
+    live = set()
+    todo = []
+    adopted = {}
+
+    def flush():
+        nonlocal todo, adopted
+        if not dry_run:
+            if todo:
+                _reindex(store, executor, todo, encode_batch_size, upsert_chunk_size)
+            if adopted:
+                update_vector_ids({product_id: product_vector_id(product_id) for product_id in adopted}, adopted)
+        report["reembedded"] += len(todo)
+        report["adopted"] += len(adopted)
+        todo, adopted = [], {}
+        print(f"Checked {report['products']} products: {report['changed']} changed, {report['missing']} missing, "
+              f"{report['reembedded']} re-embedded.")
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for rows in iter_products_by_id(batch_size=batch_size):
+            stable_ids = [product_vector_id(row["id"]) for row in rows]
+            present = vector_ids if vector_ids is not None else set(store.fetch(stable_ids))
+            for row, vector_id in zip(rows, stable_ids):
+                report["products"] += 1
+                live.add(vector_id)
+                stored_hash = row.get("content_hash") if hashed else None
+                if vector_id not in present:
+                    report["missing"] += 1
+                elif adopt and stored_hash is None:
+                    adopted[row["id"]] = product_content_hash(row)
+                    continue
+                elif stored_hash == product_content_hash(row) and row.get("vector_id") == vector_id:
+                    report["unchanged"] += 1
+                    continue
+                else:
+                    report["changed"] += 1
+
+                if max_changes is not None and report["reembedded"] + len(todo) >= max_changes:
+                    report["deferred"] += 1
+                    # Not replaced this run: keep its legacy vector alive.
+                    if row.get("vector_id"):
+                        live.add(row["vector_id"])
+                    continue
+                todo.append(row)
+            if len(todo) + len(adopted) >= batch_size:
+                flush()
+        if todo or adopted:
+            flush()
+
+    if vector_ids is not None:
+        # Legacy ids of re-embedded rows are no longer live and are removed here too.
+        orphans = sorted(vector_ids - live)
+        report["orphans"] = len(orphans)
+        if not dry_run:
+            for chunk in _chunks(orphans, DELETE_CHUNK_SIZE):
+                store.delete(chunk)
+                report["deleted"] += len(chunk)
+
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def print_reconcile_summary(report: dict, dry_run: bool = False):
+    print(f"{'🔎 Dry run' if dry_run else '✅ Reconciliation finished'} in {report['elapsed_seconds']}s")
+    print(f"Products: {report['products']} | Unchanged: {report['unchanged']} | Changed: {report['changed']} | "
+          f"Missing vectors: {report['missing']} | Adopted: {report['adopted']}")
+    print(f"Re-embedded: {report['reembedded']} | Deferred: {report['deferred']} | "
+          f"Orphans: {report['orphans'] if report['orphans'] is not None else 'unknown'} | "
+          f"Deleted: {report['deleted']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report (and optionally delete) orphan product vectors.")
+    parser.add_argument("--delete", action="store_true", help="delete orphan vectors")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="re-embed changed products, index missing ones and delete orphans")
+    parser.add_argument("--batch-size", type=int, default=500, help="products per batch (--reconcile)")
+    parser.add_argument("--max-changes", type=int, default=None, help="re-embed at most N products (--reconcile)")
+    parser.add_argument("--adopt", action="store_true",
+                        help="record hashes for existing vectors instead of re-embedding them (--reconcile)")
+    parser.add_argument("--dry-run", action="store_true", help="only count changes (--reconcile)")
+    parser.add_argument("--backend", default=None, choices=["pinecone", "local"])
+    parser.add_argument("--index-name", default=None)
+    args = parser.parse_args(argv)
+
+    if args.reconcile:
+        report = reconcile_vectors(batch_size=args.batch_size, max_changes=args.max_changes, adopt=args.adopt,
+                                   dry_run=args.dry_run, backend=args.backend, index_name=args.index_name)
+        print_reconcile_summary(report, dry_run=args.dry_run)
+        return
+
+    report = orphan_report(delete=args.delete, backend=args.backend, index_name=args.index_name)
+    print(
+        f"Products: {report['products']} | Vectors: {report['vectors']} | "
+        f"Orphans: {report['orphans']}{'' if report['exact'] else ' (estimate)'} | "
+        f"Products without vector: {report['missing'] if report['missing'] is not None else 'unknown'} | "
+        f"Deleted: {report['deleted']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Startup helpers: explicit warm-up of lazily initialized resources and a
+report of where import time goes.
+
+    python -m shared.startup               # import-time report for the agent modules
+    python -m shared.startup --warm-up     # also time model / client / index initialization
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    "agent.tools.customer_tools.customer",
+    "agent.tools.manager_tools.manager",
+    "shared.pinecone.embed_utils",
+    "shared.pinecone.client",
+]
+
+
+def warm_up(model: bool = True, vector_client: bool = True, search_index: bool = False,
+            rollup_folder: bool = True) -> dict:
+    """
+    Initialize lazy resources ahead of the first request.
+
+    Call this from a worker's startup hook so the first chat turn does not pay
+    for loading the embedding model or building the Pinecone client. With
+    SALES_ROLLUP_MODE=folder it also starts the background rollup folder.
+
+    Returns:
+        dict: Seconds spent on each component that was initialized.
+    """
+    timings = {}
+    if model:
+        from shared.pinecone.embed_utils import get_model
+        started = time.perf_counter()
+        get_model().encode("warm up")
+        timings["embedding_model"] = round(time.perf_counter() - started, 3)
+    if vector_client:
+        from shared.pinecone.client import get_pinecone_client
+        started = time.perf_counter()
+        get_pinecone_client()
+        timings["vector_client"] = round(time.perf_counter() - started, 3)
+    if search_index:
+        from shared.db.search_index import get_search_index
+        started = time.perf_counter()
+        get_search_index()
+        timings["search_index"] = round(time.perf_counter() - started, 3)
+    if rollup_folder:
+        from shared.db import rollups
+        if rollups.SALES_ROLLUP_MODE == "folder":
+            started = time.perf_counter()
+            rollups.start_rollup_folder()
+            timings["rollup_folder"] = round(time.perf_counter() - started, 3)
+    return timings
+
+
+def import_time_report(module: str, top: int = 15) -> list:
+    """
+    Import `module` in a fresh interpreter with `-X importtime` and return the
+    `top` most expensive imports as (cumulative_seconds, self_seconds, name).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            entries.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, name.rstrip()))
+        except ValueError:
+            continue  # header row
+    if proc.returncode != 0:
+        print(f"⚠️ import {module} failed:\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+    entries.sort(reverse=True)
+    return entries[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import and warm-up time.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--warm-up", action="store_true", help="also time lazy resource initialization")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        entries = import_time_report(module, top=args.top)
+        total = entries[0][0] if entries else 0.0
+        print(f"\n=== import {module}: {total:.3f}s")
+        print(f"{'cumulative':>10}  {'self':>8}  module")
+        for cumulative, self_time, name in entries:
+            print(f"{cumulative:>9.3f}s  {self_time:>7.3f}s  {name}")
+
+    if args.warm_up:
+        print("\n=== warm-up")
+        for component, seconds in warm_up(search_index=True).items():
+            print(f"{component:>16}: {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
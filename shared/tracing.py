@@ -0,0 +1,234 @@
+"""
+OpenTelemetry tracing for tools, queries, embeddings and vector search.
+
+Spans:
+- tool.<name>        every FunctionTool invocation (see `traced_tool`)
+- db.<name>          every `shared.db.queries` call, with row counts and cache hits
+- embedding.<name>   `get_product_embedding(s)`, with cache hits
+- vector.<op>        vector-store queries, with top_k and match counts
+- format.<name>      customer message formatting
+
+TRACE_EXPORTER selects the output:
+- off (default): no SDK is installed, spans are no-ops
+- none:          record latency histograms only
+- console:       print each finished span as JSON
+- json:          append one JSON span per line to TRACE_JSON_PATH
+
+Whenever tracing is on, finished spans feed per-name latency histograms;
+`latency_report()` returns p50/p95/p99, and the report is printed at exit.
+"""
+import asyncio
+import atexit
+import functools
+import json
+import os
+import threading
+from collections import defaultdict, deque
+
+from dotenv import load_dotenv
+from opentelemetry import trace
+
+load_dotenv()
+
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "off").lower()
+TRACE_JSON_PATH = os.getenv("TRACE_JSON_PATH", os.path.join("exports", "traces.jsonl"))
+TRACE_HISTOGRAM_SIZE = int(os.getenv("TRACE_HISTOGRAM_SIZE", "10000"))
+
+TRACER_NAME = "fashion_store"
+
+_configured = False
+_configure_lock = threading.Lock()
+_recorder = None
+
+
+class LatencyRecorder:
+    """Span processor keeping the latest durations (ms) per span name."""
+
+    def __init__(self, size: int = TRACE_HISTOGRAM_SIZE):
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span):
+        if span.end_time is None or span.start_time is None:
+            return
+        with self._lock:
+            self._samples[span.name].append((span.end_time - span.start_time) / 1e6)
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000):
+        return True
+
+    def report(self, prefix: str = None) -> dict:
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()
+                       if prefix is None or name.startswith(prefix)}
+
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(round(q * (len(values) - 1))))], 3)
+
+        return {
+            name: {
+                "count": len(values),
+                "p50_ms": pct(values, 0.50),
+                "p95_ms": pct(values, 0.95),
+                "p99_ms": pct(values, 0.99),
+                "max_ms": round(values[-1], 3),
+            }
+            for name, values in sorted(samples.items()) if values
+        }
+
+
+def _json_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class JsonLinesSpanExporter(SpanExporter):
+        def __init__(self):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+            self._lock = threading.Lock()
+
+        def export(self, spans):
+            with self._lock:
+                for span in spans:
+                    self._file.write(json.dumps(json.loads(span.to_json())) + "\n")
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self):
+            self._file.close()
+
+    return JsonLinesSpanExporter()
+
+
+def configure_tracing(exporter: str = None) -> bool:
+    """
+    Attach the latency recorder and exporter once; returns whether tracing is on.
+
+    A global tracer provider can only be set once per process. If an SDK
+    provider is already installed (the ADK server sets one up for its FastAPI
+    app), the processors are added to it; otherwise a new one is installed.
+    """
+    global _configured, _recorder
+    exporter = (exporter or TRACE_EXPORTER).lower()
+    if _configured or exporter == "off":
+        return _configured
+    with _configure_lock:
+        if _configured:
+            return True
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+
+        provider = trace.get_tracer_provider()
+        install = not isinstance(provider, TracerProvider)
+        if install:
+            provider = TracerProvider(resource=Resource.create({"service.name": TRACER_NAME}))
+        _recorder = LatencyRecorder()
+        provider.add_span_processor(_recorder)
+        if exporter == "console":
+            provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+        elif exporter == "json":
+            provider.add_span_processor(BatchSpanProcessor(_json_exporter(TRACE_JSON_PATH)))
+        elif exporter != "none":
+            raise ValueError(f"Unknown TRACE_EXPORTER: {exporter}")
+        if install:
+            trace.set_tracer_provider(provider)
+        atexit.register(print_latency_report)
+        _configured = True
+    return True
+
+
+def get_tracer():
+    configure_tracing()
+    return trace.get_tracer(TRACER_NAME)
+
+
+def set_attributes(**attributes):
+    """Attach attributes to the current span (no-op when tracing is off)."""
+    span = trace.get_current_span()
+    if span.is_recording():
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+
+
+def result_count(result):
+    """Row/match count of a typical return value, or None."""
+    if isinstance(result, dict):
+        for key in ("rows", "matches"):
+            if key in result:
+                return len(result[key])
+        return None
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+def traced(name: str, attributes=None):
+    """
+    Run a function (sync or async) inside a span.
+
+    Args:
+        name (str): Span name.
+        attributes (callable, optional): f(result, args, kwargs) -> dict of extra span attributes.
+            Defaults to {"result.count": len(result)} when the result has a length.
+    """
+    def span_attributes(result, args, kwargs):
+        if attributes is not None:
+            return attributes(result, args, kwargs)
+        return {"result.count": result_count(result)}
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().start_as_current_span(name) as span:
+                    result = await func(*args, **kwargs)
+                    if span.is_recording():
+                        set_attributes(**span_attributes(result, args, kwargs))
+                    return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().start_as_current_span(name) as span:
+                result = func(*args, **kwargs)
+                if span.is_recording():
+                    set_attributes(**span_attributes(result, args, kwargs))
+                return result
+        return wrapper
+    return decorator
+
+
+def _tool_attributes(result, args, kwargs):
+    if isinstance(result, dict):
+        return {"tool.status": result.get("status")}
+    return {}
+
+
+def traced_tool(func):
+    """Wrap a tool function in a `tool.<name>` span; signature and docstring are kept for ADK."""
+    return traced(f"tool.{func.__name__}", attributes=_tool_attributes)(func)
+
+
+def latency_report(prefix: str = None) -> dict:
+    """{span name: {"count", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}; empty when tracing is off."""
+    return _recorder.report(prefix) if _recorder is not None else {}
+
+
+def print_latency_report(prefix: str = None):
+    report = latency_report(prefix)
+    if not report:
+        return
+    print("\n⏱️ Latency (ms):")
+    print(f"{'span':<40} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10}")
+    for name, row in report.items():
+        print(f"{name:<40} {row['count']:>7} {row['p50_ms']:>10} {row['p95_ms']:>10} "
+              f"{row['p99_ms']:>10} {row['max_ms']:>10}")
@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+
+from shared.executors import run_blocking
+from shared.tracing import traced
+
+
+def _arg(args, kwargs, index, name, default=None):
+    if name in kwargs:
+        return kwargs[name]
+    return args[index] if len(args) > index else default
+
+
+def _query_attributes(result, args, kwargs):
+    return {
+        "vector.backend": type(args[0]).__name__,
+        "vector.top_k": _arg(args, kwargs, 2, "top_k", 10),
+        "vector.filtered": bool(_arg(args, kwargs, 3, "filter")),
+        "result.count": len(result["matches"]),
+    }
+
+
+def _upsert_attributes(result, args, kwargs):
+    return {"vector.backend": type(args[0]).__name__, "vector.count": len(_arg(args, kwargs, 1, "vectors", []))}
+
+
+# Applied by each backend to its query/upsert so every call gets a span.
+traced_query = traced("vector.query", attributes=_query_attributes)
+traced_upsert = traced("vector.upsert", attributes=_upsert_attributes)
+
+
+class VectorStore(ABC):
+    """
+    Minimal vector-store interface shared by every backend.
+
+    Vectors are (id, values, metadata) tuples. `query` returns the same shape
+    the Pinecone client does — {"matches": [{"id", "score", "metadata"}, ...]} —
+    so callers can switch backends without changing how they read results.
+
+    Metadata filters follow the Pinecone syntax: {"field": value} or
+    {"field": {"$eq" | "$ne" | "$in" | "$nin" | "$gt" | "$gte" | "$lt" | "$lte": ...}},
+    combined with "$and" / "$or".
+    """
+
+    @abstractmethod
+    def upsert(self, vectors: list):
+        """Insert or overwrite (id, values, metadata) tuples."""
+
+    @abstractmethod
+    def query(self, vector: list, top_k: int = 10, filter: dict = None, include_metadata: bool = True) -> dict:
+        """Return the `top_k` nearest vectors by cosine similarity, optionally filtered on metadata."""
+
+    @abstractmethod
+    def delete(self, ids: list):
+        """Remove the given ids; unknown ids are ignored."""
+
+    @abstractmethod
+    def fetch(self, ids: list) -> dict:
+        """Return {id: {"id", "values", "metadata"}} for the ids that exist."""
+
+    @abstractmethod
+    def list_ids(self):
+        """Iterate over every vector id in the store."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of vectors in the store."""
+
+    # Async variants run the blocking call on the bounded "io" executor.
+
+    async def aupsert(self, vectors: list):
+        return await run_blocking("io", self.upsert, vectors)
+
+    async def aquery(self, vector: list, top_k: int = 10, filter: dict = None, include_metadata: bool = True) -> dict:
+        return await run_blocking("io", self.query, vector, top_k, filter, include_metadata)
+
+    async def adelete(self, ids: list):
+        return await run_blocking("io", self.delete, ids)
+
+    async def afetch(self, ids: list) -> dict:
+        return await run_blocking("io", self.fetch, ids)
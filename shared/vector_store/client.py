@@ -0,0 +1,43 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "pinecone" (hosted, default) or "local" (NumPy, offline)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+VECTOR_INDEX_NAME = os.getenv("VECTOR_INDEX_NAME", "fashion-style")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", os.path.join(".cache", "vector_store"))
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(backend: str = None, index_name: str = None):
+    """
+    Return the configured vector store (one shared instance per backend and index).
+
+    Args:
+        backend (str, optional): Override VECTOR_STORE_BACKEND.
+        index_name (str, optional): Override VECTOR_INDEX_NAME.
+    """
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    index_name = index_name or VECTOR_INDEX_NAME
+    key = (backend, index_name)
+    store = _stores.get(key)
+    if store is not None:
+        return store
+
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "pinecone":
+                from shared.vector_store.pinecone_store import PineconeVectorStore
+                store = PineconeVectorStore(index_name)
+            elif backend == "local":
+                from shared.vector_store.local_store import LocalVectorStore
+                store = LocalVectorStore(os.path.join(LOCAL_VECTOR_STORE_PATH, index_name))
+            else:
+                raise ValueError(f"Unknown vector store backend: {backend}")
+            _stores[key] = store
+    return store
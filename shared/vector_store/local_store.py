@@ -0,0 +1,341 @@
+"""
+In-process vector store backed by NumPy.
+
+Vectors live in one contiguous float32 matrix (memory-mapped from
+`<path>/vectors.f32`), so a query is a single matrix-vector product followed
+by an argpartition top-k. Equality filters are answered from per-(field, value)
+boolean bitmaps; range operators fall back to a scan of the metadata column.
+Ids and metadata are persisted next to the matrix: `index.json` holds a
+snapshot and `index.log` the row changes made since, one JSON line each, so a
+write costs O(rows written). The log is folded into a new snapshot once it
+outgrows the index, or on an explicit `flush()`.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from shared.vector_store.base import VectorStore, traced_query, traced_upsert
+
+_INITIAL_ROWS = 1024
+_COMPACT_MIN_ENTRIES = 1024
+_RANGE_OPS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _as_values(value):
+    return value if isinstance(value, (list, tuple, set)) else [value]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    With `autoflush` (the default) every upsert/delete appends its changes to
+    `index.log`; otherwise nothing reaches disk until `flush()`.
+    """
+
+    def __init__(self, path: str, autoflush: bool = True):
+        self.path = path
+        self.autoflush = autoflush
+        self.dim = None
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._ids = []
+        self._rows = {}
+        self._metadata = []
+        self._bitmaps = {}
+        self._pending = []      # log entries not yet appended to index.log
+        self._log_entries = 0   # entries in index.log since the last snapshot
+        self._load()
+
+    # ------------------------------------------------------------ storage
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.path, "index.json")
+
+    @property
+    def _log_path(self):
+        return os.path.join(self.path, "index.log")
+
+    @property
+    def _capacity(self):
+        return 0 if self._matrix is None else self._matrix.shape[0]
+
+    def _load(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        ids, metadatas = state["ids"], state["metadata"]
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from an interrupted append
+                    if entry[0] == "set":
+                        _, row, vector_id, metadata = entry
+                        if row == len(ids):
+                            ids.append(vector_id)
+                            metadatas.append(metadata)
+                        else:
+                            ids[row] = vector_id
+                            metadatas[row] = metadata
+                    else:
+                        del ids[entry[1]:], metadatas[entry[1]:]
+                    self._log_entries += 1
+        self.dim = state["dim"]
+        capacity = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        for vector_id, metadata in zip(ids, metadatas):
+            row = len(self._ids)
+            self._ids.append(vector_id)
+            self._rows[vector_id] = row
+            self._metadata.append(metadata)
+            self._norms[row] = np.linalg.norm(self._matrix[row])
+            self._index_metadata(row, metadata)
+
+    def _ensure_capacity(self, rows_needed: int, dim: int):
+        if self._matrix is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.dim = dim
+            capacity = max(_INITIAL_ROWS, rows_needed)
+            with open(self._vectors_path, "wb") as f:
+                f.truncate(capacity * dim * 4)
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self._norms = np.zeros(capacity, dtype=np.float32)
+            self._write_snapshot()
+            return
+        if rows_needed <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < rows_needed:
+            capacity *= 2
+        self._matrix.flush()
+        del self._matrix
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._norms = np.concatenate([self._norms, np.zeros(capacity - len(self._norms), dtype=np.float32)])
+        for field_maps in self._bitmaps.values():
+            for value, bitmap in field_maps.items():
+                field_maps[value] = np.concatenate([bitmap, np.zeros(capacity - len(bitmap), dtype=bool)])
+
+    def _write_snapshot(self):
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "ids": self._ids, "metadata": self._metadata}, f)
+        os.replace(tmp, self._index_path)
+        # The snapshot already contains every logged change.
+        open(self._log_path, "w").close()
+        self._log_entries = 0
+        self._pending = []
+
+    def _append_log(self):
+        """Persist the pending row changes; compacts once the log outgrows the index."""
+        if not self._pending:
+            return
+        # Vectors first, then the log lines that make their rows visible.
+        self._matrix.flush()
+        with open(self._log_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(entry) + "\n" for entry in self._pending))
+        self._log_entries += len(self._pending)
+        self._pending = []
+        if self._log_entries > max(_COMPACT_MIN_ENTRIES, len(self._ids)):
+            self._write_snapshot()
+
+    def flush(self):
+        """Write the matrix and a full `index.json` snapshot, emptying the log."""
+        with self._lock:
+            if self._matrix is None:
+                return
+            self._matrix.flush()
+            self._write_snapshot()
+
+    # ------------------------------------------------------------ bitmaps
+
+    def _index_metadata(self, row: int, metadata: dict, present: bool = True):
+        for field, value in metadata.items():
+            field_maps = self._bitmaps.setdefault(field, {})
+            for v in _as_values(value):
+                try:
+                    bitmap = field_maps.get(v)
+                except TypeError:
+                    continue  # unhashable values are only reachable through range scans
+                if bitmap is None:
+                    if not present:
+                        continue
+                    bitmap = field_maps[v] = np.zeros(self._capacity, dtype=bool)
+                bitmap[row] = present
+
+    def _equals(self, field: str, values) -> np.ndarray:
+        n = len(self._ids)
+        mask = np.zeros(n, dtype=bool)
+        field_maps = self._bitmaps.get(field, {})
+        for v in _as_values(values):
+            bitmap = field_maps.get(v)
+            if bitmap is not None:
+                mask |= bitmap[:n]
+        return mask
+
+    def _range(self, field: str, op: str, operand) -> np.ndarray:
+        compare = _RANGE_OPS[op]
+
+        def test(metadata):
+            value = metadata.get(field)
+            try:
+                return value is not None and compare(value, operand)
+            except TypeError:
+                return False
+
+        return np.fromiter((test(m) for m in self._metadata), dtype=bool, count=len(self._metadata))
+
+    def _filter_mask(self, filter: dict) -> np.ndarray:
+        n = len(self._ids)
+        mask = np.ones(n, dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self._filter_mask(sub)
+            elif key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub in condition:
+                    any_mask |= self._filter_mask(sub)
+                mask &= any_mask
+            elif isinstance(condition, dict):
+                for op, operand in condition.items():
+                    if op in ("$eq", "$in"):
+                        mask &= self._equals(key, operand)
+                    elif op in ("$ne", "$nin"):
+                        mask &= ~self._equals(key, operand)
+                    elif op in _RANGE_OPS:
+                        mask &= self._range(key, op, operand)
+                    else:
+                        raise ValueError(f"Unsupported filter operator: {op}")
+            else:
+                mask &= self._equals(key, condition)
+        return mask
+
+    # ------------------------------------------------------------ API
+
+    @traced_upsert
+    def upsert(self, vectors: list):
+        with self._lock:
+            for vector_id, values, metadata in vectors:
+                values = np.asarray(values, dtype=np.float32)
+                if self.dim is not None and len(values) != self.dim:
+                    raise ValueError(f"Vector {vector_id} has dimension {len(values)}, expected {self.dim}.")
+                metadata = dict(metadata or {})
+                row = self._rows.get(vector_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ensure_capacity(row + 1, len(values))
+                    self._ids.append(vector_id)
+                    self._metadata.append(metadata)
+                    self._rows[vector_id] = row
+                else:
+                    self._index_metadata(row, self._metadata[row], present=False)
+                    self._metadata[row] = metadata
+                self._matrix[row] = values
+                self._norms[row] = np.linalg.norm(values)
+                self._index_metadata(row, metadata)
+                self._pending.append(["set", row, vector_id, metadata])
+            if self.autoflush:
+                self._append_log()
+
+    def delete(self, ids: list):
+        with self._lock:
+            for vector_id in ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                self._index_metadata(row, self._metadata[row], present=False)
+                last = len(self._ids) - 1
+                if row != last:
+                    # Move the last row into the hole to keep the matrix contiguous.
+                    moved_id = self._ids[last]
+                    self._index_metadata(last, self._metadata[last], present=False)
+                    self._matrix[row] = self._matrix[last]
+                    self._norms[row] = self._norms[last]
+                    self._ids[row] = moved_id
+                    self._metadata[row] = self._metadata[last]
+                    self._rows[moved_id] = row
+                    self._index_metadata(row, self._metadata[row])
+                    self._pending.append(["set", row, moved_id, self._metadata[row]])
+                self._ids.pop()
+                self._metadata.pop()
+                self._norms[last] = 0.0
+                self._pending.append(["truncate", last])
+            if self.autoflush:
+                self._append_log()
+
+    def fetch(self, ids: list) -> dict:
+        with self._lock:
+            result = {}
+            for vector_id in ids:
+                row = self._rows.get(vector_id)
+                if row is not None:
+                    result[vector_id] = {
+                        "id": vector_id,
+                        "values": self._matrix[row].tolist(),
+                        "metadata": dict(self._metadata[row]),
+                    }
+            return result
+
+    @traced_query
+    def query(self, vector: list, top_k: int = 10, filter: dict = None, include_metadata: bool = True) -> dict:
+        with self._lock:
+            n = len(self._ids)
+            if not n or top_k <= 0:
+                return {"matches": []}
+            q = np.asarray(vector, dtype=np.float32)
+            q_norm = np.linalg.norm(q)
+            norms = self._norms[:n] * (q_norm if q_norm else 1.0)
+            scores = (self._matrix[:n] @ q) / np.where(norms == 0, 1.0, norms)
+
+            if filter:
+                mask = self._filter_mask(filter)
+                candidates = np.flatnonzero(mask)
+                if not len(candidates):
+                    return {"matches": []}
+                scores = scores[candidates]
+            else:
+                candidates = None
+
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            rows = candidates[top] if candidates is not None else top
+
+            return {
+                "matches": [
+                    {
+                        "id": self._ids[row],
+                        "score": float(scores[i]),
+                        "metadata": dict(self._metadata[row]) if include_metadata else {},
+                    }
+                    for i, row in zip(top, rows)
+                ]
+            }
+
+    def list_ids(self):
+        with self._lock:
+            return list(self._ids)
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
@@ -0,0 +1,54 @@
+from shared.pinecone.client import get_pinecone_index
+from shared.vector_store.base import VectorStore, traced_query, traced_upsert
+
+
+class PineconeVectorStore(VectorStore):
+    """Hosted Pinecone index (the original backend)."""
+
+    def __init__(self, index_name: str = "fashion-style"):
+        self.index_name = index_name
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = get_pinecone_index(self.index_name)
+        return self._index
+
+    @traced_upsert
+    def upsert(self, vectors: list):
+        self.index.upsert(vectors=vectors)
+
+    @traced_query
+    def query(self, vector: list, top_k: int = 10, filter: dict = None, include_metadata: bool = True) -> dict:
+        kwargs = {"vector": vector, "top_k": top_k, "include_metadata": include_metadata}
+        if filter:
+            kwargs["filter"] = filter
+        response = self.index.query(**kwargs)
+        return {
+            "matches": [
+                {"id": m["id"], "score": m["score"], "metadata": (m["metadata"] if include_metadata else None) or {}}
+                for m in response["matches"]
+            ]
+        }
+
+    def delete(self, ids: list):
+        if ids:
+            self.index.delete(ids=list(ids))
+
+    def fetch(self, ids: list) -> dict:
+        if not ids:
+            return {}
+        response = self.index.fetch(ids=list(ids))
+        return {
+            vector_id: {"id": vector_id, "values": list(v.values), "metadata": dict(v.metadata or {})}
+            for vector_id, v in response.vectors.items()
+        }
+
+    def list_ids(self):
+        # Only serverless indexes support listing; pod indexes raise here.
+        for page in self.index.list():
+            yield from page
+
+    def count(self) -> int:
+        return self.index.describe_index_stats()["total_vector_count"]